@@ -0,0 +1,91 @@
+"""
+Cost of the value plus the full gradient of a model with many parameters:
+central finite differences (two evaluate calls per parameter), forward- and
+reverse-mode automatic differentiation, and compiled symbolic derivatives
+from Compiler.differentiate (one compiled function per parameter).
+
+Run from the repository root:
+    python -m benchmarks.bench_autodiff
+"""
+import itertools
+import random
+import string
+import time
+from src.parser import tokenize, parse_expression
+from src.tree import ExpressionTree
+from src.compiler import Compiler
+from src.evaluator import evaluate
+from src.autodiff import gradient
+
+STEP = 1e-6
+
+
+def parameter_names(count: int) -> list:
+    # Variables are purely alphabetic: pa, pb, ..., paa, ...
+    names = []
+    for length in itertools.count(1):
+        for letters in itertools.product(string.ascii_lowercase, repeat=length):
+            names.append("p" + "".join(letters))
+            if len(names) == count:
+                return names
+
+
+def model(names: list) -> str:
+    """
+    A sum of terms, each using a couple of parameters and the input x.
+    """
+    terms = []
+    for i, name in enumerate(names):
+        other = names[(i + 1) % len(names)]
+        terms.append(f"{name} * sin(x * {other}) + exp(-{name}^2) / (1 + x^2)")
+    return " + ".join(terms)
+
+
+def finite_differences(node, context: dict, names: list):
+    value = evaluate(node, context)
+    partials = {}
+    for name in names:
+        up = evaluate(node, {**context, name: context[name] + STEP})
+        down = evaluate(node, {**context, name: context[name] - STEP})
+        partials[name] = (up - down) / (2 * STEP)
+    return value, partials
+
+
+def timed(function, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    rng = random.Random(7)
+    print(f"{'params':>7} {'nodes':>7} {'finite diff':>12} {'forward':>9} {'reverse':>9} {'symbolic':>9}")
+    for count in (4, 16, 64, 256):
+        names = parameter_names(count)
+        node = parse_expression(tokenize(model(names)))
+        context = {name: rng.uniform(-1, 1) for name in names}
+        context["x"] = 0.7
+
+        expected, difference_time = timed(lambda: finite_differences(node, context, names))
+        forward, forward_time = timed(lambda: gradient(node, context, names, mode="forward"))
+        reverse, reverse_time = timed(lambda: gradient(node, context, names, mode="reverse"))
+        for name in names:
+            assert abs(forward[1][name] - reverse[1][name]) < 1e-9
+            assert abs(expected[1][name] - reverse[1][name]) < 1e-4
+
+        # Derivatives are compiled once, then called per step; time the calls
+        compiled = [Compiler.compile_python(Compiler.differentiate(node, name)) for name in names]
+        _, symbolic_time = timed(lambda: [derivative(context) for derivative in compiled])
+
+        nodes = len(ExpressionTree.from_node(node))
+        print(
+            f"{count:>7} {nodes:>7} {difference_time * 1e3:>10.2f}ms "
+            f"{forward_time * 1e3:>7.2f}ms {reverse_time * 1e3:>7.2f}ms {symbolic_time * 1e3:>7.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compare the recursive tree-walking evaluator against the compiled stack machine.
+
+Run from the repository root:
+    python -m benchmarks.bench_bytecode
+"""
+import timeit
+from src.parser import Node
+from src.compiler import Compiler
+from src.evaluator import evaluate
+from src.bytecode import execute
+
+
+def deep_tree(depth: int) -> Node:
+    """
+    Right-nested chain: x + (y * (x - (y + ...))).
+    """
+    operators = ("+", "*", "-")
+    node = Node("x")
+    for i in range(depth):
+        leaf = Node("y") if i % 2 else Node(i % 7 + 1)
+        node = Node(operators[i % len(operators)], left=leaf, right=node)
+    return node
+
+
+def wide_tree(levels: int) -> Node:
+    """
+    Balanced sum of 2**levels terms of the form sin(x) * k or y / k.
+    """
+    leaves = []
+    for i in range(2 ** levels):
+        if i % 2:
+            leaves.append(Node("*", left=Node("sin", left=Node("x")), right=Node(i)))
+        else:
+            leaves.append(Node("/", left=Node("y"), right=Node(i + 1)))
+    while len(leaves) > 1:
+        leaves = [Node("+", left=leaves[i], right=leaves[i + 1]) for i in range(0, len(leaves), 2)]
+    return leaves[0]
+
+
+def run_case(name: str, tree: Node, repeat: int):
+    context = {"x": 3, "y": 2.5}
+    program = Compiler.compile(tree)
+    assert evaluate(tree, context) == execute(program, context)
+
+    tree_time = min(timeit.repeat(lambda: evaluate(tree, context), number=repeat, repeat=3))
+    vm_time = min(timeit.repeat(lambda: execute(program, context), number=repeat, repeat=3))
+    compile_time = min(timeit.repeat(lambda: Compiler.compile(tree), number=1, repeat=3))
+
+    print(
+        f"{name:<10} {len(program):>8} instr  "
+        f"evaluate {tree_time / repeat * 1e6:>10.1f} us  "
+        f"execute {vm_time / repeat * 1e6:>10.1f} us  "
+        f"speedup {tree_time / vm_time:>5.2f}x  "
+        f"(compile once {compile_time * 1e3:.2f} ms)"
+    )
+
+
+def main():
+    # The recursive evaluator cannot go much deeper than the interpreter's recursion limit
+    run_case("deep-200", deep_tree(200), 2000)
+    run_case("deep-800", deep_tree(800), 500)
+    run_case("wide-2^8", wide_tree(8), 500)
+    run_case("wide-2^12", wide_tree(12), 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Measure ExpressionCache on a skewed stream of repeated formulas: uncached
+pipeline vs in-memory LRU vs a warm on-disk tier after a "restart".
+
+Run from the repository root:
+    python -m benchmarks.bench_cache
+"""
+import os
+import random
+import tempfile
+import time
+from src.parser import tokenize, parse_expression
+from src.compiler import Compiler
+from src.cache import ExpressionCache
+from benchmarks.bench_cse import random_expression
+
+
+def workload(formulas: int, requests: int, rng: random.Random) -> list:
+    """
+    `requests` lookups over `formulas` distinct expressions with a Zipf-like
+    popularity, so a few formulas dominate as in production traffic.
+    """
+    pool = [random_expression(9, rng) for _ in range(formulas)]
+    weights = [1 / (rank + 1) for rank in range(formulas)]
+    return rng.choices(pool, weights=weights, k=requests)
+
+
+def run(name: str, lookup, stream: list):
+    start = time.perf_counter()
+    for expression in stream:
+        lookup(expression)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {elapsed:7.2f} s  ({elapsed / len(stream) * 1e6:8.1f} us per request)")
+
+
+def uncached(expression: str):
+    return Compiler.simplify(parse_expression(tokenize(expression)))
+
+
+def main():
+    rng = random.Random(1234)
+    stream = workload(formulas=2_000, requests=20_000, rng=rng)
+    run("no cache", uncached, stream)
+
+    for max_entries in (100, 500, 2_000):
+        cache = ExpressionCache(max_entries=max_entries)
+        run(f"memory LRU, {max_entries} entries", cache.get, stream)
+        print(f"{'':<28} {cache.stats()}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "expressions.sqlite")
+        cold = ExpressionCache(max_entries=100, path=path)
+        run("disk tier, cold", cold.get, stream)
+        cold.close()
+        # A new process: empty memory tier, warm file
+        warm = ExpressionCache(max_entries=100, path=path)
+        run("disk tier, warm restart", warm.get, stream)
+        print(f"{'':<28} {warm.stats()}")
+        warm.close()
+
+
+if __name__ == "__main__":
+    main()
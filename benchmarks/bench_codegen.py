@@ -0,0 +1,82 @@
+"""
+Throughput of one formula evaluated over many variable bindings: the tree
+walker, the stack machine and the generated Python function.
+
+Run from the repository root:
+    python -m benchmarks.bench_codegen
+"""
+import random
+import time
+from src.parser import tokenize, parse_expression
+from src.tree import ExpressionTree
+from src.compiler import Compiler
+from src.evaluator import evaluate
+from src.bytecode import execute
+from benchmarks.bench_cse import random_expression
+
+FORMULAS = {
+    "polynomial": "3*x^3 - 2*x^2*y + x*y^2 - 7*y + 11",
+    "trig": "sin(x)^2 + cos(y)^2 - tan(x/3) * 2",
+    "guarded": "log(x + 10) / (y + 7) + sqrt(x^2 + y^2) // 3",
+}
+
+
+def throughput(name: str, function, bindings: list):
+    start = time.perf_counter()
+    for context in bindings:
+        function(context)
+    elapsed = time.perf_counter() - start
+    return f"{name} {len(bindings) / elapsed / 1e3:8.0f}k/s"
+
+
+def run_case(label: str, expression: str, bindings: list):
+    node = Compiler.simplify(parse_expression(tokenize(expression)))
+    tree = ExpressionTree.from_node(node)
+    program = Compiler.compile(node)
+    start = time.perf_counter()
+    compiled = Compiler.compile_python(node)
+    compile_time = time.perf_counter() - start
+    for context in bindings[:100]:
+        assert compiled(context) == evaluate(node, context)
+
+    # Calling the function directly skips the dict lookups of compiled(context)
+    function, variables = compiled.function, compiled.variables
+    rows = [[context[name] for name in variables] for context in bindings]
+    start = time.perf_counter()
+    for row in rows:
+        function(*row)
+    direct = len(rows) / (time.perf_counter() - start)
+
+    print(
+        f"{label:<12} "
+        f"{throughput('evaluate', lambda c: evaluate(node, c), bindings)}  "
+        f"{throughput('tree', lambda c: evaluate(tree, c), bindings)}  "
+        f"{throughput('execute', lambda c: execute(program, c), bindings)}  "
+        f"{throughput('compiled', compiled, bindings)}  "
+        f"direct {direct / 1e3:8.0f}k/s  "
+        f"(compile once {compile_time * 1e3:.2f} ms)"
+    )
+
+
+def main():
+    rng = random.Random(42)
+    bindings = [{"x": rng.uniform(-5, 5), "y": rng.uniform(-5, 5)} for _ in range(50_000)]
+    for label, expression in FORMULAS.items():
+        run_case(label, expression, bindings)
+    # Larger random formulas; some bindings hit a domain error, so keep only safe ones
+    for size in (6, 9):
+        expression = random_expression(size, rng)
+        node = parse_expression(tokenize(expression))
+        safe = []
+        for context in bindings[:20_000]:
+            try:
+                evaluate(node, context)
+            except (ValueError, ArithmeticError):
+                continue
+            safe.append(context)
+        if safe:
+            run_case(f"random-{size}", expression, safe)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Report how much hash-consing / common-subexpression elimination shrinks
+generated workloads, and what it saves at evaluation time.
+
+Run from the repository root:
+    python -m benchmarks.bench_cse
+"""
+import random
+import timeit
+from src.parser import tokenize, parse_expression, Node
+from src.compiler import Compiler
+from src.evaluator import evaluate
+from src.bytecode import execute
+
+BLOCKS = ["sin(x*y)", "(x+1)^2", "log(x*y+1)", "sqrt(x^2+y^2)", "cos(x)*cos(y)", "exp(x/y)"]
+
+
+def repeated_blocks(terms: int, rng: random.Random) -> str:
+    """
+    A sum of terms built from a small pool of recurring subexpressions.
+    """
+    parts = []
+    for i in range(terms):
+        block = rng.choice(BLOCKS)
+        other = rng.choice(BLOCKS)
+        parts.append(f"{rng.randint(1, 4)}*{block} - {other}/{rng.randint(1, 4)}")
+    return " + ".join(parts)
+
+
+def random_expression(depth: int, rng: random.Random) -> str:
+    """
+    A random expression over a small vocabulary, so duplicates arise by chance.
+    """
+    if depth == 0 or rng.random() < 0.2:
+        return rng.choice(["x", "y", "2", "3"])
+    if rng.random() < 0.2:
+        return f"{rng.choice(['sin', 'cos', 'abs'])}({random_expression(depth - 1, rng)})"
+    operator = rng.choice(["+", "-", "*"])
+    return f"({random_expression(depth - 1, rng)} {operator} {random_expression(depth - 1, rng)})"
+
+
+def polynomial(terms: int, rng: random.Random) -> str:
+    """
+    Monomials such as 3*x^2*y; repeats come from shared powers.
+    """
+    parts = []
+    for _ in range(terms):
+        factors = [str(rng.randint(1, 9))]
+        for variable in ("x", "y", "z"):
+            power = rng.randint(0, 3)
+            if power:
+                factors.append(f"{variable}^{power}")
+        parts.append("*".join(factors))
+    return " + ".join(parts)
+
+
+def count_nodes(node: Node) -> int:
+    """
+    Number of nodes in the tree, counting shared nodes once per use.
+    """
+    count = 0
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current is not None:
+            count += 1
+            stack.append(current.left)
+            stack.append(current.right)
+    return count
+
+
+def count_unique(node: Node) -> int:
+    seen = set()
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current is not None and id(current) not in seen:
+            seen.add(id(current))
+            stack.append(current.left)
+            stack.append(current.right)
+    return len(seen)
+
+
+def run_case(name: str, expression: str):
+    context = {"x": 1.5, "y": 2.5, "z": 0.5}
+    tree = parse_expression(tokenize(expression))
+    dag = Compiler.eliminate_common_subexpressions(tree)
+    total, unique = count_nodes(tree), count_unique(dag)
+
+    tree_eval = min(timeit.repeat(lambda: evaluate(tree, context), number=5, repeat=3)) / 5
+    dag_eval = min(timeit.repeat(lambda: evaluate(dag, context), number=5, repeat=3)) / 5
+    tree_program, dag_program = Compiler.compile(tree), Compiler.compile(dag)
+    tree_vm = min(timeit.repeat(lambda: execute(tree_program, context), number=5, repeat=3)) / 5
+    dag_vm = min(timeit.repeat(lambda: execute(dag_program, context), number=5, repeat=3)) / 5
+
+    print(
+        f"{name:<16} nodes {total:>8} -> {unique:>7} unique  dedup {total / unique:6.2f}x | "
+        f"evaluate {tree_eval * 1e3:7.2f} -> {dag_eval * 1e3:7.2f} ms | "
+        f"execute {tree_vm * 1e3:7.2f} -> {dag_vm * 1e3:7.2f} ms "
+        f"({len(tree_program)} -> {len(dag_program)} instructions)"
+    )
+
+
+def main():
+    rng = random.Random(1234)
+    run_case("repeated-blocks", repeated_blocks(5_000, rng))
+    run_case("random-depth-12", random_expression(12, rng))
+    run_case("random-depth-16", random_expression(16, rng))
+    run_case("polynomial", polynomial(5_000, rng))
+
+
+if __name__ == "__main__":
+    main()
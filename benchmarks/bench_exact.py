@@ -0,0 +1,65 @@
+"""
+Compare the float path with exact (Fraction) mode on rational expressions
+over integers of growing size. Past ~308 digits the float path cannot run at
+all: converting the operands to float overflows.
+
+Run from the repository root:
+    python -m benchmarks.bench_exact
+"""
+import random
+import timeit
+from src.parser import tokenize, parse_expression
+from src.compiler import Compiler
+from src.evaluator import evaluate
+from src.bytecode import execute
+
+EXPRESSION = "(a/b + c/d) * (a - c) / (b + d) + (a/d)^2 - a // c + b % d"
+
+
+def operands(digits: int, rng: random.Random) -> dict:
+    return {name: rng.randrange(10 ** (digits - 1), 10 ** digits) for name in "abcd"}
+
+
+def timed(function, number: int = 5):
+    """
+    Best time per call in seconds, or the name of the exception it raised.
+    """
+    try:
+        function()
+    except (OverflowError, ValueError) as error:
+        return type(error).__name__
+    return min(timeit.repeat(function, number=number, repeat=3)) / number
+
+
+def show(seconds) -> str:
+    if isinstance(seconds, str):
+        return f"{seconds:>13}"
+    return f"{seconds * 1e3:10.3f} ms"
+
+
+def main():
+    rng = random.Random(1234)
+    tree = parse_expression(tokenize(EXPRESSION))
+    program = Compiler.compile(tree)
+    print(EXPRESSION)
+    for digits in (10, 100, 300, 1_000, 10_000, 100_000):
+        context = operands(digits, rng)
+        number = 1 if digits >= 10_000 else 5
+        float_eval = timed(lambda: evaluate(tree, context), number)
+        exact_eval = timed(lambda: evaluate(tree, context, exact=True), number)
+        exact_vm = timed(lambda: execute(program, context, exact=True), number)
+        print(
+            f"{digits:>7} digits | float {show(float_eval)} | exact {show(exact_eval)} | "
+            f"exact execute {show(exact_vm)}"
+        )
+
+    # Folding: constant subtrees stay exact through simplify
+    literal = "(" + " + ".join(f"1/{n}" for n in range(1, 2_001)) + ") * 3^500 / 7^200"
+    tree = parse_expression(tokenize(literal))
+    float_fold = timed(lambda: Compiler.simplify(tree), number=1)
+    exact_fold = timed(lambda: Compiler.simplify(tree, exact=True), number=1)
+    print(f"fold H(2000)*3^500/7^200 | float {show(float_fold)} | exact {show(exact_fold)}")
+
+
+if __name__ == "__main__":
+    main()
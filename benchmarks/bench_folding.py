@@ -0,0 +1,62 @@
+"""
+Time constant folding of huge integer literals: factorials and powers, with
+and without the digit budget of Compiler.simplify.
+
+Run from the repository root:
+    python -m benchmarks.bench_folding
+"""
+import time
+from src.parser import tokenize, parse_expression
+from src.compiler import Compiler
+from src.evaluator import estimate_digits
+
+
+def naive_factorial(n: int) -> int:
+    # The running product Compiler.factorial used to compute
+    result = 1
+    for i in range(2, n + 1):
+        result *= i
+    return result
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def fold(expression: str, max_digits):
+    tree = parse_expression(tokenize(expression))
+    seconds, simplified = timed(lambda: Compiler.simplify(tree, max_digits=max_digits))
+    folded = simplified.left is None and simplified.right is None
+    return seconds, folded
+
+
+def main():
+    print("factorial")
+    for n in (1_000, 10_000, 50_000, 100_000):
+        naive, _ = timed(lambda: naive_factorial(n)) if n <= 50_000 else (None, None)
+        fast, _ = timed(lambda: Compiler.factorial(n))
+        naive_text = f"{naive * 1e3:9.1f} ms" if naive is not None else "  (skipped)"
+        print(
+            f"  {n:>7}! ~{estimate_digits('!', n):>9.0f} digits | "
+            f"running product {naive_text} | Compiler.factorial {fast * 1e3:8.1f} ms"
+        )
+
+    print("simplify with and without a digit budget")
+    for expression in ("20000!", "200000!", "7^100000", "7^10000000", "3^(10^9) + 1"):
+        for max_digits in (None, 100_000, 1_000_000):
+            if max_digits is None and "10^9" in expression:
+                # Would need ~477 million digits of memory and minutes of time
+                print(f"  {expression:<14} budget {'none':>9} | (skipped)")
+                continue
+            seconds, folded = fold(expression, max_digits)
+            budget = "none" if max_digits is None else f"{max_digits:,}"
+            print(
+                f"  {expression:<14} budget {budget:>9} | {seconds * 1e3:9.2f} ms "
+                f"{'folded' if folded else 'deferred'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
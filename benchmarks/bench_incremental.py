@@ -0,0 +1,70 @@
+"""
+Time per edit of IncrementalParser + IncrementalSimplifier against a full
+re-parse and re-simplify, as a function of edit size, on an expression of
+about 50k terms: a flat chain followed by parenthesized groups.
+
+Every edit is applied to the same base version, so each row times one
+keystroke-like update. Tokenizing the new text is included; it stays linear
+in the length of the whole expression.
+
+Run from the repository root:
+    python -m benchmarks.bench_incremental
+"""
+import time
+from src.parser import tokenize, parse_expression, IncrementalParser
+from src.compiler import Compiler, IncrementalSimplifier
+from benchmarks.bench_scaling import wide_sum
+
+FLAT_TERMS = 25_000
+GROUPS = 250
+GROUP_TERMS = 100
+EDIT_TERMS = (1, 10, 100, 1_000, 10_000)
+
+
+def edited(base: str, where: str, terms: int) -> str:
+    """
+    `base` with `terms` new terms inserted at the end, in the middle of the
+    flat chain or inside the middle group.
+    """
+    insert = f" + {wide_sum(terms)} "
+    if where == "end":
+        return base + insert
+    if where == "chain":
+        position = base.index("+", len(base) // 4)
+    else:
+        position = base.index(")", len(base) * 3 // 4)
+    return base[:position] + insert + base[position:]
+
+
+def full_update(expression: str):
+    return Compiler.simplify(parse_expression(tokenize(expression)))
+
+
+def main():
+    groups = " + ".join(f"({wide_sum(GROUP_TERMS)})" for _ in range(GROUPS))
+    base = f"{wide_sum(FLAT_TERMS)} + {groups}"
+    print(f"{len(tokenize(base))} tokens, {FLAT_TERMS + GROUPS * GROUP_TERMS} terms")
+    print(f"{'edit':>6} {'terms':>7} {'reparsed':>9} {'incremental':>12} {'full':>9} {'speedup':>8}")
+
+    for where in ("end", "chain", "group"):
+        for terms in EDIT_TERMS:
+            expression = edited(base, where, terms)
+            parser, simplifier = IncrementalParser(), IncrementalSimplifier()
+            simplifier.simplify(parser.parse(base))
+
+            start = time.perf_counter()
+            result = simplifier.simplify(parser.parse(expression))
+            incremental = time.perf_counter() - start
+
+            start = time.perf_counter()
+            expected = full_update(expression)
+            full = time.perf_counter() - start
+            assert repr(result) == repr(expected)
+            print(
+                f"{where:>6} {terms:>7} {parser.reparsed:>9} "
+                f"{incremental * 1e3:>10.1f}ms {full * 1e3:>7.0f}ms {full / incremental:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
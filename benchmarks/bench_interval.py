@@ -0,0 +1,111 @@
+"""
+Screening formulas for domain errors over variable ranges: one interval
+evaluation per formula against evaluating it at sampled points, and the
+effect of Compiler.prune on formulas with subtrees that are dead or
+constant over the ranges.
+
+Run from the repository root:
+    python -m benchmarks.bench_interval
+"""
+import random
+import time
+from src.parser import tokenize, parse_expression
+from src.compiler import Compiler
+from src.evaluator import evaluate, evaluate_interval
+from benchmarks.bench_cse import count_nodes
+
+RANGES = {"x": (0.5, 9.5), "y": (-3, 3), "z": (1, 100)}
+SAMPLES = 200
+
+PRUNED = {
+    "dead modulo": "(x % 16) * y + abs(z) * sin(x)",
+    "constant floor": "floor(x / 10) * cos(y) * exp(z) + sqrt(z) * 1 + (y - 0)",
+    "guarded": "log(z + abs(y)) / (x + 1) + ceil(x / 20) * tan(y)",
+}
+
+
+def random_formula(depth: int, rng: random.Random) -> str:
+    """
+    A random formula with operations that can fail: log, sqrt and division.
+    """
+    if depth == 0 or rng.random() < 0.25:
+        return rng.choice(["x", "y", "z", "2", "5", "0.5"])
+    if rng.random() < 0.3:
+        name = rng.choice(["sin", "cos", "log", "sqrt", "abs", "exp", "floor"])
+        return f"{name}({random_formula(depth - 1, rng)})"
+    operator = rng.choice(["+", "-", "*", "/", "%", "//"])
+    return f"({random_formula(depth - 1, rng)} {operator} {random_formula(depth - 1, rng)})"
+
+
+def screen(formulas: list, rng: random.Random):
+    nodes = [parse_expression(tokenize(formula)) for formula in formulas]
+
+    start = time.perf_counter()
+    results = [evaluate_interval(node, RANGES) for node in nodes]
+    interval_time = time.perf_counter() - start
+
+    points = [{name: rng.uniform(*bounds) for name, bounds in RANGES.items()} for _ in range(SAMPLES)]
+    start = time.perf_counter()
+    failing = 0
+    for node, result in zip(nodes, results):
+        failed = False
+        for context in points:
+            try:
+                value = evaluate(node, context)
+            except (ValueError, ArithmeticError):
+                failed = True
+                continue
+            if not isinstance(value, complex):
+                assert value in result.bounds, (node, context, value, result)
+        # A failure at a sampled point is always flagged
+        assert not failed or result.errors
+        failing += failed
+    sampling_time = time.perf_counter() - start
+
+    safe = sum(result.safe for result in results)
+    certain = sum(any(result.errors.values()) for result in results)
+    print(
+        f"{len(formulas)} formulas: interval {len(formulas) / interval_time:8.0f}/s, "
+        f"sampling {SAMPLES} points {len(formulas) / sampling_time:6.0f}/s "
+        f"({sampling_time / interval_time:.0f}x slower)"
+    )
+    print(
+        f"  proven safe {safe}, certain to fail {certain}, "
+        f"possibly failing {len(formulas) - safe - certain}, failed at a sample {failing}"
+    )
+
+
+def prune_case(label: str, expression: str, rng: random.Random):
+    node = Compiler.simplify(parse_expression(tokenize(expression)))
+    start = time.perf_counter()
+    pruned = Compiler.simplify(Compiler.prune(node, RANGES))
+    prune_time = time.perf_counter() - start
+
+    points = [{name: rng.uniform(*bounds) for name, bounds in RANGES.items()} for _ in range(20_000)]
+    timings = []
+    for tree in (node, pruned):
+        start = time.perf_counter()
+        for context in points:
+            evaluate(tree, context)
+        timings.append(time.perf_counter() - start)
+    for context in points[:100]:
+        assert abs(evaluate(node, context) - evaluate(pruned, context)) <= 1e-9 * (1 + abs(evaluate(node, context)))
+
+    print(
+        f"{label:<16} nodes {count_nodes(node):3d} -> {count_nodes(pruned):3d}  "
+        f"evaluate {timings[0] / timings[1]:.2f}x faster  "
+        f"(prune and simplify {prune_time * 1e3:.2f} ms)"
+    )
+
+
+def main():
+    rng = random.Random(42)
+    print(f"Ranges: {RANGES}")
+    for depth in (3, 6):
+        screen([random_formula(depth, rng) for _ in range(500)], rng)
+    for label, expression in PRUNED.items():
+        prune_case(label, expression, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Measure evaluate and Compiler.simplify on large expressions with 1..N worker
+processes. The expressions are sums of parenthesized groups, the shape that
+splits into independent subtrees, and one flat a + b + c + ... chain, which
+never splits (see src.parallel.plan) and shows about 1x at every count.
+
+Speedups need as many free cores as workers; on a single core the extra
+workers only add the cost of pickling subtrees.
+
+Run from the repository root:
+    python -m benchmarks.bench_parallel [max_workers]
+"""
+import os
+import sys
+import time
+from src.parser import tokenize
+from src.tree import ExpressionTree
+from src.compiler import Compiler
+from src.evaluator import evaluate
+from benchmarks.bench_scaling import wide_sum
+
+
+def grouped_sum(groups: int, terms: int) -> str:
+    """
+    (x*2 + 3 - ...) + (x*2 + 3 - ...) + ... with `groups` groups of `terms` terms.
+    """
+    group = f"({wide_sum(terms)})"
+    return " + ".join([group] * groups)
+
+
+def same_tree(a: ExpressionTree, b: ExpressionTree) -> bool:
+    # Both are compacted in post-order, so equal DAGs have equal arrays
+    return (
+        a.ops == b.ops and a.left == b.left and a.right == b.right
+        and all(a.value(i) == b.value(i) for i in range(len(a)))
+    )
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1
+    context = {"x": 2, "y": 3}
+    print(f"{'shape':>8} {'terms':>9} {'workers':>8} {'evaluate':>10} {'speedup':>8} {'simplify':>10} {'speedup':>8}")
+    cases = (
+        ("grouped", 32 * 2_000, grouped_sum(32, 2_000)),
+        ("grouped", 64 * 4_000, grouped_sum(64, 4_000)),
+        ("flat", 64_000, wide_sum(64_000)),
+    )
+    for shape, size, text in cases:
+        tree = ExpressionTree.from_tokens(tokenize(text))
+        expected_value, serial_evaluate = timed(evaluate, tree, context)
+        expected_tree, serial_simplify = timed(Compiler.simplify, tree)
+        for workers in range(1, max_workers + 1):
+            # The first call starts the pool; time a second, warm one
+            evaluate(tree, context, workers=workers)
+            value, evaluate_time = timed(evaluate, tree, context, workers=workers)
+            simplified, simplify_time = timed(Compiler.simplify, tree, workers=workers)
+            assert value == expected_value
+            assert same_tree(simplified, expected_tree)
+            print(
+                f"{shape:>8} {size:>9} {workers:>8} "
+                f"{evaluate_time * 1e3:>8.0f}ms {serial_evaluate / evaluate_time:>7.2f}x "
+                f"{simplify_time * 1e3:>8.0f}ms {serial_simplify / simplify_time:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Compare simplify with the polynomial normal form (Compiler.canonicalize) on
+large sums of monomials whose factors appear in arbitrary order, and on sums
+of distinct function calls, each of which is an opaque atom of its own.
+
+Run from the repository root:
+    python -m benchmarks.bench_polynomial
+"""
+import random
+import time
+import timeit
+from src.parser import tokenize, parse_expression
+from src.compiler import Compiler
+from src.evaluator import evaluate
+from benchmarks.bench_cse import count_unique
+
+FACTORS = ["x", "x^2", "y", "y^2", "z", "x*y"]
+
+
+def shuffled_monomials(terms: int, rng: random.Random) -> str:
+    """
+    Monomials such as 3*x^2*y + 5*y*x^2 - ...: few distinct monomials, each
+    written many times with its factors in a different order.
+    """
+    parts = []
+    for i in range(terms):
+        factors = rng.sample(FACTORS, rng.randint(1, 3))
+        term = "*".join([str(rng.randint(1, 9))] + factors)
+        parts.append(term if i == 0 else f"{rng.choice('+-')} {term}")
+    return " ".join(parts)
+
+
+def distinct_calls(terms: int, rng: random.Random) -> str:
+    """
+    Calls such as 3*sin(y + x*17) that no two terms share, so canonicalize
+    keeps one opaque atom per term.
+    """
+    return " + ".join(f"{rng.randint(1, 9)}*sin(y + x*{i})" for i in range(terms))
+
+
+def run_case(terms: int, rng: random.Random, generate=shuffled_monomials):
+    context = {"x": 1.5, "y": 2.5, "z": 0.5}
+    tree = parse_expression(tokenize(generate(terms, rng)))
+
+    start = time.perf_counter()
+    simplified = Compiler.simplify(tree)
+    simplify_time = time.perf_counter() - start
+    start = time.perf_counter()
+    canonical = Compiler.canonicalize(tree)
+    canonicalize_time = time.perf_counter() - start
+
+    simplified_eval = min(timeit.repeat(lambda: evaluate(simplified, context), number=3, repeat=3)) / 3
+    canonical_eval = min(timeit.repeat(lambda: evaluate(canonical, context), number=3, repeat=3)) / 3
+
+    print(
+        f"{generate.__name__:<18} {terms:>7} terms | simplify {simplify_time:6.2f} s -> {count_unique(simplified):>8} nodes, "
+        f"evaluate {simplified_eval * 1e3:8.2f} ms | "
+        f"canonicalize {canonicalize_time:6.2f} s -> {count_unique(canonical):>6} nodes, "
+        f"evaluate {canonical_eval * 1e3:6.3f} ms"
+    )
+
+
+def main():
+    rng = random.Random(1234)
+    for terms in (1_000, 10_000, 50_000):
+        run_case(terms, rng)
+    for terms in (1_000, 4_000, 16_000):
+        run_case(terms, rng, distinct_calls)
+
+
+if __name__ == "__main__":
+    main()
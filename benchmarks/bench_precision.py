@@ -0,0 +1,97 @@
+"""
+Digits against time for the decimal precision backend: the constants,
+each function, Decimal's own ln and exp for comparison, and a whole
+expression over 100,000-digit integers that float evaluation cannot handle.
+Every value is checked against mpmath, where it is installed, to within
+one unit in the last requested digit.
+
+Run from the repository root:
+    python -m benchmarks.bench_precision
+"""
+import sys
+import time
+from decimal import Decimal, localcontext
+from src.parser import tokenize, parse_expression
+from src.evaluator import evaluate
+from src.precision import constant, precision_context, precise_function
+
+try:
+    import mpmath
+except ImportError:  # mpmath is only needed for the accuracy check
+    mpmath = None
+
+DIGITS = (50, 500, 5_000, 20_000)
+# Decimal.ln and Decimal.exp take seconds beyond this many digits
+MAX_BUILTIN_DIGITS = 5_000
+ARGUMENT = Decimal("1.2345")
+
+
+def check_accuracy(name: str, value: Decimal, digits: int):
+    """
+    Assert that `value` agrees with mpmath's `name` (of ARGUMENT for the
+    functions) to within one unit in the last of `digits` digits. sin, cos
+    and tan are checked relative to 1, as _sin_cos promises.
+    """
+    if mpmath is None:
+        return
+    with mpmath.workdps(digits + 20):
+        if name in ("pi", "e"):
+            reference = +getattr(mpmath, name)
+        else:
+            reference = getattr(mpmath, "ln" if name == "log" else name)(mpmath.mpf(str(ARGUMENT)))
+        scale = 1 if name in ("sin", "cos", "tan") else abs(reference)
+        error = abs(mpmath.mpf(str(value)) - reference)
+        assert error <= scale * mpmath.mpf(10) ** (1 - digits), (name, digits, error)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def function_row(digits: int):
+    cells = []
+    for name in ("pi", "e"):
+        value, elapsed = timed(constant, name, digits)
+        check_accuracy(name, value, digits)
+        _, cached = timed(constant, name, digits)
+        cells.append(f"{name} {elapsed * 1e3:8.1f} ms (cached {cached * 1e6:.0f} us)")
+    with localcontext(precision_context(digits)):
+        for name in ("sin", "cos", "tan", "log", "exp", "sqrt"):
+            value, elapsed = timed(precise_function, name, ARGUMENT, False)
+            check_accuracy(name, value, digits)
+            cells.append(f"{name} {elapsed * 1e3:8.1f} ms")
+            if name in ("log", "exp") and digits <= MAX_BUILTIN_DIGITS:
+                builtin = ARGUMENT.ln if name == "log" else ARGUMENT.exp
+                reference, builtin_elapsed = timed(builtin)
+                assert value == reference, (name, digits)
+                cells.append(f"(Decimal.{builtin.__name__} {builtin_elapsed * 1e3:.1f} ms)")
+    print(f"{digits:>6} digits: " + "  ".join(cells))
+
+
+def huge_operands():
+    # x has 100,001 digits: floats overflow converting it, decimals do not
+    context = {"x": 10 ** 100_000 + 12345, "y": 7 ** 5_000}
+    node = parse_expression(tokenize("log(x) * sqrt(y) / exp(sin(x) + 2) + cos(x / y)"))
+    try:
+        evaluate(node, context)
+    except OverflowError as error:
+        print(f"float evaluation: OverflowError: {error}")
+    for digits in (30, 300, 3_000):
+        result, elapsed = timed(evaluate, node, context, True, False, None, 1, digits)
+        print(f"precision {digits:>5}: {elapsed * 1e3:8.1f} ms  {str(result)[:40]}...")
+
+
+def main():
+    # mpmath reads the values back from their digit strings
+    sys.set_int_max_str_digits(0)
+    if mpmath is None:
+        print("mpmath is not installed; accuracy is not checked")
+    for digits in DIGITS:
+        function_row(digits)
+    huge_operands()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Show that tokenizing, parsing and every tree pass scale linearly with input
+size, including inputs far deeper than the interpreter's recursion limit.
+
+Run from the repository root:
+    python -m benchmarks.bench_scaling [max_tokens]
+"""
+import sys
+import time
+import tracemalloc
+from src.parser import tokenize, parse_expression
+from src.compiler import Compiler
+from src.evaluator import evaluate
+from src.bytecode import execute
+
+
+def wide_sum(terms: int) -> str:
+    """
+    x*2 + 3 - y/4 + x*5 - ... with roughly four tokens per term.
+    """
+    parts = ["x"]
+    for i in range(1, terms):
+        if i % 3 == 0:
+            parts.append(f"+ x*{i % 9 + 1}")
+        elif i % 3 == 1:
+            parts.append(f"- y/{i % 7 + 1}")
+        else:
+            parts.append(f"+ {i % 5}")
+    return " ".join(parts)
+
+
+def nested_parentheses(depth: int) -> str:
+    """
+    (1 + (2 * (3 - (... x)))) nested `depth` levels deep.
+    """
+    operators = ("+", "*", "-")
+    opening = "".join(f"({i % 9 + 1} {operators[i % 3]} " for i in range(depth))
+    return opening + "x" + ")" * depth
+
+
+def unary_chain(length: int) -> str:
+    """
+    - - - ... x, a long right-nested chain of unary minus.
+    """
+    return "- " * length + "x"
+
+
+def measure(label: str, expression: str):
+    context = {"x": 3, "y": 2}
+
+    start = time.perf_counter()
+    tokens = tokenize(expression)
+    tokenize_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tree = parse_expression(tokens)
+    parse_time = time.perf_counter() - start
+
+    # Parse a second time under tracemalloc, which is too slow to time alongside
+    tracemalloc.start()
+    parse_expression(tokens)
+    parse_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    simplified = Compiler.simplify(tree)
+    simplify_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    evaluate(simplified, context)
+    evaluate_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    execute(Compiler.compile(simplified), context)
+    vm_time = time.perf_counter() - start
+
+    # The IR indents every line by its depth, so its output (not the walk) is
+    # quadratic for chain-shaped trees; only time it on moderate inputs
+    ir_time = float("nan")
+    if len(tokens) <= 100_000:
+        start = time.perf_counter()
+        Compiler.generate_intermediate_representation(simplified)
+        ir_time = time.perf_counter() - start
+
+    per_token = 1e6 / len(tokens)
+    print(
+        f"{label:<8} {len(tokens):>9} tokens | us/token: "
+        f"tokenize {tokenize_time * per_token:5.2f}  parse {parse_time * per_token:5.2f}  "
+        f"simplify {simplify_time * per_token:5.2f}  evaluate {evaluate_time * per_token:5.2f}  "
+        f"compile+run {vm_time * per_token:5.2f}  ir {ir_time * per_token:5.2f} | "
+        f"parse peak {parse_peak / len(tokens):6.1f} B/token"
+    )
+
+
+def main():
+    max_tokens = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    sizes = [size for size in (10_000, 100_000, 1_000_000) if size <= max_tokens]
+
+    for size in sizes:
+        measure("wide", wide_sum(size // 4))
+    for size in sizes:
+        measure("nested", nested_parentheses(size // 5))
+    for size in sizes:
+        measure("unary", unary_chain(size))
+
+
+if __name__ == "__main__":
+    main()
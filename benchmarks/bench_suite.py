@@ -0,0 +1,364 @@
+"""
+Reproducible benchmark suite for the performance claims in the README:
+seeded generators for wide sums, deep nesting, big-int literals, trig-heavy
+and variable-heavy inputs; tokenize, parse, simplify and evaluate timed
+separately, with peak memory; the same inputs through SymPy when it is
+installed; and JSON results, which a later run can compare against.
+
+Run from the repository root:
+    python -m benchmarks.bench_suite [--quick] [--output results.json] [--baseline old.json]
+"""
+import argparse
+import json
+import keyword
+import math
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from src.parser import tokenize, parse_expression
+from src.compiler import Compiler
+from src.evaluator import evaluate, FUNCTION_NAMES, CONSTANT_NAMES
+from benchmarks.bench_cse import count_nodes
+
+try:
+    import sympy
+except ImportError:  # SymPy is only needed for the comparison
+    sympy = None
+
+STAGES = ("tokenize", "parse", "simplify", "evaluate")
+# A stage this much slower than in the baseline is reported as a regression
+REGRESSION_RATIO = 1.25
+# sympify is quadratic in the number of terms (over four minutes for
+# 10,000 distinct variables); larger inputs are not run through SymPy
+MAX_SYMPY_TOKENS = 20_000
+# sympy.simplify is slower still; larger inputs only time sympify
+MAX_SYMPY_SIMPLIFY_TOKENS = 2_000
+
+
+def wide_sum(size: int, rng: random.Random) -> str:
+    """
+    A sum of `size` terms: multiples and quotients of x and y, and constants.
+    """
+    terms = []
+    for _ in range(size):
+        kind = rng.random()
+        if kind < 0.4:
+            terms.append(f"{rng.randint(1, 99)}*x")
+        elif kind < 0.7:
+            terms.append(f"y/{rng.randint(1, 9)}")
+        else:
+            terms.append(str(rng.randint(0, 999)))
+    return "".join(f" {rng.choice('+-')} {term}" if i else term for i, term in enumerate(terms))
+
+
+def deep_nesting(size: int, rng: random.Random) -> str:
+    """
+    Parentheses nested `size` levels deep, each level one operator and operand.
+    """
+    opening = []
+    for _ in range(size):
+        operand = rng.choice(["x", "y", str(rng.randint(1, 9))])
+        opening.append(f"({operand} {rng.choice('+-*')} ")
+    return "".join(opening) + "x" + ")" * size
+
+
+def big_integers(size: int, rng: random.Random) -> str:
+    """
+    Products, sums and integer quotients of four literals of `size` digits.
+    """
+    a, b, c, d = (str(rng.randint(1, 9)) + "".join(rng.choices("0123456789", k=size - 1)) for _ in range(4))
+    return f"{a} * {b} + {c} - {d} // 7 + x * {a}"
+
+
+def trig_heavy(size: int, rng: random.Random) -> str:
+    """
+    A sum of `size` trigonometric terms, some nested and some constant.
+    """
+    terms = []
+    for _ in range(size):
+        outer = rng.choice(["sin", "cos"])
+        argument = rng.choice(["x", "y", f"{rng.randint(1, 9)}*x", f"sin({rng.randint(1, 89)})", f"cos(y + {rng.randint(1, 9)})"])
+        terms.append(f"{rng.randint(1, 9)}*{outer}({argument})")
+    return " + ".join(terms)
+
+
+def variable_names(count: int) -> list:
+    """
+    `count` distinct alphabetic names that are neither functions nor
+    constants, nor Python keywords, which sympify cannot parse.
+    """
+    names = []
+    length = 1
+    while len(names) < count:
+        for number in range(26 ** length):
+            name = "".join(chr(97 + number // 26 ** i % 26) for i in reversed(range(length)))
+            if name not in FUNCTION_NAMES and name not in CONSTANT_NAMES and not keyword.iskeyword(name):
+                names.append(name)
+                if len(names) == count:
+                    break
+        length += 1
+    return names
+
+
+def variable_heavy(size: int, rng: random.Random) -> str:
+    """
+    A sum of `size` terms over up to 1,000 distinct variables.
+    """
+    names = variable_names(min(size, 1_000))
+    terms = (f"{rng.randint(1, 9)}*{rng.choice(names)}" for _ in range(size))
+    return " + ".join(terms)
+
+
+# Name: (generator, full sizes, quick sizes)
+CASES = {
+    "wide": (wide_sum, (1_000, 10_000, 100_000), (1_000, 10_000)),
+    "nested": (deep_nesting, (1_000, 10_000, 100_000), (1_000, 10_000)),
+    "bigint": (big_integers, (1_000, 10_000, 100_000), (1_000, 10_000)),
+    "trig": (trig_heavy, (1_000, 10_000, 50_000), (1_000, 5_000)),
+    "variables": (variable_heavy, (1_000, 10_000, 100_000), (1_000, 10_000)),
+}
+
+
+def context_for(expression: str, rng: random.Random) -> dict:
+    names = {
+        token for token in tokenize(expression)
+        if token.isalpha() and token not in FUNCTION_NAMES and token not in CONSTANT_NAMES
+    }
+    return {name: rng.randint(1, 9) for name in sorted(names)}
+
+
+def best_of(repeat: int, function, *args):
+    """
+    The result of one call and the fastest of `repeat` timings.
+    """
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def digit_count(value) -> int:
+    if isinstance(value, int):
+        # str() of huge ints is quadratic and capped by sys.set_int_max_str_digits
+        return max(1, math.floor(abs(value).bit_length() * math.log10(2)) + 1) if value else 1
+    return len(repr(value))
+
+
+def run_stages(expression: str, context: dict, repeat: int) -> dict:
+    tokens, tokenize_time = best_of(repeat, tokenize, expression)
+    tree, parse_time = best_of(repeat, parse_expression, tokens)
+    simplified, simplify_time = best_of(repeat, Compiler.simplify, tree)
+    value, evaluate_time = best_of(repeat, evaluate, simplified, context)
+
+    # Peak memory of one pass through every stage, measured apart from the
+    # timings because tracemalloc slows allocation down severalfold
+    tracemalloc.start()
+    evaluate(Compiler.simplify(parse_expression(tokenize(expression))), context)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "tokens": len(tokens),
+        "nodes": count_nodes(tree),
+        "simplified_nodes": count_nodes(simplified),
+        "seconds": dict(zip(STAGES, (tokenize_time, parse_time, simplify_time, evaluate_time))),
+        "peak_bytes": peak,
+        "result_digits": digit_count(value),
+        "value": value,
+    }
+
+
+def run_sympy(expression: str, context: dict, tokens: int) -> dict:
+    """
+    SymPy's time to parse and canonicalize the expression (sympify), to
+    simplify it when it is small enough, and to substitute and evaluate it.
+    Only timings are compared: sympy's trigonometry is in radians.
+    """
+    source = expression.replace("^", "**")
+    # Names like 're' or 'li' are functions to sympify unless declared
+    symbols = {name: sympy.Symbol(name) for name in context}
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, 100_000))
+    try:
+        start = time.perf_counter()
+        expr = sympy.sympify(source, locals=symbols)
+        sympify_time = time.perf_counter() - start
+    except (RecursionError, MemoryError, ValueError, sympy.SympifyError) as error:
+        # Python's own parser, which sympify uses, rejects deep nesting
+        return {"error": type(error).__name__}
+    finally:
+        sys.setrecursionlimit(limit)
+
+    simplify_time = None
+    if tokens <= MAX_SYMPY_SIMPLIFY_TOKENS:
+        start = time.perf_counter()
+        sympy.simplify(expr)
+        simplify_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # evalf(subs=...) is far slower than substituting first
+    expr.xreplace({symbols[name]: value for name, value in context.items()}).evalf()
+    evaluate_time = time.perf_counter() - start
+    return {"seconds": {"sympify": sympify_time, "simplify": simplify_time, "evaluate": evaluate_time}}
+
+
+def check_claims(results: list) -> list:
+    """
+    Each README claim with what this run measured and whether it holds.
+    """
+    claims = []
+
+    wide = [r for r in results if r["case"] == "wide" and r["size"] >= 100_000]
+    if wide:
+        seconds = wide[0]["seconds"]
+        # The claim is read as evaluation alone; the whole pipeline is reported too
+        claims.append({
+            "claim": "100,000+ terms evaluated in under 0.5 seconds",
+            "measured": (
+                f"{wide[0]['size']:,} terms: evaluate {seconds['evaluate']:.3f} s, "
+                f"tokenize to evaluate {sum(seconds.values()):.3f} s"
+            ),
+            "holds": seconds["evaluate"] < 0.5,
+        })
+
+    big = [r for r in results if r["case"] == "bigint" and r["size"] >= 100_000]
+    if big:
+        total = sum(big[0]["seconds"].values())
+        claims.append({
+            "claim": "Handles numbers with 100,000+ digits",
+            "measured": f"{big[0]['size']:,}-digit literals, {big[0]['result_digits']:,}-digit result in {total:.3f} s",
+            "holds": big[0]["result_digits"] >= 100_000,
+        })
+
+    ratios = [
+        r["seconds"]["simplify"] / r["sympy"]["seconds"]["sympify"]
+        for r in results
+        if "seconds" in r.get("sympy", {}) and r["sympy"]["seconds"]["sympify"] > 0
+    ]
+    if ratios:
+        # Geometric mean over all cases and sizes SymPy handled
+        ratio = math.exp(sum(map(math.log, ratios)) / len(ratios))
+        claims.append({
+            "claim": "Simplifies large expressions 40% faster than traditional symbolic systems",
+            "measured": f"simplify takes {ratio:.1%} of sympify's time (geometric mean of {len(ratios)} inputs)",
+            "holds": ratio <= 0.6,
+        })
+    else:
+        claims.append({
+            "claim": "Simplifies large expressions 40% faster than traditional symbolic systems",
+            "measured": "not measured: SymPy is not installed",
+            "holds": None,
+        })
+    return claims
+
+
+def compare(results: list, baseline_path: str):
+    """
+    Print every stage that got more than REGRESSION_RATIO times slower than
+    in the baseline run.
+    """
+    with open(baseline_path) as file:
+        baseline = {(r["case"], r["size"]): r for r in json.load(file)["results"]}
+    regressions = 0
+    for result in results:
+        old = baseline.get((result["case"], result["size"]))
+        if old is None:
+            continue
+        for stage in STAGES:
+            before, after = old["seconds"][stage], result["seconds"][stage]
+            if before > 0 and after / before > REGRESSION_RATIO:
+                regressions += 1
+                print(f"REGRESSION {result['case']} {result['size']:,} {stage}: {before * 1e3:.2f} -> {after * 1e3:.2f} ms")
+    print(f"{regressions} regressions against {baseline_path}")
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--repeat", type=int, default=3, help="timings per stage; the fastest is kept")
+    parser.add_argument("--quick", action="store_true", help="smaller inputs; skips the 100,000-term claims")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--no-sympy", action="store_true", help="skip the SymPy comparison")
+    parser.add_argument("--sympy-max-tokens", type=int, default=MAX_SYMPY_TOKENS, help="larger inputs skip SymPy")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against the JSON results of an earlier run")
+    args = parser.parse_args()
+    # As in src.cli: literals of 100,000+ digits are the point of one case
+    sys.set_int_max_str_digits(0)
+
+    use_sympy = sympy is not None and not args.no_sympy
+    if sympy is None and not args.no_sympy:
+        print("SymPy is not installed; skipping the comparison. Install it with 'pip install sympy'.")
+
+    results = []
+    for name in args.cases:
+        generator, sizes, quick_sizes = CASES[name]
+        for size in quick_sizes if args.quick else sizes:
+            # Every input has its own seed, so adding cases does not change the others
+            rng = random.Random(f"{args.seed}-{name}-{size}")
+            expression = generator(size, rng)
+            context = context_for(expression, rng)
+            result = {"case": name, "size": size, **run_stages(expression, context, args.repeat)}
+            del result["value"]
+            if use_sympy and result["tokens"] <= args.sympy_max_tokens:
+                result["sympy"] = run_sympy(expression, context, result["tokens"])
+            results.append(result)
+
+            seconds = result["seconds"]
+            line = (
+                f"{name:<9} {size:>7,} {result['tokens']:>9,} tokens | ms: "
+                + "  ".join(f"{stage} {seconds[stage] * 1e3:8.2f}" for stage in STAGES)
+                + f" | peak {result['peak_bytes'] / 2 ** 20:7.1f} MiB"
+            )
+            if "seconds" in result.get("sympy", {}):
+                line += f" | sympify {result['sympy']['seconds']['sympify'] * 1e3:9.1f} ms"
+            elif "sympy" in result:
+                line += f" | sympify failed: {result['sympy']['error']}"
+            print(line)
+
+    claims = check_claims(results)
+    print()
+    for claim in claims:
+        status = {True: "HOLDS", False: "FAILS", None: "SKIPPED"}[claim["holds"]]
+        print(f"{status:<8} {claim['claim']}: {claim['measured']}")
+
+    if args.baseline:
+        print()
+        compare(results, args.baseline)
+
+    if args.output:
+        report = {
+            "meta": {
+                "seed": args.seed,
+                "repeat": args.repeat,
+                "quick": args.quick,
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "sympy": sympy.__version__ if use_sympy else None,
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            },
+            "results": results,
+            "claims": claims,
+        }
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Tokenizer throughput on multi-megabyte inputs: the original tokenize (NFKC,
+a pattern compiled per call and a second lowercasing loop) against the
+precompiled tokenize and the streaming scan, on ASCII text and on text that
+needs normalizing, plus parsing from strings and from typed tokens.
+
+Run from the repository root:
+    python -m benchmarks.bench_tokenizer
+"""
+import random
+import re
+import time
+import unicodedata
+from src.parser import tokenize, scan, parse_expression
+from benchmarks.bench_suite import wide_sum, trig_heavy, variable_heavy
+
+MEGABYTES = (1, 4)
+
+
+def original_tokenize(expression: str):
+    expression = unicodedata.normalize("NFKC", expression).replace("\u00A0", " ").replace("\u200B", "").strip()
+    tokens = re.findall(r"(?:\d+(?:\.\d+)?)|(?:[a-zA-Z_][a-zA-Z_0-9]*)|//|[+\-*/^%!()]", expression)
+    return [token.lower() if token.isalpha() else token for token in tokens]
+
+
+def make_input(megabytes: int, rng: random.Random) -> str:
+    parts = []
+    size = 0
+    generators = (wide_sum, trig_heavy, variable_heavy)
+    while size < megabytes * 1_000_000:
+        part = generators[len(parts) % 3](2_000, rng)
+        parts.append(part)
+        size += len(part) + 3
+    return " + ".join(parts)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    rng = random.Random(11)
+    for megabytes in MEGABYTES:
+        ascii_text = make_input(megabytes, rng)
+        # Non-breaking spaces make every tokenizer normalize the text
+        unicode_text = ascii_text.replace(" + ", "\u00A0+ ")
+        for label, text in (("ascii", ascii_text), ("unicode", unicode_text)):
+            size = len(text.encode()) / 1e6
+            reference, original_time = timed(original_tokenize, text)
+            tokens, tokenize_time = timed(tokenize, text)
+            typed, scan_time = timed(lambda: list(scan(text)))
+            assert tokens == reference == [token.value for token in typed]
+            print(
+                f"{size:5.1f} MB {label:<7} {len(tokens):>9,} tokens | MB/s: "
+                f"original {size / original_time:6.1f}  tokenize {size / tokenize_time:6.1f}  "
+                f"scan {size / scan_time:6.1f}"
+            )
+        _, strings_time = timed(parse_expression, tokens)
+        _, typed_time = timed(parse_expression, typed)
+        print(f"{'':18} parse from strings {strings_time:.2f} s, from Tokens {typed_time:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compare the memory footprint and garbage-collection cost of a Node object tree
+against the struct-of-arrays ExpressionTree for large expressions.
+
+Run from the repository root:
+    python -m benchmarks.bench_tree_memory [terms]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+from src.parser import tokenize, parse_expression
+from src.tree import ExpressionTree
+from src.compiler import Compiler
+from src.evaluator import evaluate
+from benchmarks.bench_scaling import wide_sum
+
+
+class DictNode:
+    """
+    Node as it was before __slots__: one __dict__ per instance.
+    """
+    def __init__(self, value, left=None, right=None):
+        self.value = value
+        self.left = left
+        self.right = right
+
+
+def measure(label: str, build):
+    # Time the build without tracemalloc, which slows allocation down heavily
+    gc.collect()
+    start = time.perf_counter()
+    tree = build()
+    build_time = time.perf_counter() - start
+
+    # A full collection has to traverse every container object that is alive
+    start = time.perf_counter()
+    gc.collect()
+    gc_time = time.perf_counter() - start
+    del tree
+
+    gc.collect()
+    tracemalloc.start()
+    tree = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{label:<22} retained {current / 2**20:8.2f} MiB  peak {peak / 2**20:8.2f} MiB  "
+        f"build {build_time * 1e3:8.1f} ms  gc.collect {gc_time * 1e3:7.2f} ms"
+    )
+    return tree
+
+
+def main():
+    terms = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    tokens = tokenize(wide_sum(terms))
+    print(f"{terms} terms, {len(tokens)} tokens")
+
+    measure("Node with __dict__", lambda: parse_expression(tokens, make=DictNode))
+    measure("Node with __slots__", lambda: parse_expression(tokens))
+    measure("ExpressionTree", lambda: ExpressionTree.from_tokens(tokens))
+
+    node_tree = parse_expression(tokens)
+    flat_tree = ExpressionTree.from_tokens(tokens)
+    print(f"ExpressionTree node arrays: {flat_tree.nbytes() / 2**20:.2f} MiB for {len(flat_tree)} nodes")
+
+    context = {"x": 3, "y": 2}
+    for label, tree in (("Node", node_tree), ("ExpressionTree", flat_tree)):
+        start = time.perf_counter()
+        simplified = Compiler.simplify(tree)
+        simplify_time = time.perf_counter() - start
+        start = time.perf_counter()
+        evaluate(simplified, context)
+        evaluate_time = time.perf_counter() - start
+        print(f"{label:<22} simplify {simplify_time * 1e3:8.1f} ms  evaluate {evaluate_time * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Rendering large parse trees: DOT source for every node, as the app used to
+build it, against the collapsed rendering, and a TreeRenderer cache hit for
+a rerun with the same tree, of which only the submit call is on the request
+path. Graphviz layout in the browser, which grows much faster than linearly,
+is what the collapsed rendering really saves; the DOT size shows how much
+less it has to lay out.
+
+Run from the repository root:
+    python -m benchmarks.bench_visualization
+"""
+import random
+import time
+from src.parser import tokenize, parse_expression
+from src.visualization import TreeRenderer
+from benchmarks.bench_cse import count_nodes
+
+
+def random_expression(depth: int, rng: random.Random) -> str:
+    if depth == 0 or rng.random() < 0.05:
+        return rng.choice(["x", "y", "2", "3.5"])
+    if rng.random() < 0.1:
+        return f"sin({random_expression(depth - 1, rng)})"
+    operator = rng.choice(["+", "-", "*", "/"])
+    return f"({random_expression(depth - 1, rng)} {operator} {random_expression(depth - 1, rng)})"
+
+
+def full_dot(node) -> str:
+    lines = ["digraph {"]
+    stack = [(node, None)]
+    while stack:
+        current, parent = stack.pop()
+        if current is None:
+            continue
+        name = str(id(current))
+        lines.append(f'\t{name} [label="{current.value}"]')
+        if parent is not None:
+            lines.append(f"\t{parent} -> {name}")
+        stack.append((current.right, name))
+        stack.append((current.left, name))
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def main():
+    rng = random.Random(7)
+    renderer = TreeRenderer()
+    for depth in (10, 13, 16):
+        node = parse_expression(tokenize(random_expression(depth, rng)))
+
+        start = time.perf_counter()
+        source = full_dot(node)
+        full_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rendering = renderer.render(node)
+        first_time = time.perf_counter() - start
+        start = time.perf_counter()
+        future = renderer.submit(node)
+        submit_time = time.perf_counter() - start
+        assert future.result() is rendering
+        cached_time = time.perf_counter() - start
+
+        print(
+            f"{count_nodes(node):>7,} nodes: full DOT {full_time * 1e3:7.1f} ms ({len(source) / 1e3:,.0f} kB), "
+            f"collapsed {first_time * 1e3:6.1f} ms ({len(rendering.source) / 1e3:.0f} kB, "
+            f"{rendering.visible} drawn, {len(rendering.collapsed)} placeholders), "
+            f"cached {cached_time * 1e3:.2f} ms (submit {submit_time * 1e6:.0f} us)"
+        )
+    renderer.close()
+
+
+if __name__ == "__main__":
+    main()
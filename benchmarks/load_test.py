@@ -0,0 +1,154 @@
+"""
+Load test for the evaluation server (src/server.py): keep-alive clients send
+a seeded mix of light expressions, repeated often enough that concurrent
+duplicates get coalesced, and heavy ones such as 99999! that hit the time
+and digit budgets. Reports throughput, p50/p99 latency for light and heavy
+requests separately (heavy ones should not slow the light ones down much)
+and the status codes seen.
+
+Run from the repository root; a server is started on a free port unless
+--url points at a running one:
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --url http://127.0.0.1:8080 --connections 64
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+LIGHT = (
+    "2+3*x", "(x+y)^2 - x*y", "sin(x)^2 + cos(x)^2", "sqrt(x^2 + y^2)", "log(x) + exp(y/10)",
+    "x! / (y! * (x-y)!)", "1/3 + 1/6 + x/2", "tan(45) * x - y", "(x - 1)*(x + 1) - x^2", "2^64 + x",
+)
+HEAVY = ("99999!", "9^(9^9)", "50000! / 49999!", "+".join(["x*y"] * 50_000))
+
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def make_requests(count: int, heavy_ratio: float, rng: random.Random) -> list:
+    """
+    (kind, JSON body) pairs; light expressions draw their variables from a
+    small range so identical requests recur.
+    """
+    requests = []
+    for _ in range(count):
+        if rng.random() < heavy_ratio:
+            kind, expression = "heavy", rng.choice(HEAVY)
+        else:
+            kind, expression = "light", rng.choice(LIGHT)
+        variables = {"x": rng.randint(5, 12), "y": rng.randint(1, 4)}
+        requests.append((kind, json.dumps({"expression": expression, "variables": variables}).encode()))
+    return requests
+
+
+async def post(reader, writer, host: str, body: bytes) -> int:
+    writer.write(
+        f"POST /evaluate HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+    status = int(head[0].split(" ", 2)[1])
+    length = 0
+    for line in head[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(host: str, port: int, queue: list, latencies: dict, statuses: dict):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while queue:
+            kind, body = queue.pop()
+            start = time.perf_counter()
+            status = await post(reader, writer, host, body)
+            latencies[kind].append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def fetch_metrics(host: str, port: int) -> str:
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET /metrics HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response.split(b"\r\n\r\n", 1)[1].decode()
+
+
+async def run(host: str, port: int, requests: list, connections: int):
+    # Popped from the end, so reversed to send them in order
+    queue = requests[::-1]
+    latencies = {"light": [], "heavy": []}
+    statuses = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, queue, latencies, statuses) for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+    return latencies, statuses, elapsed, await fetch_metrics(host, port)
+
+
+def start_server(args) -> tuple:
+    command = [sys.executable, "-m", "src.server", "--port", "0", "--timeout", str(args.timeout)]
+    if args.workers:
+        command += ["--workers", str(args.workers)]
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = server.stdout.readline()
+    if not line.startswith("Serving on "):
+        server.kill()
+        raise RuntimeError(f"Server did not start: {line!r}")
+    return server, line.split()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="server to test; by default one is started")
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--heavy-ratio", type=float, default=0.02, help="share of heavy requests")
+    parser.add_argument("--workers", type=int, help="worker processes of the started server")
+    parser.add_argument("--timeout", type=float, default=2.0, help="time budget of the started server")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server, url = start_server(args)
+    try:
+        parts = urlsplit(url)
+        requests = make_requests(args.requests, args.heavy_ratio, random.Random(args.seed))
+        latencies, statuses, elapsed, metrics = asyncio.run(
+            run(parts.hostname, parts.port, requests, args.connections)
+        )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print(f"{args.requests:,} requests over {args.connections} connections to {url}")
+    print(f"throughput: {args.requests / elapsed:,.0f} requests/s ({elapsed:.2f} s)")
+    for kind, values in latencies.items():
+        print(
+            f"{kind:<6} {len(values):>7,} requests  p50 {percentile(values, 0.5) * 1000:8.2f} ms  "
+            f"p99 {percentile(values, 0.99) * 1000:8.2f} ms"
+        )
+    print("statuses: " + ", ".join(f"{status}: {count:,}" for status, count in sorted(statuses.items())))
+    coalesced = [line.split()[-1] for line in metrics.splitlines() if line.startswith("expression_server_coalesced_total")]
+    print(f"coalesced: {coalesced[0] if coalesced else 0}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,15 @@
 import streamlit as st
-from concurrent.futures import ThreadPoolExecutor
-from src.parser import tokenize, parse_expression, Node
-from src.compiler import Compiler
+import streamlit.components.v1 as components
+from src.parser import Node, IncrementalParser
+from src.compiler import Compiler, IncrementalSimplifier, MAX_FOLD_DIGITS
 from src.evaluator import evaluate
-from graphviz import Digraph
+from src.cache import ExpressionCache
+from src.pipeline import evaluation_tree
+from src.visualization import TreeRenderer, Network
+from src.tracing import Tracer, LogExporter, PrometheusExporter, current_trace, record_simplification, record_value
+import concurrent.futures
 import math
-from typing import Set
+import os
 import logging
 
 # Configure logging
@@ -16,38 +20,85 @@ logging.basicConfig(
     level=logging.WARNING
 )
 
-def collect_variables(node: Node, variables: Set[str]):
+@st.cache_resource
+def expression_cache() -> ExpressionCache:
     """
-    Recursively collect all unique variables from the expression tree.
+    One cache per server process, shared by all sessions. Set
+    EXPRESSION_CACHE_PATH to keep it on disk across restarts.
     """
-    if node is None:
-        return
+    return ExpressionCache(max_entries=4096, path=os.environ.get("EXPRESSION_CACHE_PATH"))
 
-    if isinstance(node.value, str):
-        if node.value.isalpha() and node.value not in (
-            "sin", "cos", "tan", "log", "sqrt", "abs", "exp", "floor", "ceil", "pi", "e"
-        ):
-            variables.add(node.value)
+@st.cache_resource
+def tree_renderer() -> TreeRenderer:
+    """
+    One renderer per server process: renderings are shared by all sessions
+    and made off the request path.
+    """
+    return TreeRenderer()
 
-    collect_variables(node.left, variables)
-    collect_variables(node.right, variables)
+@st.cache_resource
+def stage_metrics() -> PrometheusExporter:
+    """
+    Stage timings and counts of every profiled request in this server process.
+    """
+    return PrometheusExporter()
 
-def create_tree_visualization(node: Node, graph=None, parent_id=None):
+def incremental_update(expression: str):
+    """
+    Tokens, parse tree, simplified tree and parse annotations for this
+    session's expression. Each session keeps its own IncrementalParser and
+    IncrementalSimplifier, so an edit to a long expression only re-parses
+    and re-simplifies the part it touched.
     """
-    Create a Graphviz visualization of the expression tree.
+    state = st.session_state
+    if "incremental_parser" not in state:
+        state.incremental_parser = IncrementalParser()
+        state.incremental_simplifier = IncrementalSimplifier(max_digits=MAX_FOLD_DIGITS)
+    trace = current_trace()
+    with trace.stage("parse"):
+        tree = state.incremental_parser.parse(expression)
+    tokens = state.incremental_parser.tokens
+    annotations = state.incremental_parser.annotations
+    trace.count("tokens", len(tokens))
+    trace.count("nodes", annotations.nodes)
+    with trace.stage("simplify"):
+        simplified = state.incremental_simplifier.simplify(tree)
+    record_simplification(trace, tree, simplified)
+    return tokens, tree, simplified, annotations
+
+def show_tree(node: Node, key: str):
     """
-    if graph is None:
-        graph = Digraph(format="png")
-        graph.attr(rankdir="TB")
-
-    if node is not None:
-        node_id = str(id(node))
-        graph.node(node_id, label=str(node.value))
-        if parent_id:
-            graph.edge(parent_id, node_id)
-        create_tree_visualization(node.left, graph, node_id)
-        create_tree_visualization(node.right, graph, node_id)
-    return graph
+    Draw a parse tree with its large or deep subtrees collapsed. Collapsed
+    subtrees can be expanded one level at a time; a tree that takes long to
+    render is shown on a later rerun instead of holding up this one.
+    """
+    expanded = st.session_state.get(f"{key}_expanded", [])
+    interactive = Network is not None and st.checkbox("Interactive view", key=f"{key}_interactive")
+    future = tree_renderer().submit(node, "html" if interactive else "dot", expanded)
+    try:
+        with current_trace().stage("render"):
+            rendering = future.result(timeout=1)
+    except concurrent.futures.TimeoutError:
+        st.info("The tree is still rendering; it will appear when the page next updates.")
+        return
+
+    if interactive:
+        components.html(rendering.source, height=620)
+    else:
+        st.graphviz_chart(rendering.source)
+    if rendering.collapsed:
+        st.caption(
+            f"Showing {rendering.visible:,} of {rendering.total:,} nodes; "
+            f"{len(rendering.collapsed)} subtrees are collapsed."
+        )
+        # A collapsed subtree is expanded by expanding its parent
+        parents = sorted({path[:-1] for path in rendering.collapsed} | set(expanded), key=lambda path: (len(path), path))
+        st.multiselect(
+            "Expand subtrees (paths from the root, L and R steps):",
+            parents,
+            format_func=lambda path: path or "root",
+            key=f"{key}_expanded",
+        )
 
 def main():
     # Page configuration
@@ -59,6 +110,14 @@ def main():
     angle_mode = st.sidebar.radio("Choose mode:", ("Degrees", "Radians"))
     use_degrees = (angle_mode == "Degrees")
 
+    st.sidebar.header("Simplification")
+    canonical = st.sidebar.checkbox("Collect like terms (polynomial normal form)", value=False)
+
+    st.sidebar.header("Precision")
+    precision = st.sidebar.number_input(
+        "Significant digits (0 for floats):", min_value=0, max_value=100_000, value=0, step=10
+    )
+
     st.sidebar.header("Features and Benchmarks")
     st.sidebar.markdown("""
 - **Arbitrary Precision**: Handles numbers with **100,000+ digits** effortlessly.
@@ -79,77 +138,106 @@ def main():
 4. **Evaluation**: Computes results with precision.
 """)
 
+    st.sidebar.header("Profiling")
+    profile = st.sidebar.checkbox("Profile stages", value=False)
+    # Traces go to the stage metrics and, at INFO level, to the log
+    tracer = Tracer(LogExporter(), stage_metrics(), enabled=profile)
+
     # Expression input
     expression = st.text_input("Enter a math expression:", "")
 
     if expression.strip():
-        try:
-            # Use concurrency for performance
-            with ThreadPoolExecutor() as executor:
-                future_tokens = executor.submit(tokenize, expression)
-                tokens = future_tokens.result()
-
-                future_parse = executor.submit(parse_expression, tokens)
-                tree = future_parse.result()
-
-                future_simplify = executor.submit(Compiler.simplify, tree)
-                simplified_tree = future_simplify.result()
-
-            # Collect variables
-            variables = set()
-            collect_variables(simplified_tree, variables)
-            context = {'pi': math.pi, 'e': math.e}
-
-            # Prompt for variable values if needed
-            if variables:
-                st.subheader("Detected Variables")
-                for var in sorted(variables):
-                    val_str = st.text_input(f"Value for '{var}':", key=f"var_{var}")
-                    if val_str.strip():
-                        try:
-                            context[var] = float(val_str) if '.' in val_str else int(val_str)
-                        except ValueError:
-                            st.warning(f"Invalid value for '{var}'. Defaulting to 0.")
-                            context[var] = 0
-
-            # Evaluate the expression
-            result = None  # Initialize result to handle uninitialized variable error
-            if not variables or all(var in context for var in variables):
-                try:
-                    result = evaluate(simplified_tree, context)
-                    st.success(f"**Result:** {result}")
-                except ValueError as ve:
-                    st.error(f"Evaluation Error: {ve}")
-                except Exception as e:
-                    st.error(f"Unexpected Evaluation Error: {e}")
-
-                # History management
-                if 'history' not in st.session_state:
-                    st.session_state.history = []
-                if result is not None and (expression, result) not in st.session_state.history:
-                    st.session_state.history.append((expression, result))
-
-            # Step-by-step breakdown
-            with st.expander("🔍 Show Step-by-Step Details"):
-                st.write("**1. Tokens**:")
-                st.code(tokens)
-
-                st.write("**2. Original Parse Tree**:")
-                graph_original = create_tree_visualization(tree)
-                st.graphviz_chart(graph_original.source)
-
-                st.write("**3. Simplified Parse Tree**:")
-                graph_simplified = create_tree_visualization(simplified_tree)
-                st.graphviz_chart(graph_simplified.source)
-
-                st.write("**4. Intermediate Representation**:")
-                ir = Compiler.generate_intermediate_representation(simplified_tree)
-                st.code(ir)
-
-        except ValueError as ve:
-            st.error(f"Parsing Error: {ve}")
-        except Exception as e:
-            st.error(f"Unexpected Error: {e}")
+        with tracer.trace() as trace:
+            try:
+                if canonical:
+                    # Tokens, parse tree and simplified tree come from the shared cache,
+                    # so reruns with an unchanged expression skip all three stages
+                    entry = expression_cache().get(expression, canonical=canonical)
+                    tokens, tree, simplified_tree, annotations = (
+                        entry.tokens, entry.tree, entry.simplified, entry.annotations
+                    )
+                else:
+                    # Edits re-parse and re-simplify only what they changed
+                    tokens, tree, simplified_tree, annotations = incremental_update(expression)
+
+                # Variables were recorded while parsing; constants and
+                # functions come from the registry
+                variables = annotations.variables
+                context = {'pi': math.pi, 'e': math.e}
+
+                # Prompt for variable values if needed
+                if variables:
+                    st.subheader("Detected Variables")
+                    for var in sorted(variables):
+                        val_str = st.text_input(f"Value for '{var}':", key=f"var_{var}")
+                        if val_str.strip():
+                            try:
+                                context[var] = float(val_str) if '.' in val_str else int(val_str)
+                            except ValueError:
+                                st.warning(f"Invalid value for '{var}'. Defaulting to 0.")
+                                context[var] = 0
+
+                # Evaluate the expression
+                result = None  # Initialize result to handle uninitialized variable error
+                if not variables or all(var in context for var in variables):
+                    try:
+                        with trace.stage("evaluate"):
+                            # 0 digits means floats
+                            digits = precision or None
+                            result = evaluate(
+                                evaluation_tree(tree, simplified_tree, digits), context,
+                                max_digits=MAX_FOLD_DIGITS, precision=digits,
+                            )
+                        record_value(trace, result)
+                        st.success(f"**Result:** {result}")
+                    except ValueError as ve:
+                        st.error(f"Evaluation Error: {ve}")
+                    except Exception as e:
+                        st.error(f"Unexpected Evaluation Error: {e}")
+
+                    # History management
+                    if 'history' not in st.session_state:
+                        st.session_state.history = []
+                    if result is not None and (expression, result) not in st.session_state.history:
+                        st.session_state.history.append((expression, result))
+
+                # Step-by-step breakdown
+                with st.expander("🔍 Show Step-by-Step Details"):
+                    st.write("**1. Tokens**:")
+                    st.code(tokens)
+
+                    st.write("**2. Original Parse Tree**:")
+                    show_tree(tree, "original_tree")
+
+                    st.write("**3. Simplified Parse Tree**:")
+                    show_tree(simplified_tree, "simplified_tree")
+
+                    st.write("**4. Intermediate Representation**:")
+                    ir = Compiler.generate_intermediate_representation(simplified_tree)
+                    st.code(ir)
+
+                    if trace.enabled:
+                        st.write("**5. Profile**:")
+                        st.table([
+                            {"stage": stage, "milliseconds": round(seconds * 1e3, 3)}
+                            for stage, seconds in trace.stages.items()
+                        ])
+                        st.table([{"measure": name, "value": value} for name, value in {**trace.counts, **trace.maxima}.items()])
+
+            except ValueError as ve:
+                st.error(f"Parsing Error: {ve}")
+            except Exception as e:
+                st.error(f"Unexpected Error: {e}")
+
+    stats = expression_cache().stats()
+    st.sidebar.caption(
+        f"Expression cache: {stats['size']} entries, {stats['hit_rate']:.0%} hit rate, "
+        f"{stats['evictions']} evictions"
+    )
+
+    if profile:
+        with st.sidebar.expander("Stage metrics (Prometheus)"):
+            st.code(stage_metrics().render())
 
     # Display history
     if 'history' in st.session_state and st.session_state.history:
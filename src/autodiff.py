@@ -0,0 +1,372 @@
+import math
+from src.parser import Node
+from src.tree import ExpressionTree
+from src.evaluator import (
+    FUNCTION_NAMES, CONSTANT_NAMES, BINARY_OPERATORS, apply_operator, apply_function, exact_number, check_digits,
+)
+from src.registry import ARGUMENT_SEPARATOR
+
+SEVERAL_ARGUMENTS_MESSAGE = "Derivatives of functions with several arguments are not supported."
+
+# Results that are piecewise constant: their derivative is 0 wherever it exists
+_STEP_OPERATIONS = ("//", "!", "floor", "ceil")
+
+
+def _tape(node) -> list:
+    """
+    Flatten a Node tree (or DAG) or an ExpressionTree into post-order
+    (value, left, right) entries whose children are entry indices, -1 when
+    absent. A shared node gets one entry.
+    """
+    if isinstance(node, ExpressionTree):
+        return [(node.value(i), node.left[i], node.right[i]) for i in range(len(node))]
+
+    tape = []
+    # Maps id(node) to its entry; every node stays reachable from `node`,
+    # so ids are stable
+    index_of = {}
+    stack = [(node, False)]
+    while stack:
+        current, visited = stack.pop()
+        if id(current) in index_of:
+            continue
+        if not visited:
+            stack.append((current, True))
+            if current.right is not None:
+                stack.append((current.right, False))
+            if current.left is not None:
+                stack.append((current.left, False))
+            continue
+        index_of[id(current)] = len(tape)
+        tape.append((
+            current.value,
+            -1 if current.left is None else index_of[id(current.left)],
+            -1 if current.right is None else index_of[id(current.right)],
+        ))
+    return tape
+
+
+def _partials(value, left_val, right_val, result, use_degrees: bool):
+    """
+    Partial derivatives of one operation with respect to its left and right
+    operands, given their values and the operation's result. Functions take
+    their argument on the left. Trigonometric functions in degree mode carry
+    the chain factor pi/180.
+    """
+    if value == "+":
+        return 1, 1
+    if value == "-":
+        return 1, -1
+    if value == "*":
+        return right_val, left_val
+    if value == "/":
+        return 1 / right_val, -left_val / (right_val * right_val)
+    if value == "%":
+        # l % r == l - r * (l // r), and l // r is piecewise constant
+        return 1, -(left_val // right_val)
+    if value == "^":
+        return _power_partials(left_val, right_val, result)
+    if value == ARGUMENT_SEPARATOR:
+        raise ValueError(SEVERAL_ARGUMENTS_MESSAGE)
+
+    factor = math.pi / 180 if use_degrees and value in ("sin", "cos", "tan") else 1
+    if value == "sin":
+        return factor * apply_function("cos", left_val, use_degrees), 0
+    if value == "cos":
+        return -factor * apply_function("sin", left_val, use_degrees), 0
+    if value == "tan":
+        return factor * (1 + result * result), 0
+    if value == "log":
+        return 1 / left_val, 0
+    if value == "sqrt":
+        if result == 0:
+            raise ValueError("Derivative of 'sqrt' is not defined at 0.")
+        return 1 / (2 * result), 0
+    if value == "abs":
+        if left_val == 0:
+            raise ValueError("Derivative of 'abs' is not defined at 0.")
+        return (1 if left_val > 0 else -1), 0
+    if value == "exp":
+        return result, 0
+    raise ValueError(f"Unsupported operation or variable: {value}")
+
+
+def _power_partials(base, exponent, result):
+    # d(b^x)/db = x * b^(x-1); d(b^x)/dx = b^x * log(b)
+    if exponent == 0:
+        base_partial = 0
+    elif base == 0 and exponent < 1:
+        raise ValueError("Derivative of '^' is not defined at a zero base.")
+    else:
+        base_partial = exponent * base ** (exponent - 1)
+    if base > 0:
+        exponent_partial = result * math.log(base)
+    elif base == 0 and exponent > 0:
+        # 0^x is 0 for every positive x
+        exponent_partial = 0
+    else:
+        exponent_partial = None
+    return base_partial, exponent_partial
+
+
+def gradient(
+    node,
+    context: dict = None,
+    variables=None,
+    use_degrees: bool = True,
+    max_digits: int = None,
+    mode: str = "reverse",
+):
+    """
+    Evaluate the expression and its gradient with automatic differentiation.
+
+    Returns (value, gradient) where `value` is what evaluate returns and
+    `gradient` maps each variable to the partial derivative of the
+    expression with respect to it.
+
+    Parameters:
+    - node: Node or ExpressionTree
+        The root of the expression tree, or a struct-of-arrays tree.
+    - context: dict
+        A dictionary mapping variable names to their numerical values.
+    - variables: iterable of str
+        The variables to differentiate with respect to; the others are held
+        constant. Defaults to every variable in the expression, in order of
+        first use.
+    - use_degrees: bool
+        If True, trigonometric functions interpret angles as degrees, and
+        their derivatives include the pi/180 chain factor.
+    - max_digits: int
+        As for evaluate.
+    - mode: str
+        "forward" carries the partial derivatives of every node with respect
+        to all variables along with its value, in one pass. "reverse"
+        records the local derivatives of every node while evaluating, then
+        accumulates the gradient in one backward pass over them; it costs
+        about the same however many variables there are.
+
+    Values and evaluation errors are those of evaluate. '//', '!', floor and
+    ceil are piecewise constant and contribute a zero derivative; '%'
+    differentiates as l - r * (l // r). Where the derivative is undefined
+    (sqrt or abs at 0, a zero base with an exponent below 1, a negative base
+    with a varying exponent), ValueError is raised.
+    """
+    if mode not in ("forward", "reverse"):
+        raise ValueError(f"Unknown differentiation mode: {mode}")
+    if context is None:
+        context = {}
+    tape = _tape(node) if node is not None else []
+    if not tape:
+        return 0, {name: 0 for name in variables or ()}
+
+    if variables is None:
+        names = [
+            value for value, left, right in tape
+            if value.__class__ is str and value.isalpha()
+            and value not in FUNCTION_NAMES and value not in CONSTANT_NAMES
+        ]
+        varying_names = dict.fromkeys(names)
+    else:
+        varying_names = dict.fromkeys(variables)
+    forward = mode == "forward"
+
+    values = [0] * len(tape)
+    # Forward mode: a dict of nonzero partials per entry. Reverse mode: the
+    # entry's local partials (left, right), or its name for a variable.
+    # None for entries that do not vary.
+    derivatives = [None] * len(tape)
+    for i, (value, left, right) in enumerate(tape):
+        left_val = values[left] if left >= 0 else 0
+        right_val = values[right] if right >= 0 else 0
+
+        if value.__class__ is str and value.isalpha() and value not in FUNCTION_NAMES:
+            if value in CONSTANT_NAMES:
+                values[i] = CONSTANT_NAMES[value]
+            elif value in context:
+                values[i] = context[value]
+                if value in varying_names:
+                    derivatives[i] = {value: 1} if forward else value
+            else:
+                raise ValueError(f"Variable '{value}' is not defined.")
+            continue
+        if not isinstance(value, str):
+            values[i] = value
+            continue
+
+        if value in FUNCTION_NAMES:
+            values[i] = result = apply_function(value, left_val, use_degrees)
+        elif value == "!":
+            argument = exact_number(left_val)
+            if not isinstance(argument, int) or argument < 0:
+                raise ValueError("Factorial is only defined for non-negative integers.")
+            if max_digits is not None:
+                check_digits("!", argument, None, max_digits)
+            values[i] = result = math.factorial(argument)
+        elif value in BINARY_OPERATORS:
+            if max_digits is not None:
+                check_digits(value, left_val, right_val, max_digits)
+            values[i] = result = apply_operator(value, left_val, right_val)
+        else:
+            raise ValueError(f"Unsupported operation or variable: {value}")
+
+        left_varies = left >= 0 and derivatives[left] is not None
+        right_varies = right >= 0 and derivatives[right] is not None and value not in FUNCTION_NAMES
+        if value in _STEP_OPERATIONS or not (left_varies or right_varies):
+            continue
+        left_partial, right_partial = _partials(value, left_val, right_val, result, use_degrees)
+        if right_varies and right_partial is None:
+            raise ValueError("Derivative of '^' is not defined for a negative base with a varying exponent.")
+
+        if not forward:
+            derivatives[i] = (left_partial if left_varies else 0, right_partial if right_varies else 0)
+            continue
+        tangent = {}
+        if left_varies:
+            for name, partial in derivatives[left].items():
+                tangent[name] = partial * left_partial
+        if right_varies:
+            for name, partial in derivatives[right].items():
+                tangent[name] = tangent.get(name, 0) + partial * right_partial
+        derivatives[i] = tangent
+
+    result = values[-1]
+    partials = {name: 0 for name in varying_names}
+    if forward:
+        partials.update(derivatives[-1] or {})
+        return result, partials
+
+    # Backward pass: adjoints flow from every entry to its operands; entries
+    # come after their operands, so each adjoint is complete when reached
+    adjoints = [0] * len(tape)
+    adjoints[-1] = 1
+    for i in range(len(tape) - 1, -1, -1):
+        local = derivatives[i]
+        adjoint = adjoints[i]
+        if local is None or adjoint == 0:
+            continue
+        if local.__class__ is str:
+            partials[local] += adjoint
+            continue
+        _, left, right = tape[i]
+        if left >= 0 and local[0]:
+            adjoints[left] += adjoint * local[0]
+        if right >= 0 and local[1]:
+            adjoints[right] += adjoint * local[1]
+    return result, partials
+
+
+def derivative(node: Node, variable: str, make=Node, use_degrees: bool = True) -> Node:
+    """
+    Build the symbolic derivative of the expression with respect to
+    `variable`, following the rules of gradient. The result shares the
+    unchanged subtrees of `node`; nodes are built with `make`.
+
+    Trigonometric functions are differentiated for the angle mode given by
+    use_degrees, so the derivative must be evaluated in that same mode.
+    """
+    # Derivative of every node by id, None standing for 0; the nodes stay
+    # reachable from `node`, so ids are stable
+    derivatives = {}
+    radians_factor = math.pi / 180 if use_degrees else None
+
+    def add(a, b):
+        if a is None:
+            return b
+        if b is None:
+            return a
+        return make("+", left=a, right=b)
+
+    def subtract(a, b):
+        if b is None:
+            return a
+        # A missing left operand is 0, so this is unary minus
+        return make("-", left=a, right=b)
+
+    def multiply(a, b):
+        if a is None or b is None:
+            return None
+        # Leave out factors of 1, which simplify keeps
+        if a.value.__class__ is int and a.value == 1 and a.left is None and a.right is None:
+            return b
+        if b.value.__class__ is int and b.value == 1 and b.left is None and b.right is None:
+            return a
+        return make("*", left=a, right=b)
+
+    def angle_factor(term):
+        return term if radians_factor is None else multiply(term, make(radians_factor))
+
+    stack = [(node, False)]
+    while stack:
+        current, visited = stack.pop()
+        if current is None or id(current) in derivatives:
+            continue
+        if not visited:
+            stack.append((current, True))
+            stack.append((current.right, False))
+            stack.append((current.left, False))
+            continue
+
+        value, left, right = current.value, current.left, current.right
+        left_d = derivatives.get(id(left)) if left is not None else None
+        right_d = derivatives.get(id(right)) if right is not None else None
+
+        if not isinstance(value, str) or value in CONSTANT_NAMES:
+            result = None
+        elif value.isalpha() and value not in FUNCTION_NAMES:
+            result = make(1) if value == variable else None
+        elif value in _STEP_OPERATIONS:
+            result = None
+        elif value == "+":
+            result = add(left_d, right_d)
+        elif value == "-":
+            result = subtract(left_d, right_d)
+        elif value == "*":
+            result = add(multiply(left, right_d), multiply(left_d, right))
+        elif value == "/":
+            numerator = subtract(multiply(left_d, right), multiply(left, right_d))
+            if numerator is None:
+                result = None
+            elif right_d is None:
+                result = make("/", left=left_d, right=right)
+            else:
+                result = make("/", left=numerator, right=make("^", left=right, right=make(2)))
+        elif value == "%":
+            result = subtract(left_d, multiply(make("//", left=left, right=right), right_d))
+        elif value == "^":
+            base_term = None
+            if left_d is not None:
+                power = make("^", left=left, right=make("-", left=right, right=make(1)))
+                base_term = multiply(multiply(right, power), left_d)
+            exponent_term = None
+            if right_d is not None:
+                exponent_term = multiply(multiply(current, make("log", left=left)), right_d)
+            result = add(base_term, exponent_term)
+        elif value == ARGUMENT_SEPARATOR:
+            if left_d is not None or right_d is not None:
+                raise ValueError(SEVERAL_ARGUMENTS_MESSAGE)
+            result = None
+        elif left_d is None:
+            # A function of a constant argument
+            result = None
+        elif value == "sin":
+            result = multiply(angle_factor(make("cos", left=left)), left_d)
+        elif value == "cos":
+            result = make("-", right=multiply(angle_factor(make("sin", left=left)), left_d))
+        elif value == "tan":
+            secant = make("^", left=make("cos", left=left), right=make(2))
+            result = make("/", left=angle_factor(left_d), right=secant)
+        elif value == "log":
+            result = make("/", left=left_d, right=left)
+        elif value == "sqrt":
+            result = make("/", left=left_d, right=make("*", left=make(2), right=current))
+        elif value == "abs":
+            # sign(x) as x / |x|, undefined at 0 as in gradient
+            result = multiply(make("/", left=left, right=current), left_d)
+        elif value == "exp":
+            result = multiply(current, left_d)
+        else:
+            raise ValueError(f"Unsupported operation or variable: {value}")
+        derivatives[id(current)] = result
+
+    result = derivatives[id(node)]
+    return make(0) if result is None else result
@@ -0,0 +1,245 @@
+import math
+from array import array
+from src.evaluator import apply_function, exact_divide, exact_power, exact_number, check_digits
+from src.registry import join_arguments
+
+# Opcodes understood by the stack machine
+LOAD_CONST = 0
+LOAD_VAR = 1
+ADD = 2
+SUB = 3
+MUL = 4
+DIV = 5
+MOD = 6
+POW = 7
+FLOORDIV = 8
+NEG = 9
+FACTORIAL = 10
+CALL = 11
+STORE_TEMP = 12
+LOAD_TEMP = 13
+ARGUMENTS = 14
+
+BINARY_OPCODES = {
+    "+": ADD,
+    "-": SUB,
+    "*": MUL,
+    "/": DIV,
+    "%": MOD,
+    "^": POW,
+    "//": FLOORDIV,
+    ",": ARGUMENTS,
+}
+
+OPCODE_NAMES = {
+    LOAD_CONST: "LOAD_CONST",
+    LOAD_VAR: "LOAD_VAR",
+    ADD: "ADD",
+    SUB: "SUB",
+    MUL: "MUL",
+    DIV: "DIV",
+    MOD: "MOD",
+    POW: "POW",
+    FLOORDIV: "FLOORDIV",
+    NEG: "NEG",
+    FACTORIAL: "FACTORIAL",
+    CALL: "CALL",
+    STORE_TEMP: "STORE_TEMP",
+    LOAD_TEMP: "LOAD_TEMP",
+    ARGUMENTS: "ARGUMENTS",
+}
+
+
+class Program:
+    """
+    A compiled expression: a flat instruction stream for the stack machine.
+
+    Attributes:
+    - ops: array of int
+        One opcode per instruction.
+    - args: array of int
+        One argument per instruction (constant index, variable slot or function index).
+    - constants: list
+        The constant pool referenced by LOAD_CONST.
+    - variables: list of str
+        Variable names, one per slot referenced by LOAD_VAR.
+    - functions: list of str
+        Function names referenced by CALL.
+    - temp_count: int
+        Number of temporary slots used by STORE_TEMP/LOAD_TEMP to reuse the
+        value of a common subexpression.
+    """
+    def __init__(self):
+        self.ops = array("B")
+        self.args = array("l")
+        self.constants = []
+        self.variables = []
+        self.functions = []
+        self.temp_count = 0
+        self._constant_index = {}
+        self._variable_index = {}
+        self._function_index = {}
+
+    def emit(self, op: int, arg: int = 0):
+        self.ops.append(op)
+        self.args.append(arg)
+
+    def add_constant(self, value) -> int:
+        # Key on the type as well so that 1, 1.0 and True stay distinct
+        key = (type(value), value)
+        index = self._constant_index.get(key)
+        if index is None:
+            index = len(self.constants)
+            self.constants.append(value)
+            self._constant_index[key] = index
+        return index
+
+    def add_variable(self, name: str) -> int:
+        index = self._variable_index.get(name)
+        if index is None:
+            index = len(self.variables)
+            self.variables.append(name)
+            self._variable_index[name] = index
+        return index
+
+    def add_function(self, name: str) -> int:
+        index = self._function_index.get(name)
+        if index is None:
+            index = len(self.functions)
+            self.functions.append(name)
+            self._function_index[name] = index
+        return index
+
+    def add_temp(self) -> int:
+        self.temp_count += 1
+        return self.temp_count - 1
+
+    def disassemble(self) -> str:
+        """
+        Return a human-readable listing of the instructions.
+        """
+        lines = []
+        for position, (op, arg) in enumerate(zip(self.ops, self.args)):
+            name = OPCODE_NAMES[op]
+            if op == LOAD_CONST:
+                lines.append(f"{position:>4} {name} {self.constants[arg]!r}")
+            elif op == LOAD_VAR:
+                lines.append(f"{position:>4} {name} {self.variables[arg]}")
+            elif op == CALL:
+                lines.append(f"{position:>4} {name} {self.functions[arg]}")
+            elif op in (STORE_TEMP, LOAD_TEMP):
+                lines.append(f"{position:>4} {name} t{arg}")
+            else:
+                lines.append(f"{position:>4} {name}")
+        return "\n".join(lines)
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __repr__(self):
+        return (
+            f"Program({len(self.ops)} instructions, {len(self.constants)} constants, "
+            f"variables={self.variables})"
+        )
+
+
+def execute(
+    program: Program,
+    context: dict = None,
+    use_degrees: bool = True,
+    exact: bool = False,
+    max_digits: int = None,
+):
+    """
+    Run a compiled Program on the stack machine and return the numerical result.
+
+    Parameters:
+    - program: Program
+        The output of Compiler.compile.
+    - context: dict
+        A dictionary mapping variable names to their numerical values.
+    - use_degrees: bool
+        If True, trigonometric functions interpret angles as degrees.
+        If False, use radians.
+    - exact: bool
+        If True, DIV and POW keep ints and Fractions exact, as in evaluate.
+    - max_digits: int
+        If given, MUL, POW and FACTORIAL refuse results with more digits, as in evaluate.
+    """
+    if context is None:
+        context = {}
+
+    # Resolve variable slots once per run instead of once per occurrence
+    slots = []
+    for name in program.variables:
+        if name not in context:
+            raise ValueError(f"Variable '{name}' is not defined.")
+        slots.append(context[name])
+
+    constants = program.constants
+    functions = program.functions
+    temps = [None] * program.temp_count
+    stack = []
+    push = stack.append
+    pop = stack.pop
+
+    for op, arg in zip(program.ops, program.args):
+        if op == LOAD_VAR:
+            push(slots[arg])
+        elif op == LOAD_CONST:
+            push(constants[arg])
+        elif op == ADD:
+            right_val = pop()
+            stack[-1] = stack[-1] + right_val
+        elif op == MUL:
+            right_val = pop()
+            if max_digits is not None:
+                check_digits("*", stack[-1], right_val, max_digits)
+            stack[-1] = stack[-1] * right_val
+        elif op == SUB:
+            right_val = pop()
+            stack[-1] = stack[-1] - right_val
+        elif op == DIV:
+            right_val = pop()
+            if right_val == 0:
+                raise ValueError("Division by zero is not allowed.")
+            stack[-1] = exact_divide(stack[-1], right_val) if exact else stack[-1] / right_val
+        elif op == POW:
+            right_val = pop()
+            if max_digits is not None:
+                check_digits("^", stack[-1], right_val, max_digits)
+            stack[-1] = exact_power(stack[-1], right_val) if exact else stack[-1] ** right_val
+        elif op == CALL:
+            stack[-1] = apply_function(functions[arg], stack[-1], use_degrees, exact)
+        elif op == LOAD_TEMP:
+            push(temps[arg])
+        elif op == STORE_TEMP:
+            # Keep the value on the stack as well; the first use consumes it
+            temps[arg] = stack[-1]
+        elif op == NEG:
+            # 0 - x rather than -x, so 0.0 stays 0.0 exactly as in evaluate
+            stack[-1] = 0 - stack[-1]
+        elif op == MOD:
+            right_val = pop()
+            if right_val == 0:
+                raise ValueError("Modulo by zero is not allowed.")
+            stack[-1] = stack[-1] % right_val
+        elif op == FLOORDIV:
+            right_val = pop()
+            if right_val == 0:
+                raise ValueError("Integer division by zero is not allowed.")
+            stack[-1] = stack[-1] // right_val
+        elif op == FACTORIAL:
+            value = exact_number(stack[-1])
+            if not isinstance(value, int) or value < 0:
+                raise ValueError("Factorial is only defined for non-negative integers.")
+            if max_digits is not None:
+                check_digits("!", value, None, max_digits)
+            stack[-1] = math.factorial(value)
+        elif op == ARGUMENTS:
+            right_val = pop()
+            stack[-1] = join_arguments(stack[-1], right_val)
+        else:
+            raise ValueError(f"Unknown opcode: {op}")
+
+    return exact_number(stack[-1]) if exact else stack[-1]
@@ -0,0 +1,211 @@
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from src.parser import tokenize, parse_expression, normalize_expression, Annotations
+from src.compiler import Compiler, MAX_FOLD_DIGITS
+from src.tree import ExpressionTree
+from src.tracing import current_trace, record_simplification
+
+# Bump when the pickled layout of ExpressionTree or CacheEntry changes, so
+# stale disk entries are ignored instead of misread
+FORMAT_VERSION = 2
+
+
+class CacheEntry:
+    """
+    The stages of one expression, as returned by ExpressionCache.get.
+
+    Attributes:
+    - tokens: list of str
+        The output of tokenize.
+    - tree: Node
+        The parse tree.
+    - simplified: Node
+        The simplified (or canonicalized) tree.
+    - annotations: Annotations
+        Variables, calls and node count of the parse tree.
+
+    Entries are shared between callers, so they must not be modified.
+    """
+    __slots__ = ("tokens", "tree", "simplified", "annotations")
+
+    def __init__(self, tokens, tree, simplified, annotations):
+        self.tokens = tokens
+        self.tree = tree
+        self.simplified = simplified
+        self.annotations = annotations
+
+    def __repr__(self):
+        return f"CacheEntry({len(self.tokens)} tokens)"
+
+
+class ExpressionCache:
+    """
+    A bounded, thread-safe LRU cache of tokenized, parsed and simplified
+    expressions, keyed by normalized expression text.
+
+    With `path`, entries are also written to a sqlite file and read back on a
+    memory miss, so a warm cache survives restarts. The file holds pickles and
+    must only be shared between trusted processes.
+
+    Parameters:
+    - max_entries: int
+        Number of entries kept in memory; the least recently used is evicted.
+    - path: str
+        Optional sqlite file for the on-disk tier.
+    """
+    def __init__(self, max_entries: int = 1024, path: str = None):
+        if max_entries < 1:
+            raise ValueError("Cache size must be at least 1.")
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            # One connection shared by all threads, serialized by self._lock
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            # Write-ahead log without an fsync per commit: a crash can lose
+            # the last few entries, which are only a cache
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS expressions (key TEXT PRIMARY KEY, data BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def normalize(expression: str) -> str:
+        """
+        The cache key text: NFKC-normalized, stripped, with runs of whitespace
+        collapsed to one space (whitespace never changes the tokens otherwise).
+        """
+        return " ".join(normalize_expression(expression).split())
+
+    def get(
+        self, expression: str, canonical: bool = False, exact: bool = False, max_digits: int = MAX_FOLD_DIGITS
+    ) -> CacheEntry:
+        """
+        Return the cached stages of `expression`, computing and storing them
+        on a miss. Parse errors propagate and are not cached.
+
+        Parameters:
+        - canonical: bool
+            Use Compiler.canonicalize instead of Compiler.simplify.
+        - exact: bool
+            Simplify in exact mode (see Compiler.simplify).
+        - max_digits: int
+            Digit budget for constant folding (see Compiler.simplify).
+        """
+        trace = current_trace()
+        with trace.stage("normalize"):
+            text = self.normalize(expression)
+        key = f"{FORMAT_VERSION}:{int(canonical)}{int(exact)}:{max_digits}:{text}"
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                trace.count("cache_hits")
+                return entry
+            entry = self._load(key)
+            if entry is not None:
+                self.disk_hits += 1
+                self._insert(key, entry)
+                trace.count("cache_disk_hits")
+                return entry
+            self.misses += 1
+        trace.count("cache_misses")
+
+        # Compute outside the lock so other threads are not blocked meanwhile;
+        # two threads missing the same key at once both compute it. The text
+        # is already normalized, so tokenize does not change it again.
+        with trace.stage("tokenize"):
+            tokens = tokenize(text)
+        trace.count("tokens", len(tokens))
+        annotations = Annotations()
+        with trace.stage("parse"):
+            tree = parse_expression(tokens, annotations=annotations)
+        trace.count("nodes", annotations.nodes)
+        simplify = Compiler.canonicalize if canonical else Compiler.simplify
+        with trace.stage("simplify"):
+            simplified = simplify(tree, exact, max_digits)
+        record_simplification(trace, tree, simplified)
+        entry = CacheEntry(tokens, tree, simplified, annotations)
+        data = self._serialize(entry) if self._db is not None else None
+
+        with self._lock:
+            self._insert(key, entry)
+            if data is not None and self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO expressions (key, data) VALUES (?, ?)", (key, data))
+                self._db.commit()
+        return entry
+
+    def _insert(self, key: str, entry: CacheEntry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _load(self, key: str):
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT data FROM expressions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        # Trees are stored flat, so deep trees pickle without recursion
+        tokens, tree, simplified, annotations = pickle.loads(row[0])
+        return CacheEntry(tokens, tree.to_node(), simplified.to_node(), annotations)
+
+    @staticmethod
+    def _serialize(entry: CacheEntry) -> bytes:
+        return pickle.dumps(
+            (
+                entry.tokens, ExpressionTree.from_node(entry.tree), ExpressionTree.from_node(entry.simplified),
+                entry.annotations,
+            ),
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+
+    def stats(self) -> dict:
+        """
+        Hit, miss and eviction counters plus the current size.
+        """
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def clear(self, disk: bool = False):
+        """
+        Drop the in-memory entries, and the on-disk ones too if `disk` is True.
+        """
+        with self._lock:
+            self._entries.clear()
+            if disk and self._db is not None:
+                self._db.execute("DELETE FROM expressions")
+                self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"ExpressionCache({len(self._entries)}/{self.max_entries} entries, path={self.path!r})"
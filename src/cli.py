@@ -0,0 +1,132 @@
+import argparse
+import logging
+import sys
+from src.compiler import MAX_FOLD_DIGITS
+from src.pipeline import Options, read_records, run_pipeline, format_result
+from src.tracing import Tracer, LogExporter, PrometheusExporter
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m src",
+        description=(
+            "Evaluate expressions streamed one per line (or as JSON lines with "
+            "variable bindings) from files or stdin, writing one result per line."
+        ),
+    )
+    parser.add_argument(
+        "files", nargs="*", default=["-"],
+        help="input files; '-' or nothing reads stdin",
+    )
+    parser.add_argument(
+        "--json", action="store_true",
+        help='read {"expression": ..., "variables": {...}} objects and write JSON results',
+    )
+    parser.add_argument("-o", "--output", help="write results to this file instead of stdout")
+    parser.add_argument(
+        "-w", "--workers", type=int, default=1,
+        help="number of worker processes (default: 1, no pool)",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=64,
+        help="records sent to a worker at a time (default: 64)",
+    )
+    parser.add_argument("--radians", action="store_true", help="trigonometric functions take radians")
+    parser.add_argument("--exact", action="store_true", help="exact rational arithmetic")
+    parser.add_argument(
+        "--precision", type=int,
+        help="compute with this many significant digits of decimal arithmetic instead of floats",
+    )
+    parser.add_argument(
+        "--canonical", action="store_true",
+        help="collect like terms (polynomial normal form) before evaluating",
+    )
+    parser.add_argument(
+        "--max-digits", type=int, default=MAX_FOLD_DIGITS,
+        help=f"refuse results with more digits than this (default: {MAX_FOLD_DIGITS})",
+    )
+    parser.add_argument(
+        "--trace", action="store_true",
+        help="log the time spent in each stage of every record to stderr, as JSON lines",
+    )
+    parser.add_argument("--metrics", help="write Prometheus-style stage metrics to this file at the end")
+    return parser
+
+
+def build_tracer(args, metrics: PrometheusExporter = None):
+    """
+    A Tracer exporting to the log and `metrics` as asked for, or None if
+    tracing is off.
+    """
+    exporters = []
+    if args.trace:
+        logger = logging.getLogger("src.tracing")
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        exporters.append(LogExporter(logger))
+    if metrics is not None:
+        exporters.append(metrics)
+    return Tracer(*exporters) if exporters else None
+
+
+def read_lines(paths):
+    """
+    Yield the lines of each input in turn, opening files lazily.
+    """
+    for path in paths:
+        if path == "-":
+            yield from sys.stdin
+        else:
+            with open(path, encoding="utf-8") as handle:
+                yield from handle
+
+
+def main(argv=None) -> int:
+    """
+    Run the CLI and return the exit status: 0 if every record evaluated,
+    1 if any failed.
+    """
+    args = build_parser().parse_args(argv)
+    if args.workers < 1 or args.chunk_size < 1:
+        print("error: --workers and --chunk-size must be at least 1", file=sys.stderr)
+        return 2
+    if args.precision is not None and args.precision < 1:
+        print("error: --precision must be at least 1", file=sys.stderr)
+        return 2
+    # Results may have far more digits than the default int-to-str limit
+    sys.set_int_max_str_digits(0)
+    metrics = PrometheusExporter() if args.metrics else None
+    tracer = build_tracer(args, metrics)
+
+    options = Options(
+        use_degrees=not args.radians,
+        exact=args.exact,
+        canonical=args.canonical,
+        max_digits=args.max_digits,
+        precision=args.precision,
+        trace=tracer is not None,
+    )
+    records = read_records(read_lines(args.files), json_lines=args.json)
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    failed = False
+    try:
+        for result in run_pipeline(records, options, workers=args.workers, chunk_size=args.chunk_size):
+            failed = failed or "error" in result
+            trace = result.pop("trace", None)
+            if trace is not None:
+                tracer.export(trace, line=result["line"])
+            output.write(format_result(result, json_lines=args.json) + "\n")
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head); stop quietly
+        sys.stderr.close()
+        return 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if metrics is not None:
+            with open(args.metrics, "w", encoding="utf-8") as handle:
+                handle.write(metrics.render())
+    return 1 if failed else 0
@@ -0,0 +1,324 @@
+import itertools
+import keyword
+import math
+import threading
+from collections import OrderedDict
+from src.tree import ExpressionTree, NUMBER, NAME, OPERATORS, OPERATOR_CODES
+from src.evaluator import (
+    FUNCTION_NAMES, CONSTANT_NAMES, apply_function, exact_divide, exact_power, exact_number, check_digits,
+)
+from src.registry import REGISTRY, ARGUMENT_SEPARATOR, BUILTIN_FUNCTIONS, join_arguments
+
+# Compiled functions kept by compile_function, least recently used evicted first
+MAX_CACHED_FUNCTIONS = 256
+# Arithmetic is nested inline up to this depth before going through a
+# temporary; CPython's compiler recurses on nested expressions
+MAX_INLINE_DEPTH = 32
+# Integers this large are passed in rather than written as literals, which
+# would hit the int-to-str digit limit
+LITERAL_LIMIT = 10 ** 1_000
+
+# Runtime names the generated code binds as closure variables. They all
+# start with an underscore, which expression variables never contain, so a
+# variable named like a builtin cannot shadow them.
+RUNTIME = {
+    "_ValueError": ValueError,
+    "_isinstance": isinstance,
+    "_int": int,
+    "_sin": math.sin,
+    "_cos": math.cos,
+    "_tan": math.tan,
+    "_log": math.log,
+    "_sqrt": math.sqrt,
+    "_abs": abs,
+    "_exp": math.exp,
+    "_floor": math.floor,
+    "_ceil": math.ceil,
+    "_factorial": math.factorial,
+    "_exact_divide": exact_divide,
+    "_exact_power": exact_power,
+    "_exact_number": exact_number,
+    "_apply_function": apply_function,
+    "_join_arguments": join_arguments,
+    "_check_digits": check_digits,
+}
+
+ARGUMENTS_CODE = OPERATOR_CODES[ARGUMENT_SEPARATOR]
+
+# Checks emitted before an operation, with the messages evaluate raises
+ZERO_DIVISOR_MESSAGES = {
+    "/": "Division by zero is not allowed.",
+    "%": "Modulo by zero is not allowed.",
+    "//": "Integer division by zero is not allowed.",
+}
+
+_functions = OrderedDict()
+_lock = threading.Lock()
+
+
+class CompiledFunction:
+    """
+    An expression compiled to a native Python function.
+
+    Attributes:
+    - source: str
+        The generated Python source.
+    - variables: list of str
+        Expression variables, in the order of the function's parameters.
+    - function: callable
+        Takes one positional argument per variable; call it directly in hot
+        loops.
+    """
+    __slots__ = ("source", "variables", "function")
+
+    def __init__(self, source: str, variables: list, function):
+        self.source = source
+        self.variables = variables
+        self.function = function
+
+    def __call__(self, context: dict = None):
+        """
+        Evaluate with variable values taken from `context`, like evaluate.
+        """
+        if context is None:
+            context = {}
+        try:
+            args = [context[name] for name in self.variables]
+        except KeyError:
+            missing = next(name for name in self.variables if name not in context)
+            raise ValueError(f"Variable '{missing}' is not defined.") from None
+        return self.function(*args)
+
+    def __repr__(self):
+        return f"CompiledFunction(variables={self.variables})"
+
+
+def tree_key(tree: ExpressionTree) -> tuple:
+    """
+    A hashable key identifying a tree's structure, built from the raw node
+    arrays at C speed. Constants are keyed with their type (1 and 1.0
+    differ) and floats by their exact bits (0.0 and -0.0 differ).
+    """
+    return (
+        tree.ops.tobytes(),
+        tree.values.tobytes(),
+        tree.left.tobytes(),
+        tree.right.tobytes(),
+        tuple(
+            (type(value), value.hex() if isinstance(value, float) else value)
+            for value in tree.constants
+        ),
+        tuple(tree.names),
+    )
+
+
+def generate_source(
+    node,
+    use_degrees: bool = True,
+    exact: bool = False,
+    max_digits: int = None,
+    name: str = "f",
+):
+    """
+    Generate the source of a function computing the expression, as evaluate
+    does with the same settings.
+
+    Returns (source, variables, bindings): the source, which defines
+    `_make(...)` returning the function `name`; the variables in parameter
+    order; and the arguments for `_make` by name (runtime functions, and
+    constants that cannot be written as literals).
+
+    Every node is computed once, in evaluate's order, so the same error is
+    raised first. '+', '-' and '*' are nested inline; every other operation
+    gets a temporary, with its check (zero divisor, log or sqrt domain,
+    digit budget) on the line before.
+    """
+    tree = node if isinstance(node, ExpressionTree) else ExpressionTree.from_node(node)
+    if not len(tree):
+        return f"def _make():\n    def {name}():\n        return 0\n    return {name}\n", [], {}
+
+    # A node used more than once is computed into a temporary
+    uses = [0] * len(tree)
+    for children in (tree.left, tree.right):
+        for child in children:
+            if child >= 0:
+                uses[child] += 1
+
+    lines = []
+    temporaries = itertools.count()
+    bindings = {}
+    variables = []
+    parameters = {}
+    # Python expression and inline nesting depth of each node
+    code = [None] * len(tree)
+    depth = [0] * len(tree)
+
+    def runtime(label: str) -> str:
+        bindings[label] = RUNTIME[label]
+        return label
+
+    def constant(value) -> str:
+        if (value.__class__ is int and -LITERAL_LIMIT < value < LITERAL_LIMIT) or (
+            value.__class__ is float and math.isfinite(value)
+        ):
+            # Negative literals (and -0.0) are parenthesized for use as operands
+            return repr(value) if math.copysign(1, value) > 0 else f"({value!r})"
+        label = f"_c{len(bindings)}"
+        bindings[label] = value
+        return label
+
+    def temporary(expression: str) -> str:
+        label = f"t{next(temporaries)}"
+        lines.append(f"{label} = {expression}")
+        return label
+
+    def stored(expression: str) -> str:
+        # Checks and operations both read the value, so compute it once
+        if expression.isidentifier() or expression.strip("()-").replace(".", "").isdigit():
+            return expression
+        return temporary(expression)
+
+    def check(condition: str, message: str):
+        lines.append(f"if {condition}:")
+        lines.append(f"    raise {runtime('_ValueError')}({message!r})")
+
+    for i, (op, value, left, right) in enumerate(zip(tree.ops, tree.values, tree.left, tree.right)):
+        left_code = code[left] if left >= 0 else "0"
+        right_code = code[right] if right >= 0 else "0"
+        inline = False
+
+        if op == NUMBER:
+            code[i] = constant(tree.constants[value])
+            continue
+
+        if op == NAME:
+            label = tree.names[value]
+            if not label.isalpha():
+                raise ValueError(f"Unsupported operation or variable: {label}")
+            if label in CONSTANT_NAMES:
+                code[i] = constant(CONSTANT_NAMES[label])
+                continue
+            if label not in FUNCTION_NAMES and left < 0:
+                if label not in parameters:
+                    identifier = label
+                    if not (label.isascii() and label.isidentifier()) or keyword.iskeyword(label):
+                        # Expression variables have no digits, so this cannot collide
+                        identifier = f"v{len(variables)}"
+                    parameters[label] = identifier
+                    variables.append(label)
+                code[i] = parameters[label]
+                continue
+
+            if label not in BUILTIN_FUNCTIONS or (left >= 0 and tree.ops[left] == ARGUMENTS_CODE):
+                # Registered and unknown functions, and calls with several
+                # arguments (apply_function reports the unknown function or
+                # the wrong number of arguments)
+                expression = f"{runtime('_apply_function')}({label!r}, {left_code}, {use_degrees!r}, {exact!r})"
+            elif label in ("sin", "cos", "tan") and use_degrees:
+                # math.radians(x) is x * (pi / 180); do it inline
+                expression = f"{runtime('_' + label)}({left_code} * {math.pi / 180!r})"
+            elif label == "log":
+                argument = stored(left_code)
+                check(f"{argument} <= 0", "Logarithm is only defined for positive numbers.")
+                expression = f"{runtime('_log')}({argument})"
+            elif label == "sqrt" and exact:
+                # Perfect squares stay exact; apply_function has the checks
+                expression = f"{runtime('_apply_function')}('sqrt', {left_code}, False, True)"
+            elif label == "sqrt":
+                argument = stored(left_code)
+                check(f"{argument} < 0", "Square root is not defined for negative numbers.")
+                expression = f"{runtime('_sqrt')}({argument})"
+            else:
+                expression = f"{runtime('_' + label)}({left_code})"
+
+        elif OPERATORS[op] == "!":
+            argument = temporary(f"{runtime('_exact_number')}({left_code})")
+            check(
+                f"not {runtime('_isinstance')}({argument}, {runtime('_int')}) or {argument} < 0",
+                "Factorial is only defined for non-negative integers.",
+            )
+            if max_digits is not None:
+                lines.append(f"{runtime('_check_digits')}('!', {argument}, None, {max_digits!r})")
+            expression = f"{runtime('_factorial')}({argument})"
+
+        else:
+            operator = OPERATORS[op]
+            if operator in ZERO_DIVISOR_MESSAGES and not (
+                right >= 0 and tree.ops[right] == NUMBER and tree.constants[tree.values[right]] != 0
+            ):
+                right_code = stored(right_code)
+                check(f"{right_code} == 0", ZERO_DIVISOR_MESSAGES[operator])
+            if max_digits is not None and operator in ("*", "^"):
+                left_code, right_code = stored(left_code), stored(right_code)
+                lines.append(
+                    f"{runtime('_check_digits')}({operator!r}, {left_code}, {right_code}, {max_digits!r})"
+                )
+
+            if operator == ARGUMENT_SEPARATOR:
+                expression = f"{runtime('_join_arguments')}({left_code}, {right_code})"
+            elif exact and operator == "/":
+                expression = f"{runtime('_exact_divide')}({left_code}, {right_code})"
+            elif exact and operator == "^":
+                expression = f"{runtime('_exact_power')}({left_code}, {right_code})"
+            elif operator == "^":
+                expression = f"{left_code} ** {right_code}"
+            else:
+                expression = f"{left_code} {operator} {right_code}"
+                # +, - and * only fail on a float overflow, so computing them
+                # where they are used hardly ever changes which error comes first
+                inline = operator in ("+", "-", "*")
+
+        child_depth = max(depth[left] if left >= 0 else 0, depth[right] if right >= 0 else 0)
+        if inline and uses[i] <= 1 and child_depth < MAX_INLINE_DEPTH:
+            code[i] = f"({expression})"
+            depth[i] = child_depth + 1
+        else:
+            code[i] = temporary(expression)
+
+    result = code[-1]
+    if exact:
+        result = f"{runtime('_exact_number')}({result})"
+    lines.append(f"return {result}")
+
+    body = "\n".join(f"        {line}" for line in lines)
+    source = (
+        f"def _make({', '.join(bindings)}):\n"
+        f"    def {name}({', '.join(parameters[label] for label in variables)}):\n"
+        f"{body}\n"
+        f"    return {name}\n"
+    )
+    return source, variables, bindings
+
+
+def compile_function(
+    node,
+    use_degrees: bool = True,
+    exact: bool = False,
+    max_digits: int = None,
+) -> CompiledFunction:
+    """
+    Compile an expression into a CompiledFunction. Functions are cached by
+    tree structure and settings, so compiling the same formula again (from
+    a fresh parse, say) returns the cached function.
+    """
+    tree = node if isinstance(node, ExpressionTree) else ExpressionTree.from_node(node)
+    # Which names are functions or constants, and the constants' values,
+    # are compiled in
+    key = (tree_key(tree), use_degrees, exact, max_digits, REGISTRY.version)
+    with _lock:
+        compiled = _functions.get(key)
+        if compiled is not None:
+            _functions.move_to_end(key)
+            return compiled
+
+    # Generate and compile outside the lock; a race only compiles twice
+    source, variables, bindings = generate_source(tree, use_degrees, exact, max_digits)
+    namespace = {}
+    exec(compile(source, "<expression>", "exec"), namespace)
+    compiled = CompiledFunction(source, variables, namespace["_make"](**bindings))
+
+    with _lock:
+        _functions[key] = compiled
+        if len(_functions) > MAX_CACHED_FUNCTIONS:
+            _functions.popitem(last=False)
+    return compiled
@@ -1,4 +1,81 @@
+import math
 from src.parser import Node
+from src.tree import ExpressionTree, NodeView, NUMBER, NAME, OPERATORS
+from src.evaluator import (
+    FUNCTION_NAMES, CONSTANT_NAMES, is_number, exact_divide, exact_power, exact_number, estimate_digits,
+    evaluate_interval,
+)
+from src.polynomial import normal_form
+from src.bytecode import (
+    Program, BINARY_OPCODES, LOAD_CONST, LOAD_VAR, NEG, FACTORIAL, CALL, STORE_TEMP, LOAD_TEMP,
+)
+from src.codegen import CompiledFunction, compile_function
+from src.autodiff import derivative
+
+# Constant folds whose result would have more digits than this are left
+# unfolded by simplify; evaluate (with its own max_digits) decides later
+MAX_FOLD_DIGITS = 1_000_000
+# IncrementalSimplifier starts over once it remembers this many times as
+# many nodes as its last full run produced
+MAX_MEMO_GROWTH = 2
+
+class NodeTable:
+    """
+    Hash-consing table for Nodes.
+
+    make() returns the existing node when a structurally identical one (same
+    value, same interned children) was already built through this table, so
+    equal subtrees become one shared object and can be compared with `is`.
+    """
+    def __init__(self):
+        self._nodes = {}
+
+    def make(self, value, left=None, right=None) -> Node:
+        # Children are interned already, so their identity stands for their
+        # structure; the table keeps them alive, so ids cannot be reused.
+        # Floats are keyed by their exact bits so that 0.0 and -0.0 stay apart.
+        key = (
+            type(value),
+            value.hex() if isinstance(value, float) else value,
+            id(left),
+            id(right),
+        )
+        node = self._nodes.get(key)
+        if node is None:
+            node = Node(value, left=left, right=right)
+            self._nodes[key] = node
+        return node
+
+    def intern(self, node: Node) -> Node:
+        """
+        Rebuild `node` through the table and return the canonical copy.
+        """
+        if node is None:
+            return None
+
+        interned = {}
+        stack = [(node, False)]
+        while stack:
+            current, visited = stack.pop()
+            if id(current) in interned:
+                continue
+            if not visited:
+                stack.append((current, True))
+                if current.right is not None:
+                    stack.append((current.right, False))
+                if current.left is not None:
+                    stack.append((current.left, False))
+                continue
+            interned[id(current)] = self.make(
+                current.value,
+                None if current.left is None else interned[id(current.left)],
+                None if current.right is None else interned[id(current.right)],
+            )
+        return interned[id(node)]
+
+    def __len__(self):
+        return len(self._nodes)
+
 
 class Compiler:
     """
@@ -6,73 +83,356 @@ class Compiler:
     """
 
     @staticmethod
-    def simplify(node: Node):
+    def simplify(node: Node, exact: bool = False, max_digits: int = MAX_FOLD_DIGITS, workers: int = 1):
         """
         Simplify the expression tree by:
           - Evaluating constant subtrees
-          - Combining obvious like terms (e.g., x + x => 2x)
+          - Combining like terms, including structurally equal subtrees
+            (e.g., x + x => 2x, sin(x*y) - sin(x*y) => 0)
+
+        Nodes are built through a NodeTable, so the result is hash-consed:
+        structurally identical subtrees are one shared node. Subtrees are
+        simplified bottom-up with an explicit stack, so deep trees do not hit
+        the interpreter's recursion limit.
+
+        With exact=True, constant '/' and '^' fold to ints and Fractions (see
+        evaluate) instead of floats. A '^', '*' or '!' whose result would
+        exceed `max_digits` digits (estimated up front) is not folded; pass
+        None to fold everything.
+
+        With workers > 1, large trees are simplified in a process pool, one
+        independent subtree per task (see src.parallel). Only grouped
+        expressions split; a flat a + b + c + ... chain runs serially.
         """
         if node is None:
             return None
+        if workers > 1:
+            # Imported here: src.parallel builds on this module
+            from src.parallel import simplify_parallel
+            return simplify_parallel(node, exact, max_digits, workers)
+        if isinstance(node, ExpressionTree):
+            return Compiler._simplify_tree(node, exact, max_digits)
+
+        # Shared input nodes are simplified once; all of them stay reachable
+        # from `node`, so their ids are stable
+        return Compiler._simplify_nodes(node, NodeTable(), {}, exact, max_digits)
+
+    @staticmethod
+    def _simplify_nodes(node: Node, table: NodeTable, simplified: dict, exact: bool, max_digits: int) -> Node:
+        """
+        Simplify a Node tree through `table`. `simplified` maps id(input node)
+        to its simplified form; nodes found there are not visited again.
+        The caller keeps those input nodes alive.
+        """
+        # Post-order walk; simplified subtrees accumulate on `results`
+        results = []
+        stack = [(node, False)]
+        while stack:
+            current, visited = stack.pop()
+
+            if current is None:
+                results.append(None)
+                continue
 
-        # If it's a numeric leaf, return as-is
-        if isinstance(node.value, (int, float)):
-            return node
+            # If it's a numeric leaf, return as-is
+            if is_number(current.value):
+                results.append(table.make(current.value))
+                continue
 
-        # Simplify left and right subtrees
-        left = Compiler.simplify(node.left)
-        right = Compiler.simplify(node.right)
+            if not visited:
+                if id(current) in simplified:
+                    results.append(simplified[id(current)])
+                    continue
+                stack.append((current, True))
+                stack.append((current.right, False))
+                stack.append((current.left, False))
+                continue
+
+            right = results.pop()
+            left = results.pop()
+            simplified[id(current)] = Compiler._simplify_node(
+                current, left, right, table.make, exact, max_digits
+            )
+            results.append(simplified[id(current)])
+
+        return results.pop()
+
+    @staticmethod
+    def eliminate_common_subexpressions(node: Node) -> Node:
+        """
+        Turn the tree into a DAG in which every structurally repeated subtree
+        is a single shared node. evaluate and Compiler.compile then compute
+        each shared subexpression once per evaluation.
+        """
+        if isinstance(node, ExpressionTree):
+            return node.deduplicate()
+        return NodeTable().intern(node)
+
+    @staticmethod
+    def canonicalize(node: Node, exact: bool = False, max_digits: int = MAX_FOLD_DIGITS):
+        """
+        Simplify the tree and rewrite it into polynomial normal form:
+          - + and * chains are flattened and their factors sorted
+            (e.g., 5*y*x^2 => 5*x^2*y)
+          - Like terms are collected with exact coefficients
+            (e.g., 3*x^2*y + 5*y*x^2 - x*x*y => 7*x^2*y)
+          - Functions, %, // and ! stay as opaque factors whose arguments
+            are normalized too; one whose terms cancel (e.g., y! * 0) is kept
+            as 0 * y!, so the result still raises where the input does
+
+        The result is hash-consed like the output of simplify, and its size
+        depends on the number of distinct monomials, not on the input length.
+        Coefficients are kept within `max_digits` digits as in simplify.
+        """
+        if node is None:
+            return None
+        if isinstance(node, ExpressionTree):
+            tree = Compiler.simplify(node, exact, max_digits)
+            return ExpressionTree.from_node(normal_form(tree.to_node(), NodeTable().make, max_digits))
+        return normal_form(Compiler.simplify(node, exact, max_digits), NodeTable().make, max_digits)
+
+    @staticmethod
+    def prune(node: Node, ranges: dict, use_degrees: bool = True):
+        """
+        Prune the tree using interval bounds over ranges of its variables
+        (see evaluate_interval):
+          - A subtree that cannot raise an error and whose bounds hold a
+            single value is replaced by that value
+            (e.g., floor(x / 10) * y => 0 for x in [0, 9])
+          - Operations that provably return one operand unchanged are
+            dropped: x % m for 0 <= x < m, abs(x) for x >= 0, and + 0, - 0
+            and * 1 where the 0 or 1 is such a subtree
+
+        For every point in the ranges the result evaluates to the same value
+        as `node`, and raises whatever `node` would. Run simplify afterwards
+        to fold arithmetic on the new constants.
+        """
+        if node is None:
+            return None
+        if isinstance(node, ExpressionTree):
+            return ExpressionTree.from_node(Compiler.prune(node.to_node(), ranges, use_degrees))
+
+        bounds = {}
+
+        def record(current, interval, errors):
+            bounds[id(current)] = (interval, errors)
+
+        evaluate_interval(node, ranges, use_degrees, on_node=record)
+
+        def is_exact(child, number):
+            # An int-valued child that is exactly `number` and cannot raise
+            if child is None:
+                return number == 0
+            interval, errors = bounds[id(child)]
+            return not errors and interval.is_point and interval.lo.__class__ is int and interval.lo == number
+
+        # Every node stays reachable from `node`, so ids are stable
+        pruned = {}
+        stack = [(node, False)]
+        while stack:
+            current, visited = stack.pop()
+            if current is None or id(current) in pruned:
+                continue
+            interval, errors = bounds[id(current)]
+            if (
+                not errors and interval.is_point and interval.lo not in (math.inf, -math.inf)
+                and not (current.left is None and current.right is None)
+            ):
+                pruned[id(current)] = Node(interval.lo)
+                continue
+            if not visited:
+                stack.append((current, True))
+                stack.append((current.right, False))
+                stack.append((current.left, False))
+                continue
+
+            value, left, right = current.value, current.left, current.right
+            new_left = None if left is None else pruned[id(left)]
+            new_right = None if right is None else pruned[id(right)]
+            if value == "%" and left is not None and right is not None and not bounds[id(right)][1]:
+                dividend, divisor = bounds[id(left)][0], bounds[id(right)][0]
+                # With a float divisor the result is a float, so x must be one too
+                same_type = dividend.lo.__class__ is float or not (
+                    divisor.lo.__class__ is float or divisor.hi.__class__ is float
+                )
+                if same_type and (
+                    (divisor.lo > 0 and dividend.lo >= 0 and dividend.hi < divisor.lo)
+                    or (divisor.hi < 0 and dividend.hi <= 0 and dividend.lo > divisor.hi)
+                ):
+                    pruned[id(current)] = new_left
+                    continue
+            if value == "abs" and left is not None and bounds[id(left)][0].lo >= 0:
+                pruned[id(current)] = new_left
+                continue
+            if value in ("+", "-") and left is not None and is_exact(right, 0):
+                pruned[id(current)] = new_left
+                continue
+            if value == "+" and right is not None and is_exact(left, 0):
+                pruned[id(current)] = new_right
+                continue
+            if value == "*" and left is not None and right is not None:
+                if is_exact(right, 1):
+                    pruned[id(current)] = new_left
+                    continue
+                if is_exact(left, 1):
+                    pruned[id(current)] = new_right
+                    continue
+            if new_left is left and new_right is right:
+                pruned[id(current)] = current
+            else:
+                pruned[id(current)] = Node(value, left=new_left, right=new_right)
+        return pruned[id(node)]
+
+    @staticmethod
+    def differentiate(
+        node: Node,
+        variable: str,
+        use_degrees: bool = True,
+        exact: bool = False,
+        max_digits: int = MAX_FOLD_DIGITS,
+    ):
+        """
+        Return the symbolic derivative of the expression with respect to
+        `variable`, simplified (e.g., x^3 + 2*x => 3 * x ^ 2 + 2).
+
+        The derivative follows the rules of src.autodiff.gradient: '//', '!',
+        floor and ceil count as constant, and trigonometric functions are
+        differentiated for the angle mode `use_degrees`, so the result must be
+        evaluated in that same mode. Compile it with compile_python to get a
+        fast derivative function.
+        """
+        if node is None:
+            return None
+        if isinstance(node, ExpressionTree):
+            return ExpressionTree.from_node(
+                Compiler.differentiate(node.to_node(), variable, use_degrees, exact, max_digits)
+            )
+        # Built through a NodeTable, so repeated factors such as cos(x) are shared
+        return Compiler.simplify(derivative(node, variable, NodeTable().make, use_degrees), exact, max_digits)
+
+    @staticmethod
+    def _simplify_tree(
+        tree: ExpressionTree, exact: bool = False, max_digits: int = MAX_FOLD_DIGITS
+    ) -> ExpressionTree:
+        """
+        Simplify a struct-of-arrays tree in one forward scan, writing the
+        result into a new ExpressionTree.
+        """
+        simplified = ExpressionTree(hash_cons=True)
 
+        def make(value, left=None, right=None):
+            return simplified.node(simplified.add(
+                value,
+                None if left is None else left.index,
+                None if right is None else right.index,
+            ))
+
+        # Post-order layout: both children of node i are already in `results`
+        results = [0] * len(tree)
+        for i in range(len(tree)):
+            value = tree.value(i)
+            left_index, right_index = tree.left[i], tree.right[i]
+            # Numeric leaves and variables come through unchanged
+            if is_number(value) or (tree.ops[i] == NAME and left_index < 0 and right_index < 0):
+                results[i] = simplified.add(value)
+                continue
+            left = simplified.node(results[left_index]) if left_index >= 0 else None
+            right = simplified.node(results[right_index]) if right_index >= 0 else None
+            results[i] = Compiler._simplify_node(tree.node(i), left, right, make, exact, max_digits).index
+
+        # Folding leaves the folded operands behind; keep only the live nodes.
+        # The root's result need not be the last node added, so name it.
+        return simplified.compact(results[-1] if results else None)
+
+    @staticmethod
+    def _simplify_node(
+        node: Node,
+        left: Node,
+        right: Node,
+        make=Node,
+        exact: bool = False,
+        max_digits: int = MAX_FOLD_DIGITS,
+    ) -> Node:
+        """
+        Apply the simplification rules to one node whose children have already
+        been simplified to `left` and `right`. New nodes are built with `make`.
+        """
         # If current node is a binary operator
         if node.value in ("+", "-", "*", "/", "%", "^", "//"):
             # If both left & right are numeric, evaluate them directly
             if (
                 left and right
-                and isinstance(left.value, (int, float))
-                and isinstance(right.value, (int, float))
+                and is_number(left.value)
+                and is_number(right.value)
             ):
-                return Node(Compiler.evaluate_constant(node.value, left.value, right.value))
+                if max_digits is not None and estimate_digits(node.value, left.value, right.value) > max_digits:
+                    # Too big to fold up front; leave it to evaluate
+                    return make(node.value, left=left, right=right)
+                # A whole Fraction such as 1/2 + 1/2 folds to the int 1
+                return make(exact_number(Compiler.evaluate_constant(node.value, left.value, right.value, exact)))
 
             # x + x => 2x
-            if node.value == "+" and left and right and left.value == right.value:
-                if isinstance(left.value, (int, float)):
+            if node.value == "+" and left and right and Compiler._same_subtree(left, right):
+                if is_number(left.value):
                     # e.g., 2 + 2 => 4
-                    return Node(left.value * 2)
+                    return make(left.value * 2)
                 else:
                     # e.g., x + x => 2 * x
-                    return Node("*", left=Node(2), right=left)
+                    return make("*", left=make(2), right=left)
 
             # x - x => 0
-            if node.value == "-" and left and right and left.value == right.value:
-                return Node(0)
+            if node.value == "-" and left and right and Compiler._same_subtree(left, right):
+                return make(0)
 
             # Return node with simplified subtrees
-            return Node(node.value, left=left, right=right)
+            return make(node.value, left=left, right=right)
 
         # If it’s a unary operator like "!"
         if node.value == "!":
             # If we have an integer on the left, evaluate its factorial
-            if left and isinstance(left.value, int):
-                return Node(Compiler.factorial(left.value))
-            return Node(node.value, left=left)
+            if (
+                left and isinstance(left.value, int)
+                and (max_digits is None or estimate_digits("!", left.value) <= max_digits)
+            ):
+                return make(Compiler.factorial(left.value))
+            return make(node.value, left=left)
 
         # If it’s a unary + or - (no left child)
         if node.value in ("+", "-") and node.left is None:
             right_simpl = right
-            if isinstance(right_simpl.value, (int, float)):
+            if is_number(right_simpl.value):
                 if node.value == "+":
                     return right_simpl
                 else:
-                    return Node(-right_simpl.value)
-            return Node(node.value, right=right_simpl)
+                    return make(-right_simpl.value)
+            return make(node.value, right=right_simpl)
 
         # If it's a function call, just keep it with simplified child
-        return Node(node.value, left=left, right=right)
+        return make(node.value, left=left, right=right)
 
     @staticmethod
-    def evaluate_constant(operator, left, right):
+    def _same_subtree(left: Node, right: Node) -> bool:
         """
-        Evaluate a constant operation for a binary operator.
+        True if two simplified subtrees are structurally identical. Hash-consed
+        subtrees are identical exactly when they are the same node; leaves
+        built elsewhere are compared by value.
+        """
+        if left is right:
+            return True
+        if isinstance(left, NodeView) and isinstance(right, NodeView):
+            return left.tree is right.tree and left.index == right.index
+        return (
+            left.left is None and left.right is None
+            and right.left is None and right.right is None
+            and type(left.value) is type(right.value)
+            and left.value == right.value
+        )
+
+    @staticmethod
+    def evaluate_constant(operator, left, right, exact: bool = False):
+        """
+        Evaluate a constant operation for a binary operator. With exact=True,
+        '/' and '^' stay in the rationals where possible.
         """
         if operator == "+":
             return left + right
@@ -83,12 +443,16 @@ class Compiler:
         elif operator == "/":
             if right == 0:
                 raise ValueError("Division by zero in constant expression.")
+            if exact:
+                return exact_divide(left, right)
             return left / right
         elif operator == "%":
             if right == 0:
                 raise ValueError("Modulo by zero in constant expression.")
             return left % right
         elif operator == "^":
+            if exact:
+                return exact_power(left, right)
             return left ** right
         elif operator == "//":
             if right == 0:
@@ -101,32 +465,246 @@ class Compiler:
     def factorial(n: int) -> int:
         """
         Compute the factorial of a non-negative integer n.
+
+        math.factorial splits the product of the odd factors in balanced
+        halves and adds the powers of two as one shift, so the big-integer
+        multiplications stay balanced; a plain running product is quadratic.
         """
         if n < 0:
             raise ValueError("Factorial is not defined for negative integers.")
-        if n == 0 or n == 1:
-            return 1
+        return math.factorial(n)
 
-        result = 1
-        for i in range(2, n + 1):
-            result *= i
-        return result
+    @staticmethod
+    def compile(node: Node) -> Program:
+        """
+        Lower the expression tree into a flat Program (opcodes, constant pool and
+        variable slots) that src.bytecode.execute runs without recursion.
+        """
+        if isinstance(node, ExpressionTree):
+            return Compiler._compile_tree(node)
+
+        program = Program()
+        # Operator and function nodes with several parents (a DAG from CSE)
+        # are emitted once, kept in a temp slot and reloaded for later uses
+        shared = Compiler._shared_nodes(node)
+        temp_of = {}
+
+        # Post-order walk with an explicit stack; a node is emitted on its second visit
+        stack = [(node, False)]
+        while stack:
+            current, visited = stack.pop()
+
+            # A missing operand evaluates to 0, matching evaluate(None)
+            if current is None:
+                program.emit(LOAD_CONST, program.add_constant(0))
+                continue
+
+            value = current.value
+            if visited:
+                if value in FUNCTION_NAMES or value.isalpha():
+                    program.emit(CALL, program.add_function(value))
+                elif value == "!":
+                    program.emit(FACTORIAL)
+                elif current.left is None:
+                    # Unary plus or minus
+                    if value == "-":
+                        program.emit(NEG)
+                else:
+                    program.emit(BINARY_OPCODES[value])
+
+                if id(current) in shared:
+                    temp_of[id(current)] = program.add_temp()
+                    program.emit(STORE_TEMP, temp_of[id(current)])
+                continue
+
+            if is_number(value):
+                program.emit(LOAD_CONST, program.add_constant(value))
+                continue
+
+            if id(current) in temp_of:
+                program.emit(LOAD_TEMP, temp_of[id(current)])
+                continue
+
+            if isinstance(value, str) and value.isalpha() and value not in FUNCTION_NAMES and (
+                current.left is None or value in CONSTANT_NAMES
+            ):
+                if value in CONSTANT_NAMES:
+                    program.emit(LOAD_CONST, program.add_constant(CONSTANT_NAMES[value]))
+                else:
+                    program.emit(LOAD_VAR, program.add_variable(value))
+                continue
+
+            if value in ("+", "-") and current.left is None and current.right is not None:
+                stack.append((current, True))
+                stack.append((current.right, False))
+            elif value in BINARY_OPCODES:
+                # Push right first so the left operand is emitted first
+                stack.append((current, True))
+                stack.append((current.right, False))
+                stack.append((current.left, False))
+            elif value in FUNCTION_NAMES or value == "!" or (isinstance(value, str) and value.isalpha()):
+                # An unknown function is called too; CALL reports it as
+                # evaluate does
+                stack.append((current, True))
+                stack.append((current.left, False))
+            else:
+                raise ValueError(f"Unsupported operation or variable: {value}")
+
+        return program
+
+    @staticmethod
+    def compile_python(
+        node: Node,
+        use_degrees: bool = True,
+        exact: bool = False,
+        max_digits: int = None,
+    ) -> CompiledFunction:
+        """
+        Generate Python source for the expression (usually a simplified tree)
+        and compile it into a native function, so repeated evaluation runs at
+        function-call speed instead of dispatching on every node. The settings
+        are fixed at compile time and mean the same as in evaluate. Compiled
+        functions are cached by tree structure (see src.codegen).
+        """
+        return compile_function(node, use_degrees, exact, max_digits)
+
+    @staticmethod
+    def _shared_nodes(node: Node) -> set:
+        """
+        Return the ids of the non-leaf nodes reachable through more than one
+        parent, i.e. the common subexpressions of a DAG.
+        """
+        seen = set()
+        shared = set()
+        stack = [node] if node is not None else []
+        while stack:
+            current = stack.pop()
+            for child in (current.left, current.right):
+                if child is None or (child.left is None and child.right is None):
+                    continue
+                if id(child) in seen:
+                    shared.add(id(child))
+                else:
+                    seen.add(id(child))
+                    stack.append(child)
+        return shared
+
+    @staticmethod
+    def _compile_tree(tree: ExpressionTree) -> Program:
+        """
+        Compile a struct-of-arrays tree. Its post-order layout already is the
+        instruction order, so this is a single forward scan.
+        """
+        program = Program()
+        if not len(tree):
+            program.emit(LOAD_CONST, program.add_constant(0))
+            return program
+
+        # A hash-consed tree stores a shared subexpression once, so the layout
+        # is no longer the instruction order; compile it as a Node DAG instead
+        if tree.has_shared_nodes():
+            return Compiler.compile(tree.to_node())
+
+        for op, value, left, right in zip(tree.ops, tree.values, tree.left, tree.right):
+            if op == NUMBER:
+                program.emit(LOAD_CONST, program.add_constant(tree.constants[value]))
+                continue
+
+            if op == NAME:
+                name = tree.names[value]
+                if not name.isalpha():
+                    raise ValueError(f"Unsupported operation or variable: {name}")
+                if name in FUNCTION_NAMES or (left >= 0 and name not in CONSTANT_NAMES):
+                    # An unknown function is called too; CALL reports it as
+                    # evaluate does
+                    if left < 0:
+                        program.emit(LOAD_CONST, program.add_constant(0))
+                    program.emit(CALL, program.add_function(name))
+                elif name in CONSTANT_NAMES:
+                    program.emit(LOAD_CONST, program.add_constant(CONSTANT_NAMES[name]))
+                else:
+                    program.emit(LOAD_VAR, program.add_variable(name))
+                continue
+
+            operator = OPERATORS[op]
+            if operator in ("+", "-") and left < 0 and right >= 0:
+                if operator == "-":
+                    program.emit(NEG)
+            elif operator == "!" and left >= 0:
+                program.emit(FACTORIAL)
+            elif operator != "!" and left >= 0 and right >= 0:
+                program.emit(BINARY_OPCODES[operator])
+            else:
+                # A forward scan cannot insert the implicit 0 before an operand
+                raise ValueError(f"Operator '{operator}' is missing an operand.")
+
+        return program
 
     @staticmethod
     def generate_intermediate_representation(node: Node, depth=0) -> str:
         """
         Generate a human-readable string representation of the expression tree.
         """
-        if node is None:
-            return ""
+        if isinstance(node, ExpressionTree):
+            node = node.root
+
+        lines = []
+        # Pre-order walk; push right before left so the left subtree is listed first
+        stack = [(node, depth)]
+        while stack:
+            current, level = stack.pop()
+            if current is None:
+                continue
+            lines.append(f"{'  ' * level}{current.value}\n")
+            stack.append((current.right, level + 1))
+            stack.append((current.left, level + 1))
+
+        return "".join(lines)
+
+
+class IncrementalSimplifier:
+    """
+    Simplify successive versions of an expression, reusing the simplified
+    form of every subtree already seen.
 
-        left_repr = Compiler.generate_intermediate_representation(node.left, depth + 1)
-        right_repr = Compiler.generate_intermediate_representation(node.right, depth + 1)
+    Subtrees are recognized by identity, so only the nodes of a new version
+    that are new objects get simplified, on top of the memoized results for
+    their children. IncrementalParser produces exactly such versions: an edit
+    only creates the nodes on the path from the edit to the root. Results are
+    built through one NodeTable for the whole session, so they equal what
+    Compiler.simplify returns for the same tree.
 
-        representation = f"{'  ' * depth}{node.value}\n"
-        if left_repr:
-            representation += left_repr
-        if right_repr:
-            representation += right_repr
+    Every version passed in is kept alive, since the memo is keyed by id. Once
+    the memo holds more than MAX_MEMO_GROWTH times the nodes of the last full
+    run, the next call starts over from an empty memo.
+
+    Attributes:
+    - exact, max_digits: as for Compiler.simplify
+    - reused: bool
+        Whether the last call reused earlier results.
+    """
+    def __init__(self, exact: bool = False, max_digits: int = MAX_FOLD_DIGITS):
+        self.exact = exact
+        self.max_digits = max_digits
+        self.reused = False
+        self._reset()
+
+    def _reset(self):
+        self._table = NodeTable()
+        self._simplified = {}
+        self._versions = []
+        self._full_size = 0
+
+    def simplify(self, node: Node) -> Node:
+        if node is None:
+            return None
+        if len(self._simplified) > MAX_MEMO_GROWTH * self._full_size:
+            self._reset()
+        self.reused = bool(self._simplified)
+        if not self._versions or self._versions[-1] is not node:
+            self._versions.append(node)
+        result = Compiler._simplify_nodes(node, self._table, self._simplified, self.exact, self.max_digits)
+        if not self.reused:
+            self._full_size = len(self._simplified)
+        return result
 
-        return representation
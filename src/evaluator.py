@@ -1,116 +1,915 @@
 import math
+from decimal import localcontext
+from fractions import Fraction
 from src.parser import Node
+from src.tree import ExpressionTree, NUMBER, NAME, OPERATORS
+from src.interval import Interval, as_interval, interval_operation
+from src.precision import GUARD_DIGITS, precision_context, to_decimal, constant, precise_operator, precise_function
+from src.registry import REGISTRY, ARGUMENT_SEPARATOR, BUILTIN_CONSTANTS, Arguments, join_arguments
 
-def evaluate(node: Node, context: dict = None, use_degrees: bool = True):
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed for evaluate_batch
+    np = None
+
+# Names the evaluator resolves itself rather than looking up in the context:
+# the registry's own dicts (name -> Function, name -> value), so a membership
+# test is one dict lookup and sees functions and constants registered later
+FUNCTION_NAMES = REGISTRY.functions
+CONSTANT_NAMES = REGISTRY.constants
+# ',' joins the arguments of a call with several (see src.registry)
+BINARY_OPERATORS = ("+", "-", "*", "/", "%", "^", "//", ARGUMENT_SEPARATOR)
+
+
+def evaluate(
+    node: Node,
+    context: dict = None,
+    use_degrees: bool = True,
+    exact: bool = False,
+    max_digits: int = None,
+    workers: int = 1,
+    precision: int = None,
+):
     """
-    Recursively evaluate the expression tree and return a numerical result.
+    Evaluate the expression tree and return a numerical result.
+
+    The tree is walked in post-order with an explicit stack, so deep trees do
+    not hit the interpreter's recursion limit.
 
     Parameters:
-    - node: Node
-        The root of the expression tree.
+    - node: Node or ExpressionTree
+        The root of the expression tree, or a struct-of-arrays tree.
     - context: dict
         A dictionary mapping variable names to their numerical values.
     - use_degrees: bool
         If True, trigonometric functions interpret angles as degrees.
         If False, use radians.
+    - exact: bool
+        If True, '/' and '^' on ints and Fractions return exact ints or
+        Fractions instead of floats; only functions and non-rational powers
+        fall back to floats.
+    - max_digits: int
+        If given, a '^', '*' or '!' whose result would have more digits than
+        this raises ValueError instead of being computed (see estimate_digits).
+    - workers: int
+        With more than one worker, large trees are split into independent
+        subtrees evaluated in a process pool (see src.parallel). Only grouped
+        expressions split; a flat a + b + c + ... chain runs serially.
+    - precision: int
+        If given, compute with decimal arithmetic to this many significant
+        digits instead of floats (see src.precision). Ints, and Fractions in
+        exact mode, stay exact wherever evaluate keeps them exact; anything
+        else is a Decimal rounded to `precision` digits. Ignores `workers`.
     """
-    if node is None:
-        return 0
     if context is None:
         context = {}
+    if precision is not None:
+        if precision < 1:
+            raise ValueError("Precision must be at least 1 digit.")
+        tree = node if isinstance(node, ExpressionTree) else ExpressionTree.from_node(node)
+        return _evaluate_precise(tree, context, use_degrees, exact, max_digits, precision)
+    if workers > 1:
+        # Imported here: src.parallel builds on this module
+        from src.parallel import evaluate_parallel
+        return evaluate_parallel(node, context, use_degrees, exact, max_digits, workers)
+    if isinstance(node, ExpressionTree):
+        return _evaluate_tree(node, context, use_degrees, exact, max_digits)
+
+    # Nodes on `stack` are visited for the first time; a (node,) tuple marks
+    # the second visit, once its operands are on top of `results`
+    results = []
+    push_result = results.append
+    pop_result = results.pop
+    # Results of operator and function nodes by id, so a subexpression shared
+    # by several parents (see Compiler.eliminate_common_subexpressions) is
+    # evaluated once. Every node stays reachable from `node`, so ids are stable.
+    cache = {}
+    stack = [node]
+    push = stack.append
+    pop = stack.pop
+    while stack:
+        current = pop()
+
+        # A missing operand evaluates to 0 (this is what makes unary minus work)
+        if current is None:
+            push_result(0)
+            continue
+
+        if current.__class__ is tuple:
+            # Second visit: the operands are on top of `results`
+            current = current[0]
+            value = current.value
+            if value in FUNCTION_NAMES:
+                result = apply_function(value, pop_result(), use_degrees, exact)
+            elif value == "!":
+                # Factorial
+                result = exact_number(pop_result())
+                if not isinstance(result, int) or result < 0:
+                    raise ValueError("Factorial is only defined for non-negative integers.")
+                if max_digits is not None:
+                    check_digits("!", result, None, max_digits)
+                result = math.factorial(result)
+            else:
+                right_val = pop_result()
+                left_val = pop_result()
+                if max_digits is not None:
+                    check_digits(value, left_val, right_val, max_digits)
+                result = apply_operator(value, left_val, right_val, exact)
+            cache[id(current)] = result
+            push_result(result)
+            continue
+
+        value = current.value
+        # If node is numeric, return it
+        if isinstance(value, (int, float)):
+            push_result(value)
+            continue
+
+        cached = cache.get(id(current))
+        if cached is not None:
+            push_result(cached)
+            continue
+
+        if value in BINARY_OPERATORS:
+            # Push right first so the left operand is evaluated first
+            push((current,))
+            push(current.right)
+            push(current.left)
+        elif value in FUNCTION_NAMES or value == "!":
+            push((current,))
+            push(current.left)
+        # Otherwise it must be a constant or a variable
+        elif isinstance(value, str) and value.isalpha():
+            if value in CONSTANT_NAMES:
+                push_result(CONSTANT_NAMES[value])
+            elif current.left is not None:
+                raise ValueError(f"Unsupported function '{value}'")
+            elif value in context:
+                push_result(context[value])
+            else:
+                raise ValueError(f"Variable '{value}' is not defined.")
+        elif value.__class__ is Fraction:
+            # Exact-mode constants; rare, so checked last
+            push_result(value)
+        else:
+            raise ValueError(f"Unsupported operation or variable: {value}")
+
+    return exact_number(pop_result()) if exact else pop_result()
+
+
+def _evaluate_tree(
+    tree: ExpressionTree,
+    context: dict,
+    use_degrees: bool,
+    exact: bool = False,
+    max_digits: int = None,
+):
+    """
+    Evaluate a struct-of-arrays tree with one forward scan over its
+    post-order layout.
+    """
+    if not len(tree):
+        return 0
+
+    results = [0] * len(tree)
+    constants, names = tree.constants, tree.names
+    for i, (op, value, left, right) in enumerate(zip(tree.ops, tree.values, tree.left, tree.right)):
+        if op == NUMBER:
+            results[i] = constants[value]
+        elif op == NAME:
+            name = names[value]
+            if not name.isalpha():
+                raise ValueError(f"Unsupported operation or variable: {name}")
+            if name in FUNCTION_NAMES:
+                results[i] = apply_function(name, results[left] if left >= 0 else 0, use_degrees, exact)
+            elif name in CONSTANT_NAMES:
+                results[i] = CONSTANT_NAMES[name]
+            elif left >= 0:
+                raise ValueError(f"Unsupported function '{name}'")
+            elif name in context:
+                results[i] = context[name]
+            else:
+                raise ValueError(f"Variable '{name}' is not defined.")
+        elif OPERATORS[op] == "!":
+            value = exact_number(results[left]) if left >= 0 else 0
+            if not isinstance(value, int) or value < 0:
+                raise ValueError("Factorial is only defined for non-negative integers.")
+            if max_digits is not None:
+                check_digits("!", value, None, max_digits)
+            results[i] = math.factorial(value)
+        else:
+            left_val = results[left] if left >= 0 else 0
+            right_val = results[right] if right >= 0 else 0
+            if max_digits is not None:
+                check_digits(OPERATORS[op], left_val, right_val, max_digits)
+            results[i] = apply_operator(OPERATORS[op], left_val, right_val, exact)
+
+    return exact_number(results[-1]) if exact else results[-1]
+
+
+def _evaluate_precise(
+    tree: ExpressionTree,
+    context: dict,
+    use_degrees: bool,
+    exact: bool,
+    max_digits: int,
+    precision: int,
+):
+    """
+    Evaluate a struct-of-arrays tree with decimal arithmetic, carrying
+    GUARD_DIGITS extra digits and rounding the result to `precision`.
+    """
+    if not len(tree):
+        return 0
+
+    results = [0] * len(tree)
+    constants, names = tree.constants, tree.names
+    with localcontext(precision_context(precision + GUARD_DIGITS)):
+        for i, (op, value, left, right) in enumerate(zip(tree.ops, tree.values, tree.left, tree.right)):
+            if op == NUMBER:
+                results[i] = constants[value]
+            elif op == NAME:
+                name = names[value]
+                if not name.isalpha():
+                    raise ValueError(f"Unsupported operation or variable: {name}")
+                if name in FUNCTION_NAMES:
+                    results[i] = _precise_function(name, results[left] if left >= 0 else 0, use_degrees, exact)
+                elif name in BUILTIN_CONSTANTS:
+                    results[i] = constant(name, precision + GUARD_DIGITS)
+                elif name in CONSTANT_NAMES:
+                    results[i] = CONSTANT_NAMES[name]
+                elif left >= 0:
+                    raise ValueError(f"Unsupported function '{name}'")
+                elif name in context:
+                    results[i] = context[name]
+                else:
+                    raise ValueError(f"Variable '{name}' is not defined.")
+            elif OPERATORS[op] == "!":
+                value = exact_number(results[left]) if left >= 0 else 0
+                if not isinstance(value, int) or value < 0:
+                    raise ValueError("Factorial is only defined for non-negative integers.")
+                if max_digits is not None:
+                    check_digits("!", value, None, max_digits)
+                results[i] = math.factorial(value)
+            else:
+                left_val = results[left] if left >= 0 else 0
+                right_val = results[right] if right >= 0 else 0
+                if max_digits is not None:
+                    check_digits(OPERATORS[op], left_val, right_val, max_digits)
+                results[i] = _precise_operator(OPERATORS[op], left_val, right_val, exact)
+
+    result = results[-1]
+    if _is_rational(result):
+        return exact_number(result) if exact else result
+    with localcontext(precision_context(precision)):
+        return +to_decimal(result)
+
+
+def _is_rational(value) -> bool:
+    return isinstance(value, int) or value.__class__ is Fraction
+
+
+def _precise_operator(operator: str, left_val, right_val, exact: bool):
+    if operator == ARGUMENT_SEPARATOR:
+        return join_arguments(left_val, right_val)
+    # Ints and Fractions stay exact where evaluate would keep them exact;
+    # everything else becomes a Decimal
+    if _is_rational(left_val) and _is_rational(right_val):
+        if operator in ("+", "-", "*", "%", "//") or (operator == "/" and exact):
+            return apply_operator(operator, left_val, right_val, exact)
+        if operator == "^":
+            exponent = exact_number(right_val)
+            if exponent.__class__ is int and (exponent >= 0 or (exact and left_val != 0)):
+                return exact_power(left_val, exponent)
+            if exact and left_val >= 0:
+                result = exact_power(left_val, exponent)
+                if result.__class__ is not float:
+                    return result
+    return precise_operator(operator, left_val, right_val)
+
+
+def _precise_function(name: str, arg_val, use_degrees: bool, exact: bool):
+    if not FUNCTION_NAMES[name].builtin:
+        # Registered functions compute as they do in evaluate; arithmetic on
+        # their results is decimal again
+        return apply_function(name, arg_val, use_degrees, exact)
+    (arg_val,) = REGISTRY.arguments(name, arg_val)
+    if exact and name == "sqrt" and _is_rational(arg_val) and arg_val >= 0:
+        root = _exact_root(arg_val, 2)
+        if root is not None:
+            return root
+    return precise_function(name, arg_val, use_degrees)
+
+
+def apply_operator(operator: str, left_val, right_val, exact: bool = False):
+    """
+    Apply a binary operator to two already evaluated operands. With exact=True,
+    '/' and '^' use exact_divide and exact_power.
+    """
+    if operator == "+":
+        return left_val + right_val
+    elif operator == "-":
+        return left_val - right_val
+    elif operator == "*":
+        return left_val * right_val
+    elif operator == "/":
+        if right_val == 0:
+            raise ValueError("Division by zero is not allowed.")
+        if exact:
+            return exact_divide(left_val, right_val)
+        return left_val / right_val
+    elif operator == "%":
+        if right_val == 0:
+            raise ValueError("Modulo by zero is not allowed.")
+        return left_val % right_val
+    elif operator == "^":
+        if exact:
+            return exact_power(left_val, right_val)
+        return left_val ** right_val
+    elif operator == "//":
+        if right_val == 0:
+            raise ValueError("Integer division by zero is not allowed.")
+        return left_val // right_val
+    elif operator == ARGUMENT_SEPARATOR:
+        return join_arguments(left_val, right_val)
 
-    # If node is numeric, return it
-    if isinstance(node.value, (int, float)):
-        return node.value
-
-    # If node is a recognized function or constant
-    if isinstance(node.value, str) and node.value.isalpha():
-        # Recognized functions
-        if node.value in ("sin", "cos", "tan", "log", "sqrt", "abs", "exp", "floor", "ceil"):
-            return _evaluate_function(node, context, use_degrees)
-        elif node.value in ("pi", "e"):
-            return getattr(math, node.value)
-        # Otherwise, treat as a variable
-        if node.value in context:
-            return context[node.value]
-        raise ValueError(f"Variable '{node.value}' is not defined.")
-
-    # Handle binary operators
-    if node.value in ("+", "-", "*", "/", "%", "^", "//"):
-        left_val = evaluate(node.left, context, use_degrees)
-        right_val = evaluate(node.right, context, use_degrees)
-
-        if node.value == "+":
-            return left_val + right_val
-        elif node.value == "-":
-            return left_val - right_val
-        elif node.value == "*":
-            return left_val * right_val
-        elif node.value == "/":
-            if right_val == 0:
-                raise ValueError("Division by zero is not allowed.")
-            return left_val / right_val
-        elif node.value == "%":
-            if right_val == 0:
-                raise ValueError("Modulo by zero is not allowed.")
-            return left_val % right_val
-        elif node.value == "^":
-            return left_val ** right_val
-        elif node.value == "//":
-            if right_val == 0:
-                raise ValueError("Integer division by zero is not allowed.")
-            return left_val // right_val
-
-    # Handle unary operators
-    if node.value == "!":
-        # Factorial
-        value = evaluate(node.left, context, use_degrees)
-        if not isinstance(value, int) or value < 0:
-            raise ValueError("Factorial is only defined for non-negative integers.")
-        return math.factorial(value)
-
-    if node.value in ("+", "-") and node.left is None and node.right is not None:
-        # Unary plus or minus
-        right_val = evaluate(node.right, context, use_degrees)
-        if node.value == "+":
-            return right_val
-        else:  # unary minus
-            return -right_val
-
-    raise ValueError(f"Unsupported operation or variable: {node.value}")
-
-
-def _evaluate_function(node: Node, context: dict, use_degrees: bool):
-    """
-    Helper to evaluate built-in functions: sin, cos, tan, log, sqrt, abs, exp, floor, ceil.
-    """
-    arg_val = evaluate(node.left, context, use_degrees)
-
-    # Decide degrees vs radians for trig
-    if use_degrees and node.value in ("sin", "cos", "tan"):
+    raise ValueError(f"Unsupported operator: {operator}")
+
+
+def apply_function(name: str, arg_val, use_degrees: bool = True, exact: bool = False):
+    """
+    Apply the function `name` to an already evaluated argument (Arguments
+    for a call with several), dispatching through the registry. With
+    exact=True, the square root of a perfect square stays exact.
+    """
+    function = FUNCTION_NAMES.get(name)
+    if function is None or function.arity != 1 or arg_val.__class__ is Arguments:
+        # Unknown functions and calls with several arguments, or the wrong
+        # number of them; the registry checks and reports
+        return REGISTRY.call(name, arg_val, use_degrees)
+    if exact and name == "sqrt" and isinstance(arg_val, (int, Fraction)) and arg_val >= 0:
+        root = _exact_root(arg_val, 2)
+        if root is not None:
+            return root
+    if use_degrees and function.angle:
         arg_val = math.radians(arg_val)
+    return function.implementation(arg_val)
+
+
+def estimate_digits(operator: str, left_val, right_val=None) -> float:
+    """
+    Estimate the number of decimal digits in the result of a '^', '*' or '!'
+    on exact operands without computing it: lgamma for factorials and
+    exponent * log10(base) for powers. Results that cannot grow beyond a
+    float (and every other operator) are estimated as 0.
+    """
+    if operator == "!":
+        if not isinstance(left_val, int) or left_val < 2:
+            return 0
+        if left_val.bit_length() > 1000:
+            return math.inf
+        return math.lgamma(left_val + 1) / math.log(10)
+    if operator == "^":
+        base, exponent = exact_number(left_val), exact_number(right_val)
+        if not isinstance(base, (int, Fraction)) or not isinstance(exponent, (int, Fraction)):
+            return 0
+        base_digits = _digits(base)
+        if base_digits == 0 or exponent == 0:
+            # |base| is 0 or 1, or the result is 1
+            return 0
+        if _bit_length(exponent) > 1000:
+            return math.inf
+        return abs(float(exponent)) * base_digits
+    if operator == "*":
+        if isinstance(left_val, (int, Fraction)) and isinstance(right_val, (int, Fraction)):
+            return _digits(left_val) + _digits(right_val)
+    return 0
+
+
+def check_digits(operator: str, left_val, right_val, max_digits: int):
+    """
+    Raise ValueError if estimate_digits exceeds `max_digits`.
+    """
+    if operator in ("^", "*", "!"):
+        digits = estimate_digits(operator, left_val, right_val)
+        if digits > max_digits:
+            raise ValueError(
+                f"Result of '{operator}' would have about {digits:.0f} digits, "
+                f"more than the limit of {max_digits}."
+            )
+
+
+def _bit_length(value) -> int:
+    if value.__class__ is Fraction:
+        return max(abs(value.numerator).bit_length(), value.denominator.bit_length())
+    return abs(value).bit_length()
+
+
+def _digits(value) -> float:
+    # log10 of the larger of |numerator| and denominator; math.log10 accepts
+    # ints of any size
+    if value.__class__ is Fraction:
+        return max(_digits(value.numerator), _digits(value.denominator))
+    value = abs(value)
+    return 0 if value <= 1 else math.log10(value)
+
+
+def is_number(value) -> bool:
+    """
+    True for numeric literals and results: int, float or (in exact mode) Fraction.
+    """
+    # Cheaper than isinstance(value, Fraction), which goes through ABCMeta
+    return isinstance(value, (int, float)) or value.__class__ is Fraction
 
-    if node.value == "sin":
-        return math.sin(arg_val)
-    elif node.value == "cos":
-        return math.cos(arg_val)
-    elif node.value == "tan":
-        return math.tan(arg_val)
-    elif node.value == "log":
-        if arg_val <= 0:
-            raise ValueError("Logarithm is only defined for positive numbers.")
-        return math.log(arg_val)
-    elif node.value == "sqrt":
-        if arg_val < 0:
-            raise ValueError("Square root is not defined for negative numbers.")
-        return math.sqrt(arg_val)
-    elif node.value == "abs":
-        return abs(arg_val)
-    elif node.value == "exp":
-        return math.exp(arg_val)
-    elif node.value == "floor":
-        return math.floor(arg_val)
-    elif node.value == "ceil":
-        return math.ceil(arg_val)
+
+def exact_number(value):
+    """
+    Collapse a Fraction with denominator 1 to an int; leave anything else as is.
+    """
+    if value.__class__ is Fraction and value.denominator == 1:
+        return value.numerator
+    return value
+
+
+def exact_divide(left_val, right_val):
+    """
+    Divide without leaving the rationals: ints and Fractions give an int when
+    the quotient is whole and a Fraction otherwise. Floats divide as usual.
+    The caller has already rejected a zero divisor.
+    """
+    if left_val.__class__ is int and right_val.__class__ is int:
+        # Big-integer fast path: no Fraction (and no gcd) for whole quotients
+        quotient, remainder = divmod(left_val, right_val)
+        if remainder == 0:
+            return quotient
+        return Fraction(left_val, right_val)
+    if isinstance(left_val, (int, Fraction)) and isinstance(right_val, (int, Fraction)):
+        return exact_number(Fraction(left_val) / right_val)
+    return left_val / right_val
+
+
+def exact_power(base, exponent):
+    """
+    Raise to a power without leaving the rationals where possible: integer
+    exponents (including negative ones) and rational exponents whose root is
+    exact, such as 4^(1/2) or (8/27)^(2/3). Other powers fall back to floats.
+    """
+    if isinstance(base, (int, Fraction)):
+        exponent = exact_number(exponent)
+        if exponent.__class__ is int:
+            if exponent >= 0:
+                return base ** exponent
+            if base != 0:
+                return exact_number(Fraction(base) ** exponent)
+        elif exponent.__class__ is Fraction and base >= 0:
+            root = _exact_root(base, exponent.denominator)
+            if root is not None:
+                return exact_power(root, exponent.numerator)
+    return base ** exponent
+
+
+def _exact_root(value, n: int):
+    """
+    The exact n-th root of a non-negative int or Fraction, or None if it is
+    irrational.
+    """
+    if value.__class__ is Fraction:
+        numerator = _integer_root(value.numerator, n)
+        denominator = _integer_root(value.denominator, n)
+        if numerator is None or denominator is None:
+            return None
+        return Fraction(numerator, denominator)
+    return _integer_root(value, n)
+
+
+def _integer_root(value: int, n: int):
+    if value < 2:
+        return value if value >= 0 else None
+    if n >= value.bit_length():
+        # 1 < root < 2: no integer root
+        return None
+    if n == 2:
+        root = math.isqrt(value)
     else:
-        raise ValueError(f"Unsupported function '{node.value}'")
+        # Newton's method on integers, starting above the root
+        root = 1 << -(-value.bit_length() // n)
+        while True:
+            estimate = ((n - 1) * root + value // root ** (n - 1)) // n
+            if estimate >= root:
+                break
+            root = estimate
+    return root if root ** n == value else None
+
+
+class BatchResult:
+    """
+    The outcome of evaluating one expression over a batch of variable bindings.
+
+    Attributes:
+    - values: numpy.ndarray
+        One result per row; rows that hit a domain error hold NaN.
+    - errors: dict
+        Maps an error message (the same text evaluate would raise) to a boolean
+        mask of the rows that failed with it. A row appears under at most one
+        message: the first error hit in evaluation order.
+    """
+    def __init__(self, values, errors):
+        self.values = values
+        self.errors = errors
+
+    @property
+    def valid(self):
+        """
+        Boolean mask of the rows that evaluated without error.
+        """
+        mask = np.ones(len(self.values), dtype=bool)
+        for error_mask in self.errors.values():
+            mask &= ~error_mask
+        return mask
+
+    def __repr__(self):
+        counts = {message: int(mask.sum()) for message, mask in self.errors.items()}
+        return f"BatchResult(rows={len(self.values)}, errors={counts})"
+
+
+def evaluate_batch(node: Node, columns, use_degrees: bool = True) -> BatchResult:
+    """
+    Evaluate the expression tree once, elementwise, over whole columns of
+    variable bindings.
+
+    Parameters:
+    - node: Node
+        The root of the expression tree.
+    - columns: mapping or record batch
+        Maps variable names to equal-length array-likes. Objects exposing
+        `column_names` and `column(name)` (e.g. a pyarrow RecordBatch) are
+        accepted as well.
+    - use_degrees: bool
+        If True, trigonometric functions interpret angles as degrees.
+        If False, use radians.
+
+    Arithmetic follows NumPy semantics for the column dtypes, so fixed-width
+    integers can wrap where evaluate would grow a Python int. Domain errors
+    (division, modulo or integer division by zero, log of a non-positive
+    number, sqrt of a negative number, factorial of a negative or
+    non-integer value, or a ValueError raised by a registered function) do
+    not abort the batch; they are reported per row in BatchResult.errors.
+    """
+    if np is None:
+        raise ImportError("evaluate_batch requires NumPy. Install it with 'pip install numpy'.")
+
+    if hasattr(columns, "column_names"):
+        columns = {name: columns.column(name) for name in columns.column_names}
+
+    lengths = {len(column) for column in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError("All columns in a batch must have the same length.")
+    rows = lengths.pop() if lengths else 1
+
+    invalid = np.zeros(rows, dtype=bool)
+    errors = {}
+    arrays = {}
+
+    def flag(mask, message):
+        # Only rows that are still valid can fail here
+        new_errors = np.broadcast_to(mask, (rows,)) & ~invalid
+        if new_errors.any():
+            errors[message] = errors.get(message, np.zeros(rows, dtype=bool)) | new_errors
+            invalid[:] |= new_errors
+
+    # Post-order walk with an explicit stack; operands accumulate on `results`
+    results = []
+    # Shared subexpressions (a DAG from CSE) are computed once; see evaluate
+    cache = {}
+    stack = [(node, False)]
+    with np.errstate(all="ignore"):
+        while stack:
+            current, visited = stack.pop()
+
+            if current is None:
+                results.append(np.asarray(0))
+                continue
+
+            value = current.value
+            if is_number(value):
+                # Exact-mode Fractions become floats in a column
+                results.append(np.asarray(float(value) if value.__class__ is Fraction else value))
+                continue
+
+            if visited:
+                # Remember this node's columns once they have been computed below
+                stack.append((current, None))
+            elif visited is None:
+                cache[id(current)] = results[-1]
+                continue
+            elif id(current) in cache:
+                results.append(cache[id(current)])
+                continue
+
+            if isinstance(value, str) and value.isalpha():
+                if value in FUNCTION_NAMES:
+                    if visited:
+                        results.append(_apply_function_batch(value, results.pop(), use_degrees, flag))
+                    else:
+                        stack.append((current, True))
+                        stack.append((current.left, False))
+                elif value in CONSTANT_NAMES:
+                    results.append(np.asarray(CONSTANT_NAMES[value]))
+                elif value in columns:
+                    if value not in arrays:
+                        arrays[value] = np.asarray(columns[value])
+                    results.append(arrays[value])
+                else:
+                    raise ValueError(f"Variable '{value}' is not defined.")
+                continue
+
+            if value in ("+", "-") and current.left is None and current.right is not None:
+                if visited:
+                    if value == "-":
+                        # 0 - x rather than -x, so 0.0 stays 0.0 as in evaluate
+                        results.append(np.subtract(0, results.pop()))
+                else:
+                    stack.append((current, True))
+                    stack.append((current.right, False))
+                continue
+
+            if value in ("+", "-", "*", "/", "%", "^", "//", ARGUMENT_SEPARATOR):
+                if visited:
+                    right_val = results.pop()
+                    left_val = results.pop()
+                    results.append(_apply_operator_batch(value, left_val, right_val, flag))
+                else:
+                    stack.append((current, True))
+                    stack.append((current.right, False))
+                    stack.append((current.left, False))
+                continue
+
+            if value == "!":
+                if visited:
+                    results.append(_factorial_batch(results.pop(), flag))
+                else:
+                    stack.append((current, True))
+                    stack.append((current.left, False))
+                continue
+
+            raise ValueError(f"Unsupported operation or variable: {value}")
+
+    values = np.array(np.broadcast_to(results.pop(), (rows,)))
+    if invalid.any():
+        if values.dtype.kind in "biu":
+            values = values.astype(float)
+        values[invalid] = np.nan
+    return BatchResult(values, errors)
+
+
+def _apply_operator_batch(operator: str, left_val, right_val, flag):
+    """
+    Elementwise counterpart of the binary operators in evaluate.
+    """
+    if operator == ARGUMENT_SEPARATOR:
+        # The argument columns of a call with several
+        return join_arguments(left_val, right_val)
+    if operator == "+":
+        return np.add(left_val, right_val)
+    elif operator == "-":
+        return np.subtract(left_val, right_val)
+    elif operator == "*":
+        return np.multiply(left_val, right_val)
+    elif operator == "^":
+        # Integer arrays cannot take negative exponents in NumPy, so widen them
+        if np.asarray(left_val).dtype.kind in "biu" and np.asarray(right_val).dtype.kind in "biu":
+            if np.any(np.asarray(right_val) < 0):
+                left_val = np.asarray(left_val, dtype=float)
+        return np.power(left_val, right_val)
+
+    messages = {
+        "/": "Division by zero is not allowed.",
+        "%": "Modulo by zero is not allowed.",
+        "//": "Integer division by zero is not allowed.",
+    }
+    zero = right_val == 0
+    flag(zero, messages[operator])
+    # Substitute a harmless divisor on failing rows; their results are discarded
+    safe_right = np.where(zero, 1, right_val)
+    if operator == "/":
+        return np.true_divide(left_val, safe_right)
+    elif operator == "%":
+        return np.mod(left_val, safe_right)
+    return np.floor_divide(left_val, safe_right)
+
+
+def _apply_function_batch(name: str, arg_val, use_degrees: bool, flag):
+    """
+    Elementwise counterpart of apply_function. Built-ins use their NumPy
+    equivalents; other registered functions are called one row at a time.
+    """
+    function = FUNCTION_NAMES.get(name)
+    if function is None or not function.builtin or arg_val.__class__ is Arguments:
+        return _call_function_batch(name, arg_val, use_degrees, flag)
+
+    if use_degrees and name in ("sin", "cos", "tan"):
+        arg_val = np.radians(arg_val)
+
+    if name == "sin":
+        return np.sin(arg_val)
+    elif name == "cos":
+        return np.cos(arg_val)
+    elif name == "tan":
+        return np.tan(arg_val)
+    elif name == "log":
+        bad = arg_val <= 0
+        flag(bad, "Logarithm is only defined for positive numbers.")
+        return np.log(np.where(bad, 1, arg_val))
+    elif name == "sqrt":
+        bad = arg_val < 0
+        flag(bad, "Square root is not defined for negative numbers.")
+        return np.sqrt(np.where(bad, 0, arg_val))
+    elif name == "abs":
+        return np.abs(arg_val)
+    elif name == "exp":
+        return np.exp(arg_val)
+    elif name == "floor":
+        return np.floor(arg_val)
+    elif name == "ceil":
+        return np.ceil(arg_val)
+    else:
+        raise ValueError(f"Unsupported function '{name}'")
+
+
+def _call_function_batch(name: str, arg_val, use_degrees: bool, flag):
+    """
+    Apply a function with no NumPy equivalent, such as one added with
+    REGISTRY.register_function, row by row through REGISTRY.call. A row whose
+    call raises ValueError is flagged with its message and holds NaN.
+    """
+    # Checks the name and the number of arguments once, as evaluate would
+    args = REGISTRY.arguments(name, arg_val)
+    # Python numbers, so functions see what evaluate would pass them
+    rows = zip(*(column.tolist() for column in np.broadcast_arrays(*map(np.atleast_1d, args))))
+    results = []
+    failed = {}
+    for row, values in enumerate(rows):
+        try:
+            results.append(REGISTRY.call(name, Arguments(values) if len(values) > 1 else values[0], use_degrees))
+        except ValueError as error:
+            failed.setdefault(str(error), []).append(row)
+            results.append(math.nan)
+    results = np.array(results)
+    for message, failed_rows in failed.items():
+        mask = np.zeros(len(results), dtype=bool)
+        mask[failed_rows] = True
+        flag(mask, message)
+    return results
+
+
+def _factorial_batch(arg_val, flag):
+    """
+    Elementwise factorial; like evaluate, only integer inputs are accepted.
+    """
+    arg_val = np.asarray(arg_val)
+    if arg_val.dtype.kind in "biu":
+        bad = arg_val < 0
+    else:
+        bad = np.ones(arg_val.shape, dtype=bool)
+    flag(bad, "Factorial is only defined for non-negative integers.")
+
+    safe = np.where(bad, 0, arg_val).astype(np.int64)
+    # 20! is the largest factorial that fits in int64; keep larger ones as Python ints
+    dtype = np.int64 if safe.size == 0 or safe.max() <= 20 else object
+    return np.array([math.factorial(k) for k in safe.ravel().tolist()], dtype=dtype).reshape(safe.shape)
+
+
+class IntervalResult:
+    """
+    Bounds on an expression over ranges of its variables.
+
+    Attributes:
+    - bounds: Interval
+        Every value evaluate can return for variables in the ranges lies in it.
+    - errors: dict
+        Maps the message of each error that evaluation may hit to True if it
+        is certain to: every point of the ranges that gets that far fails.
+        Besides evaluate's own errors, float overflow and complex powers are
+        flagged (see src.interval).
+    """
+    def __init__(self, bounds: Interval, errors: dict):
+        self.bounds = bounds
+        self.errors = errors
+
+    @property
+    def safe(self) -> bool:
+        """
+        True if no error is possible anywhere in the ranges.
+        """
+        return not self.errors
+
+    def __repr__(self):
+        return f"IntervalResult(bounds={self.bounds}, errors={self.errors})"
+
+
+def _merge_errors(left: dict, right: dict) -> dict:
+    if not left:
+        return right
+    if not right:
+        return left
+    merged = dict(left)
+    for message, certain in right.items():
+        merged[message] = merged.get(message, False) or certain
+    return merged
+
+
+def _interval_node(value, left, right, ranges: dict, use_degrees: bool):
+    # Bounds and subtree errors of one node from those of its operands
+    # ((Interval, errors) pairs, or None when missing)
+    if is_number(value):
+        return Interval(value), {}
+    if value == ARGUMENT_SEPARATOR:
+        raise ValueError("Interval bounds of functions with several arguments are not supported.")
+    if value in FUNCTION_NAMES or value == "!" or value in BINARY_OPERATORS:
+        errors = _merge_errors(left[1] if left else {}, right[1] if right else {})
+        bounds, own = interval_operation(
+            value, left[0] if left else None, None if value in FUNCTION_NAMES or right is None else right[0],
+            use_degrees,
+        )
+        return bounds, _merge_errors(errors, own)
+    if isinstance(value, str) and value.isalpha():
+        if value in CONSTANT_NAMES:
+            return Interval(CONSTANT_NAMES[value]), {}
+        if value in ranges:
+            return as_interval(ranges[value]), {}
+        raise ValueError(f"Variable '{value}' is not defined.")
+    raise ValueError(f"Unsupported operation or variable: {value}")
+
+
+def evaluate_interval(
+    node: Node,
+    ranges: dict = None,
+    use_degrees: bool = True,
+    on_node=None,
+) -> IntervalResult:
+    """
+    Bound the expression over ranges of its variables with interval
+    arithmetic, in one pass over the tree and without sampling points.
+
+    Parameters:
+    - node: Node or ExpressionTree
+        The root of the expression tree, or a struct-of-arrays tree.
+    - ranges: dict
+        Maps variable names to an Interval, a (lo, hi) pair or a single value.
+        Use -math.inf and math.inf for unbounded ranges.
+    - use_degrees: bool
+        If True, trigonometric functions interpret angles as degrees.
+        If False, use radians.
+    - on_node: callable
+        If given, called as on_node(node, bounds, errors) for every node of a
+        Node tree once its subtree is bounded, with the errors possible in
+        that subtree (see Compiler.prune).
+
+    Bounds are sound: float results are rounded outward, so they hold
+    despite rounding errors. They can be wider than the true range when a
+    variable occurs more than once (x - x bounds to [lo - hi, hi - lo]).
+    """
+    if ranges is None:
+        ranges = {}
+    if isinstance(node, ExpressionTree):
+        results = [None] * len(node)
+        for i in range(len(node)):
+            left, right = node.left[i], node.right[i]
+            results[i] = _interval_node(
+                node.value(i),
+                results[left] if left >= 0 else None,
+                results[right] if right >= 0 else None,
+                ranges,
+                use_degrees,
+            )
+        return IntervalResult(*results[-1]) if results else IntervalResult(Interval(0), {})
+    if node is None:
+        return IntervalResult(Interval(0), {})
+
+    # Post-order walk; shared nodes are bounded once, as in evaluate
+    results = {}
+    stack = [(node, False)]
+    while stack:
+        current, visited = stack.pop()
+        if id(current) in results:
+            continue
+        if not visited:
+            stack.append((current, True))
+            # Function arguments are on the left; a variable's children are ignored
+            if current.right is not None:
+                stack.append((current.right, False))
+            if current.left is not None:
+                stack.append((current.left, False))
+            continue
+        result = _interval_node(
+            current.value,
+            results[id(current.left)] if current.left is not None else None,
+            results[id(current.right)] if current.right is not None else None,
+            ranges,
+            use_degrees,
+        )
+        results[id(current)] = result
+        if on_node is not None:
+            on_node(current, *result)
+    return IntervalResult(*results[id(node)])
+
@@ -0,0 +1,375 @@
+import math
+
+# Errors interval evaluation flags besides the ones evaluate raises itself
+OVERFLOW_MESSAGE = "Result is too large for a float."
+ZERO_POWER_MESSAGE = "Zero cannot be raised to a negative power."
+COMPLEX_MESSAGE = "A negative number raised to a fractional power is complex."
+
+DIVISION_MESSAGES = {
+    "/": "Division by zero is not allowed.",
+    "%": "Modulo by zero is not allowed.",
+    "//": "Integer division by zero is not allowed.",
+}
+LOG_MESSAGE = "Logarithm is only defined for positive numbers."
+SQRT_MESSAGE = "Square root is not defined for negative numbers."
+FACTORIAL_MESSAGE = "Factorial is only defined for non-negative integers."
+
+# Integer powers with more digits than this are bounded with floats instead
+# of being computed
+MAX_EXACT_POWER_DIGITS = 300
+# Factorials of larger arguments are bounded by infinity
+MAX_EXACT_FACTORIAL = 1_000
+# Trigonometric bounds are [-1, 1] beyond this magnitude, where the spacing
+# of floats is coarser than the period
+MAX_PERIODIC_ARGUMENT = 1e15
+
+
+class Interval:
+    """
+    A closed range [lo, hi] of numbers.
+
+    Bounds are ints, Fractions or floats, including infinities for unbounded
+    ranges. Interval evaluation keeps them sound: every value evaluate can
+    produce for operands in the input intervals lies within the result.
+
+    Attributes:
+    - lo, hi: int, float or Fraction
+        The lower and upper bound, lo <= hi.
+    """
+    __slots__ = ("lo", "hi")
+
+    def __init__(self, lo, hi=None):
+        if hi is None:
+            hi = lo
+        if not lo <= hi:
+            raise ValueError(f"Invalid interval: [{lo}, {hi}]")
+        self.lo = lo
+        self.hi = hi
+
+    @property
+    def is_point(self) -> bool:
+        """
+        True if the interval holds exactly one value.
+        """
+        return self.lo == self.hi
+
+    def __contains__(self, value) -> bool:
+        return self.lo <= value <= self.hi
+
+    def __eq__(self, other):
+        if not isinstance(other, Interval):
+            return NotImplemented
+        return self.lo == other.lo and self.hi == other.hi
+
+    def __hash__(self):
+        return hash((self.lo, self.hi))
+
+    def __repr__(self):
+        return f"Interval({self.lo!r}, {self.hi!r})"
+
+
+UNBOUNDED = Interval(-math.inf, math.inf)
+
+
+def as_interval(value) -> Interval:
+    """
+    An Interval from an Interval, a (lo, hi) pair or a single number.
+    """
+    if isinstance(value, Interval):
+        return value
+    if isinstance(value, (tuple, list)):
+        return Interval(*value)
+    return Interval(value)
+
+
+def _outward(lo, hi) -> Interval:
+    # Float bounds are rounded one ulp away from each other, which covers
+    # the rounding error of the operation that produced them. A rounded zero
+    # keeps the sign of the exact result, so 0.0 needs no rounding down and
+    # -0.0 none up. NaN bounds (from inf - inf and the like) widen to infinity.
+    if lo != lo:
+        lo = -math.inf
+    if hi != hi:
+        hi = math.inf
+    if lo.__class__ is float and not (lo == 0 and math.copysign(1, lo) > 0):
+        lo = math.nextafter(lo, -math.inf)
+    if hi.__class__ is float and not (hi == 0 and math.copysign(1, hi) < 0):
+        hi = math.nextafter(hi, math.inf)
+    return Interval(lo, hi)
+
+
+def _is_float(interval: Interval) -> bool:
+    return interval.lo.__class__ is float or interval.hi.__class__ is float
+
+
+def _zero(*intervals):
+    # 0 of the type evaluate would return: float if any operand is a float
+    return 0.0 if any(_is_float(interval) for interval in intervals) else 0
+
+
+def _multiply(x, y):
+    if x == 0 or y == 0:
+        # 0 * inf only comes from an unbounded range, never from a value
+        return 0
+    # An int too large for a float times a float raises OverflowError, as
+    # in evaluate; interval_operation flags it
+    return x * y
+
+
+def _corners(operation, left: Interval, right: Interval) -> Interval:
+    # Bounds of a monotonic-per-operand operation from the four corners
+    products = [operation(x, y) for x in (left.lo, left.hi) for y in (right.lo, right.hi)]
+    if any(product != product for product in products):
+        return UNBOUNDED
+    return _outward(min(products), max(products))
+
+
+def _divide(x, y):
+    if math.isinf(x) and math.isinf(y):
+        return math.nan
+    if math.isinf(y):
+        return 0.0
+    # Overflow is flagged by interval_operation, as in _multiply
+    return x / y
+
+
+def _divisor_errors(operator: str, divisor: Interval) -> dict:
+    if 0 not in divisor:
+        return {}
+    return {DIVISION_MESSAGES[operator]: divisor.is_point}
+
+
+def _quotient(left: Interval, right: Interval) -> Interval:
+    # Bounds of left / right over the nonzero values of `right`
+    if right.lo > 0 or right.hi < 0:
+        return _corners(_divide, left, right)
+    if right.lo < 0 < right.hi or right.is_point:
+        return UNBOUNDED
+    # The divisor only touches zero at one end: divide by (0, hi] or [lo, 0)
+    if right.lo == 0:
+        reciprocal = Interval(math.nextafter(1 / right.hi, 0) if right.hi != math.inf else 0.0, math.inf)
+    else:
+        reciprocal = Interval(-math.inf, math.nextafter(1 / right.lo, 0) if right.lo != -math.inf else -0.0)
+    return _corners(_multiply, left, reciprocal)
+
+
+def _floor(value):
+    return value if math.isinf(value) else math.floor(value)
+
+
+def _ceil(value):
+    return value if math.isinf(value) else math.ceil(value)
+
+
+def _modulo(left: Interval, right: Interval) -> Interval:
+    # x % m == x for 0 <= x < m (or m < x <= 0), converted to a float when
+    # m is one, which is exact as Python converts x before dividing
+    unchanged = Interval(float(left.lo), float(left.hi)) if _is_float(right) else left
+    if right.lo > 0:
+        if left.lo >= 0 and left.hi < right.lo:
+            return unchanged
+        return Interval(_zero(left, right), right.hi)
+    if right.hi < 0:
+        if left.hi <= 0 and left.lo > right.hi:
+            return unchanged
+        return Interval(right.lo, _zero(left, right))
+    return Interval(min(right.lo, 0), max(right.hi, 0))
+
+
+def _power_corner(base, exponent):
+    # base ** exponent as evaluate computes it, with huge results bounded
+    # by infinity instead of being computed
+    if (
+        isinstance(base, int) and isinstance(exponent, int) and abs(base) > 1
+        and exponent * math.log10(abs(base)) > MAX_EXACT_POWER_DIGITS
+    ):
+        base = float(base)
+    try:
+        return base ** exponent
+    except OverflowError:
+        if base > 0 or exponent % 2 == 0:
+            return math.inf
+        return -math.inf
+
+
+def _power(base: Interval, exponent: Interval):
+    errors = {}
+    if exponent.is_point and exponent.lo not in (math.inf, -math.inf) and exponent.lo == int(exponent.lo):
+        n = exponent.lo
+        if n < 0 and 0 in base:
+            errors[ZERO_POWER_MESSAGE] = base.is_point
+            if base.is_point:
+                return UNBOUNDED, errors
+            # x^n is unbounded near 0; it is positive for even n
+            return (Interval(0, math.inf) if n % 2 == 0 else UNBOUNDED), errors
+        corners = [_power_corner(base.lo, n), _power_corner(base.hi, n)]
+        if n > 0 and n % 2 == 0 and base.lo < 0 < base.hi:
+            # Even powers have their minimum at 0
+            corners.append(_zero(base, exponent))
+        bounds = _outward(min(corners), max(corners))
+    elif base.lo < 0:
+        errors[COMPLEX_MESSAGE] = False
+        return UNBOUNDED, errors
+    else:
+        corners = []
+        for x in (base.lo, base.hi):
+            for y in (exponent.lo, exponent.hi):
+                if x == 0 and y < 0:
+                    corners.append(math.inf)
+                else:
+                    corners.append(_power_corner(x, y))
+        if base.lo == 0 and exponent.lo < 0:
+            errors[ZERO_POWER_MESSAGE] = base.is_point and exponent.hi < 0
+        if any(corner != corner for corner in corners):
+            return UNBOUNDED, errors
+        bounds = _outward(min(corners), max(corners))
+    if bounds.hi == math.inf or bounds.lo == -math.inf:
+        errors[OVERFLOW_MESSAGE] = bounds.lo == math.inf or bounds.hi == -math.inf
+    return bounds, errors
+
+
+def _factorial(argument: Interval):
+    if argument.is_point and argument.lo.__class__ is int and argument.lo >= 0:
+        if argument.lo > MAX_EXACT_FACTORIAL:
+            return Interval(math.factorial(MAX_EXACT_FACTORIAL), math.inf), {}
+        value = math.factorial(argument.lo)
+        return Interval(value), {}
+    # Only non-negative ints are accepted, which a range cannot guarantee;
+    # a single float or a negative range always fails
+    errors = {FACTORIAL_MESSAGE: argument.hi < 0 or argument.is_point}
+    if argument.hi < 0:
+        return UNBOUNDED, errors
+    low = 0 if argument.lo <= 0 else _ceil(argument.lo)
+    high = _floor(argument.hi)
+    if low > high:
+        # No integer in range
+        errors[FACTORIAL_MESSAGE] = True
+        return UNBOUNDED, errors
+    upper = math.inf if high > MAX_EXACT_FACTORIAL else math.factorial(high)
+    return Interval(math.factorial(min(low, MAX_EXACT_FACTORIAL)), upper), errors
+
+
+def _periodic(argument: Interval, function, peak: float) -> Interval:
+    # sin or cos over [lo, hi] radians; maxima at peak + 2k*pi, minima half
+    # a period later. Extrema near an end are included, to stay sound.
+    lo, hi = argument.lo, argument.hi
+    if hi - lo >= 2 * math.pi or max(abs(lo), abs(hi)) > MAX_PERIODIC_ARGUMENT:
+        return Interval(-1.0, 1.0)
+    slack = 1e-12 * (1 + abs(lo) + abs(hi))
+    values = [function(lo), function(hi)]
+    for extremum, offset in ((1.0, peak), (-1.0, peak + math.pi)):
+        k = math.ceil((lo - offset - slack) / (2 * math.pi))
+        if offset + 2 * math.pi * k <= hi + slack:
+            values.append(extremum)
+    bounds = _outward(min(values), max(values))
+    return Interval(max(bounds.lo, -1.0), min(bounds.hi, 1.0))
+
+
+def _function(name: str, argument: Interval, use_degrees: bool):
+    if use_degrees and name in ("sin", "cos", "tan"):
+        argument = _outward(math.radians(argument.lo), math.radians(argument.hi))
+
+    if name == "sin":
+        return _periodic(argument, math.sin, math.pi / 2), {}
+    if name == "cos":
+        return _periodic(argument, math.cos, 0.0), {}
+    if name == "tan":
+        lo, hi = argument.lo, argument.hi
+        if hi - lo >= math.pi or max(abs(lo), abs(hi)) > MAX_PERIODIC_ARGUMENT:
+            return UNBOUNDED, {}
+        # Poles at pi/2 + k*pi; between two of them tan is increasing
+        slack = 1e-12 * (1 + abs(lo) + abs(hi))
+        k = math.ceil((lo - math.pi / 2 - slack) / math.pi)
+        if math.pi / 2 + math.pi * k <= hi + slack:
+            return UNBOUNDED, {}
+        return _outward(math.tan(lo), math.tan(hi)), {}
+    if name == "log":
+        if argument.hi <= 0:
+            return UNBOUNDED, {LOG_MESSAGE: True}
+        errors = {LOG_MESSAGE: False} if argument.lo <= 0 else {}
+        lower = math.log(argument.lo) if argument.lo > 0 else -math.inf
+        return _outward(lower, math.log(argument.hi)), errors
+    if name == "sqrt":
+        if argument.hi < 0:
+            return UNBOUNDED, {SQRT_MESSAGE: True}
+        errors = {SQRT_MESSAGE: False} if argument.lo < 0 else {}
+        lower = math.sqrt(argument.lo) if argument.lo > 0 else 0.0
+        return _outward(lower, math.sqrt(argument.hi)), errors
+    if name == "abs":
+        if argument.lo >= 0:
+            return argument, {}
+        if argument.hi <= 0:
+            return Interval(-argument.hi, -argument.lo), {}
+        return Interval(_zero(argument), max(-argument.lo, argument.hi)), {}
+    if name == "exp":
+        bounds = []
+        for value in (argument.lo, argument.hi):
+            try:
+                bounds.append(math.exp(value))
+            except OverflowError:
+                bounds.append(math.inf)
+        errors = {OVERFLOW_MESSAGE: bounds[0] == math.inf} if bounds[1] == math.inf else {}
+        return _outward(*bounds), errors
+    if name in ("floor", "ceil"):
+        rounding = _floor if name == "floor" else _ceil
+        return Interval(rounding(argument.lo), rounding(argument.hi)), {}
+    raise ValueError(f"Unsupported function '{name}'")
+
+
+def interval_operation(value: str, left: Interval, right: Interval = None, use_degrees: bool = True):
+    """
+    Bound one operator or function application, as evaluate performs it,
+    over all operand values in `left` and `right` (None for a missing
+    operand, which is 0; functions take their argument on the left).
+
+    Returns (bounds, errors): errors maps the message of each error that
+    some operand values raise to True if all of them raise it. Bounds cover
+    the operand values that do not raise.
+    """
+    zero = Interval(0)
+    left = zero if left is None else left
+    right = zero if right is None else right
+    try:
+        return _operation(value, left, right, use_degrees)
+    except OverflowError:
+        # An int bound too large for a float met a float; evaluate may
+        # overflow the same way
+        return UNBOUNDED, {OVERFLOW_MESSAGE: False}
+
+
+def _operation(value: str, left: Interval, right: Interval, use_degrees: bool):
+    if value == "+":
+        if left.is_point and left.lo == 0 and not _is_float(left):
+            return right, {}
+        return _outward(left.lo + right.lo, left.hi + right.hi), {}
+    if value == "-":
+        if right.is_point and right.lo == 0 and not _is_float(right):
+            return left, {}
+        return _outward(left.lo - right.hi, left.hi - right.lo), {}
+    if value == "*":
+        for factor, other in ((left, right), (right, left)):
+            if factor.is_point and factor.lo == 0:
+                # Exactly zero, whatever the other factor
+                return Interval(_zero(left, right)), {}
+            if factor.is_point and factor.lo == 1 and not _is_float(factor):
+                return other, {}
+        return _corners(_multiply, left, right), {}
+    if value in DIVISION_MESSAGES:
+        errors = _divisor_errors(value, right)
+        if right.is_point and right.lo == 0:
+            return UNBOUNDED, errors
+        if value == "/":
+            return _quotient(left, right), errors
+        if value == "%":
+            return _modulo(left, right), errors
+        quotient = _quotient(left, right)
+        bounds = Interval(_floor(quotient.lo), _floor(quotient.hi))
+        if _is_float(left) or _is_float(right):
+            # // on floats returns a float
+            bounds = Interval(*(float(bound) for bound in (bounds.lo, bounds.hi)))
+        return bounds, errors
+    if value == "^":
+        return _power(left, right)
+    if value == "!":
+        return _factorial(left)
+    return _function(value, left, use_degrees)
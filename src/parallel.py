@@ -0,0 +1,239 @@
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from src.tree import ExpressionTree
+from src.evaluator import evaluate
+from src.compiler import Compiler, MAX_FOLD_DIGITS
+
+# Below this many nodes, starting tasks, pickling subtrees and collecting
+# results costs more than it saves
+PARALLEL_MIN_NODES = 200_000
+# Split into about this many parts per worker, so uneven parts still balance
+PARTS_PER_WORKER = 4
+# Never split into more parts than this per worker: a long left-deep chain
+# such as a + b + c + ... would otherwise break into one part per term
+MAX_PARTS_PER_WORKER = 64
+# Parts smaller than this are handled in the parent process
+LOCAL_MAX_NODES = 2_000
+
+_pools = {}
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    # Starting processes is expensive, so each pool size is created once
+    pool = _pools.get(workers)
+    if pool is None:
+        pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return pool
+
+
+def plan(tree: ExpressionTree, workers: int, min_nodes: int = PARALLEL_MIN_NODES):
+    """
+    Decide whether a parallel run pays off and, if so, how to split the tree.
+
+    Returns None when it does not: one worker, a small tree, a tree with
+    shared nodes, or one that cannot be cut without a dominant part (like a
+    long chain of terms with no grouping). Otherwise returns (spine, parts):
+    `parts` are the disjoint (start, end) index ranges of the subtrees to
+    hand out, in index order, and `spine` the ascending indices of the nodes
+    above them, which the parent process finishes once the parts are done.
+
+    In post-order without shared nodes, the subtree rooted at node `end`
+    is a contiguous range ending at `end`, and its right child (if any) is
+    node end - 1. Splitting therefore takes constant time per spine node and
+    never visits the nodes inside a part, which would cost about as much as
+    evaluating them. Shared nodes are caught by checking that layout at each
+    spine node and, inside the parts, by ExpressionTree.unpack_subtree.
+
+    Flat chains such as a + b*c - d + ..., however long, are never split.
+    The parser builds them left-deep, so every term hangs off its own spine
+    node, and the parent would finish one spine node per term. That step
+    alone costs more than evaluating the term, so no number of workers
+    catches up with a serial run. Rebalancing the chain would not help
+    either: it takes a pass over every term in the parent, and regrouping
+    + and * changes float rounding. Only expressions that are already
+    grouped, such as (...) + (...) + ..., run in parallel.
+    """
+    size = len(tree)
+    if workers <= 1 or size < min_nodes:
+        return None
+
+    # Repeatedly split the largest subtree into its children until every
+    # part is small enough to balance across the workers
+    target = size // (workers * PARTS_PER_WORKER)
+    max_parts = workers * MAX_PARTS_PER_WORKER
+    frontier = [(-size, 0, size - 1)]
+    spine = []
+    while -frontier[0][0] > target and len(frontier) < max_parts:
+        _, start, end = frontier[0]
+        left, right = tree.left[end], tree.right[end]
+        if left < 0 and right < 0:
+            # Only leaves are left
+            break
+        if left >= 0 and right >= 0:
+            laid_out = right == end - 1 and start <= left < right
+        else:
+            laid_out = max(left, right) == end - 1
+        if not laid_out:
+            # Some node is shared
+            return None
+        heapq.heappop(frontier)
+        spine.append(end)
+        if left >= 0 and right >= 0:
+            heapq.heappush(frontier, (start - left - 1, start, left))
+            heapq.heappush(frontier, (left - right, left + 1, right))
+        else:
+            heapq.heappush(frontier, (start - end, start, end - 1))
+
+    # The largest part bounds the speedup; with half the work in one part
+    # there is little left to gain
+    if not spine or -frontier[0][0] > size // 2:
+        return None
+    parts = sorted((start, end) for _, start, end in frontier)
+    # A child shared by two spine nodes ends up in two overlapping parts
+    if any(end >= start for (_, end), (start, _) in zip(parts, parts[1:])):
+        return None
+    return sorted(spine), parts
+
+
+# Part workers return (True, result), or (False, None) when the part was
+# not self-contained and the caller must fall back to a serial run
+
+def _evaluate_part(packed, context, use_degrees, exact, max_digits):
+    part = ExpressionTree.unpack_subtree(packed)
+    if part is None:
+        return False, None
+    return True, evaluate(part, context, use_degrees, exact, max_digits)
+
+
+def _simplify_part(packed, exact, max_digits):
+    part = ExpressionTree.unpack_subtree(packed)
+    if part is None:
+        return False, None
+    return True, Compiler.simplify(part, exact, max_digits)
+
+
+def _run_parts(tree: ExpressionTree, parts: list, workers: int, function, *args) -> list:
+    """
+    Apply `function(packed_subtree, *args)` to every part: large parts in the
+    process pool, small ones in this process. Results come back in part
+    order, or None if some part was not self-contained.
+    """
+    pool = _pool(workers)
+    pending = []
+    for start, end in parts:
+        packed = tree.pack_subtree(start, end)
+        if end - start >= LOCAL_MAX_NODES:
+            pending.append(pool.submit(function, packed, *args))
+        else:
+            pending.append(packed)
+    # Collect in index order, so the first error raised is the first part
+    # a serial left-to-right evaluation would have failed in
+    results = []
+    for item in pending:
+        complete, result = item.result() if not isinstance(item, tuple) else function(item, *args)
+        if not complete:
+            for future in pending:
+                if not isinstance(future, tuple):
+                    future.cancel()
+            return None
+        results.append(result)
+    return results
+
+
+def evaluate_parallel(
+    node,
+    context: dict = None,
+    use_degrees: bool = True,
+    exact: bool = False,
+    max_digits: int = None,
+    workers: int = 2,
+):
+    """
+    Evaluate a large expression by sending independent subtrees to a process
+    pool and combining their results; see plan for when this happens. Falls
+    back to a serial evaluate when splitting would not pay off.
+
+    An ExpressionTree input is split without any per-node work in this
+    process; a Node tree is converted first, which costs about as much as a
+    serial evaluation, so it only pays off when operands are very large.
+    """
+    if context is None:
+        context = {}
+    tree = node if isinstance(node, ExpressionTree) else ExpressionTree.from_node(node)
+    split = plan(tree, workers)
+    if split is None:
+        return evaluate(tree, context, use_degrees, exact, max_digits)
+    spine, parts = split
+
+    values = _run_parts(tree, parts, workers, _evaluate_part, context, use_degrees, exact, max_digits)
+    if values is None:
+        return evaluate(tree, context, use_degrees, exact, max_digits)
+
+    # Evaluate the spine as a small tree whose parts are replaced by their values
+    combined = ExpressionTree()
+    new_index = {end: combined.add(value) for (_, end), value in zip(parts, values)}
+    for index in spine:
+        left, right = tree.left[index], tree.right[index]
+        new_index[index] = combined.add(
+            tree.value(index),
+            new_index[left] if left >= 0 else None,
+            new_index[right] if right >= 0 else None,
+        )
+    return evaluate(combined, context, use_degrees, exact, max_digits)
+
+
+def simplify_parallel(node, exact: bool = False, max_digits: int = MAX_FOLD_DIGITS, workers: int = 2):
+    """
+    Simplify a large expression by simplifying independent subtrees in a
+    process pool, then the spine above them in this process. The result is
+    the same as Compiler.simplify: parts are merged into one hash-consed tree
+    before the spine is simplified, so rules such as x - x => 0 still see
+    equal subtrees from different parts as equal.
+    """
+    if node is None:
+        return None
+    tree = node if isinstance(node, ExpressionTree) else ExpressionTree.from_node(node)
+    # Simplifying a node costs several evaluations, so splitting pays off sooner
+    split = plan(tree, workers, PARALLEL_MIN_NODES // 4)
+    if split is None:
+        return Compiler.simplify(node, exact, max_digits)
+    spine, parts = split
+
+    part_trees = _run_parts(tree, parts, workers, _simplify_part, exact, max_digits)
+    if part_trees is None:
+        return Compiler.simplify(node, exact, max_digits)
+
+    simplified = ExpressionTree(hash_cons=True)
+
+    def make(value, left=None, right=None):
+        return simplified.node(simplified.add(
+            value,
+            None if left is None else left.index,
+            None if right is None else right.index,
+        ))
+
+    new_index = {}
+    for (_, index), part in zip(parts, part_trees):
+        # Each part is in post-order with its root last
+        mapped = [0] * len(part)
+        for i in range(len(part)):
+            left, right = part.left[i], part.right[i]
+            mapped[i] = simplified.add(
+                part.value(i),
+                mapped[left] if left >= 0 else None,
+                mapped[right] if right >= 0 else None,
+            )
+        new_index[index] = mapped[-1]
+    for index in spine:
+        left, right = tree.left[index], tree.right[index]
+        new_index[index] = Compiler._simplify_node(
+            tree.node(index),
+            simplified.node(new_index[left]) if left >= 0 else None,
+            simplified.node(new_index[right]) if right >= 0 else None,
+            make,
+            exact,
+            max_digits,
+        ).index
+
+    result = simplified.compact(new_index[len(tree) - 1])
+    return result if isinstance(node, ExpressionTree) else result.to_node()
@@ -1,5 +1,8 @@
 import re
 import unicodedata
+from collections import namedtuple
+from operator import itemgetter
+from src.registry import REGISTRY, ARGUMENT_SEPARATOR
 
 class Node:
     """
@@ -13,13 +16,39 @@ class Node:
     - right: Node or None
         Right child node.
     """
+    __slots__ = ("value", "left", "right")
+
     def __init__(self, value, left=None, right=None):
         self.value = value
         self.left = left
         self.right = right
 
     def __repr__(self):
-        return f"Node({self.value}, left={self.left}, right={self.right})"
+        # Built from an explicit stack so deep trees do not hit the recursion limit
+        parts = []
+        stack = [self]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                parts.append(item)
+            elif item is None:
+                parts.append("None")
+            else:
+                parts.append(f"Node({item.value}, left=")
+                stack.extend((")", item.right, ", right=", item.left))
+        return "".join(parts)
+
+
+class Subtree(str):
+    """
+    A token standing for an already parsed operand, such as the contents of
+    a parenthesized group that an edit did not touch (see IncrementalParser).
+    It is an empty string, so the parser's checks on text tokens skip it.
+    """
+    def __new__(cls, node: Node):
+        token = super().__new__(cls)
+        token.node = node
+        return token
 
 
 def normalize_expression(expr: str) -> str:
@@ -32,131 +61,607 @@ def normalize_expression(expr: str) -> str:
     return expr
 
 
+class Token(namedtuple("Token", ("kind", "value", "offset"))):
+    """
+    A token with its kind and where it starts in the (normalized) text.
+
+    Attributes:
+    - kind: str
+        "number", "name", "operator", "(", ")" or ",".
+    - value: str
+        The token text; names are lowercased.
+    - offset: int
+        Index of its first character.
+    """
+    __slots__ = ()
+
+
+# Token kinds; a Subtree token (an empty string) has its own
+_NUMBER = "number"
+_NAME = "name"
+_OPERATOR = "operator"
+_OPEN = "("
+_CLOSE = ")"
+_COMMA = ARGUMENT_SEPARATOR
+_SUBTREE = "subtree"
+
+# Leading whitespace, then one group per token kind (in the order of
+# _SCAN_KINDS) or, in the last group, any character that starts no token
+_SCAN_PATTERN = re.compile(r"\s*(?:(\d+(?:\.\d+)?)|([a-zA-Z]+)|(//|[-+*/^%!])|(\()|(\))|(,)|(\S))")
+_SCAN_KINDS = (None, _NUMBER, _NAME, _OPERATOR, _OPEN, _CLOSE, _COMMA)
+_NAME_GROUP = 2
+_ERROR_GROUP = 7
+# The same tokens without groups, for findall on lowercased text
+_TOKEN_PATTERN = re.compile(r"\d+(?:\.\d+)?|[a-z]+|//|[-+*/^%!(),]")
+# Translation table deleting every character a token or whitespace can
+# contain, so only unrecognized characters are left
+_DELETE_VALID = str.maketrans("", "", "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ+-*/^%!(),. \t\n\r\f\v")
+# A '.' that is not inside a number
+_STRAY_DOT = re.compile(r"(?<![0-9])\.|\.(?![0-9])|\.[0-9]+\.")
+
+# Token kind by first character; "" is a Subtree
+_KIND_OF_FIRST = {"": _SUBTREE, "(": _OPEN, ")": _CLOSE, ",": _COMMA}
+_KIND_OF_FIRST.update(dict.fromkeys("0123456789", _NUMBER))
+_KIND_OF_FIRST.update(dict.fromkeys("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ", _NAME))
+_KIND_OF_FIRST.update(dict.fromkeys("+-*/^%!", _OPERATOR))
+_first_character = itemgetter(slice(0, 1))
+
+
+def scan(expression: str):
+    """
+    Yield the Tokens of an expression one at a time, in a single pass of a
+    precompiled scanner. ASCII text is scanned as it is; other text is put
+    through normalize_expression first, and offsets are positions in the
+    normalized text.
+
+    Raises ValueError at a character that starts no token. Names are
+    letters only, so x1 is the name x followed by the number 1.
+    """
+    # ASCII text is already NFKC-normal and has none of the characters
+    # normalize_expression replaces
+    if not expression.isascii():
+        expression = normalize_expression(expression)
+    make = tuple.__new__
+    kinds = _SCAN_KINDS
+    for match in _SCAN_PATTERN.finditer(expression):
+        group = match.lastindex
+        value = match.group(group)
+        if group == _NAME_GROUP:
+            value = value.lower()
+        elif group == _ERROR_GROUP:
+            raise ValueError(f"Unrecognized character '{value}' at position {match.start(group)}.")
+        yield make(Token, (kinds[group], value, match.start(group)))
+
+
 def tokenize(expression: str):
     """
     Convert a mathematical expression into a list of tokens (numbers, variables,
     operators, parentheses, etc.).
+
+    Returns the values scan would yield, as plain strings, and raises the
+    same errors. The list is built by one findall over the text, several
+    times faster than creating Tokens; scan is only rerun to locate an error.
     """
-    expression = normalize_expression(expression).strip()
-    if not expression:
+    if not expression.isascii():
+        expression = normalize_expression(expression)
+    # Both checks run at C speed; scan then finds the position to report
+    if expression.translate(_DELETE_VALID) or ("." in expression and _STRAY_DOT.search(expression)):
+        _raise_scan_error(expression)
+    # Names are the only letters, so lowercasing the text lowercases them
+    tokens = _TOKEN_PATTERN.findall(expression.lower())
+    if not tokens:
         raise ValueError("Input expression is empty.")
+    return tokens
 
-    # Pattern covers:
-    # 1) Numbers (integers, floats)
-    # 2) Variables (alphanumeric + underscore)
-    # 3) Operators (+ - * / // % ^ !)
-    # 4) Parentheses
-    token_pattern = r"(?:\d+(?:\.\d+)?)|(?:[a-zA-Z_][a-zA-Z_0-9]*)|//|[+\-*/^%!()]"
-    tokens_raw = re.findall(token_pattern, expression)
-
-    if not tokens_raw:
-        raise ValueError("Failed to tokenize input. Check your expression syntax.")
-
-    # Lowercase any alpha tokens for case-insensitive function/variable handling
-    normalized_tokens = []
-    for t in tokens_raw:
-        if t.isalpha():
-            normalized_tokens.append(t.lower())
-        else:
-            normalized_tokens.append(t)
 
-    return normalized_tokens
+def _raise_scan_error(expression: str):
+    for _ in scan(expression):
+        pass
+    raise ValueError("Failed to tokenize input. Check your expression syntax.")
+
 
+class Annotations:
+    """
+    What the parser saw while building a tree, so callers need no extra
+    walk over it: pass one to parse_expression, or read
+    IncrementalParser.annotations, which edits keep up to date.
+
+    Attributes:
+    - names: dict
+        Occurrences of each name used as an operand: variables, and
+        constants such as pi.
+    - calls: dict
+        Calls of each function name.
+    - nodes: int
+        Nodes in the parse tree.
+    """
+    __slots__ = ("names", "calls", "nodes")
+
+    def __init__(self, names: dict = None, calls: dict = None, nodes: int = 0):
+        self.names = {} if names is None else names
+        self.calls = {} if calls is None else calls
+        self.nodes = nodes
+
+    @property
+    def variables(self) -> set:
+        """
+        The operand names that need a value: neither a constant nor a
+        function in the registry, as it is now.
+        """
+        constants, functions = REGISTRY.constants, REGISTRY.functions
+        return {name for name in self.names if name not in constants and name not in functions}
+
+    def copy(self) -> "Annotations":
+        return Annotations(dict(self.names), dict(self.calls), self.nodes)
+
+    def add(self, tokens: list, start: int, stop: int, sign: int = 1):
+        """
+        Add (sign=1) or take away (sign=-1) what tokens[start:stop] of a
+        whole expression contribute. A name followed by '(' is a call.
+        """
+        nodes = 0
+        for index in range(start, stop):
+            token = tokens[index]
+            if token == "(" or token == ")":
+                continue
+            nodes += 1
+            if token[0].isalpha():
+                table = self.calls if index + 1 < len(tokens) and tokens[index + 1] == "(" else self.names
+                count = table.get(token, 0) + sign
+                if count:
+                    table[token] = count
+                else:
+                    del table[token]
+        self.nodes += sign * nodes
+
+    def __repr__(self):
+        return f"Annotations(variables={sorted(self.variables)}, calls={self.calls}, nodes={self.nodes})"
+
+
+# Binding strength of the binary operators; all of them are left-associative
+PRECEDENCE = {"+": 1, "-": 1, "*": 2, "/": 2, "%": 2, "//": 2, "^": 3}
+# ',' between arguments binds loosest of all, so f(a, b, c) is ((a, b), c)
+_BINDING = {**PRECEDENCE, ARGUMENT_SEPARATOR: 0}
 
-def parse_expression(tokens):
+# Kinds of entries on the parser's operator stack; group and call entries
+# also hold the index of their '('
+_BINARY = 0
+_UNARY = 1
+_GROUP = 2
+_CALL = 3
+
+
+def parse_expression(tokens, make=Node, on_group=None, annotations: Annotations = None):
     """
     Parse the list of tokens into a binary tree, respecting operator precedence.
     Returns the root of the expression tree.
+
+    `make(value, left=None, right=None)` builds each node; it defaults to Node.
+    Nodes are always built in post-order, so ExpressionTree.add can be passed
+    to fill a struct-of-arrays tree directly.
+
+    `on_group(open_index, close_index, node, enclosing_index)`, if given, is
+    called for every parenthesized group (including function arguments) with
+    the token indices of its parentheses, the subtree built for its contents
+    and the opening index of the group around it (-1 at the top level).
+    A Subtree token stands for an already built operand.
+
+    `annotations`, if given, is filled in while parsing (see Annotations);
+    the nodes of Subtree tokens are not counted.
+
+    A call with several arguments, f(a, b, c), takes a chain of ','
+    nodes as its argument: Node(",", left=Node(",", left=a, right=b), right=c).
+
+    The parser is a shunting-yard loop over explicit operand and operator
+    stacks, so neither nesting depth nor expression length is bounded by the
+    interpreter's recursion limit. Precedence, from loosest to tightest:
+    ',' between function arguments, + - (binary), * / % //, ^ and postfix !,
+    then unary + - which bind to the next term only.
     """
-    index = 0  # Pointer to current token in the list
+    operands = []   # Completed subtrees
+    operators = []  # Pending (kind, value) entries
+    expect_operand = True
+    index = 0
 
-    def parse_factor():
-        nonlocal index
-        node = parse_term()
-        # Factor handles exponentiation and factorial
-        while index < len(tokens) and tokens[index] in ("^", "!"):
-            operator = tokens[index]
-            index += 1
-            if operator == "!":
-                # Factorial (unary)
-                node = Node(operator, left=node)
-            else:
-                # Exponentiation is right-associative
-                right = parse_term()
-                node = Node(operator, left=node, right=right)
-        return node
+    def reduce(min_precedence):
+        # Build nodes for pending binary operators that bind at least this tightly
+        while operators and operators[-1][0] == _BINARY and _BINDING[operators[-1][1]] >= min_precedence:
+            operator = operators.pop()[1]
+            right = operands.pop()
+            left = operands.pop()
+            operands.append(make(operator, left=left, right=right))
 
-    def parse_term():
-        nonlocal index
-        if index >= len(tokens):
-            raise ValueError("Unexpected end of tokens while parsing a term.")
-        token = tokens[index]
+    def complete_term():
+        # A term just finished: apply any unary plus/minus waiting for it
+        while operators and operators[-1][0] == _UNARY:
+            operands.append(make(operators.pop()[1], right=operands.pop()))
 
-        if token == "(":
-            index += 1  # consume '('
-            node = parse_top_level()
-            if index >= len(tokens) or tokens[index] != ")":
-                raise ValueError("Unmatched '(' - missing ')'.")
-            index += 1  # consume ')'
-            return node
+    def innermost_group():
+        # The innermost open parenthesis or function call, if any
+        for entry in reversed(operators):
+            if entry[0] in (_GROUP, _CALL):
+                return entry
+        return None
 
-        elif token.replace('.', '', 1).isdigit():
-            # Numeric literal
-            index += 1
-            return Node(float(token) if '.' in token else int(token))
+    def unclosed_error(group):
+        # Report the innermost open parenthesis, as a recursive parser would
+        if group[0] == _CALL:
+            return ValueError(f"Function '{group[1]}' missing closing ')'.")
+        return ValueError("Unmatched '(' - missing ')'.")
 
-        elif token.isalpha():
-            # Could be a function or a variable
-            func_name = token
+    if tokens and tokens[0].__class__ is Token:
+        # Tokens from scan carry their kinds
+        kinds = [token.kind for token in tokens]
+        tokens = [token.value for token in tokens]
+    else:
+        # Classify every token once, by its first character
+        kinds = list(map(_KIND_OF_FIRST.get, map(_first_character, tokens)))
+    kinds.append(None)  # lookahead past the last token
+    if annotations is not None:
+        names, calls = annotations.names, annotations.calls
+        # Every token but a parenthesis is one node
+        annotations.nodes += len(tokens) - kinds.count(_OPEN) - kinds.count(_CLOSE) - kinds.count(_SUBTREE)
+
+    while index < len(tokens):
+        token = tokens[index]
+        kind = kinds[index]
+
+        if expect_operand:
+            if kind is _OPEN:
+                operators.append((_GROUP, None, index))
+            elif kind is _NUMBER:
+                # Numeric literal
+                operands.append(make(float(token) if '.' in token else int(token)))
+                complete_term()
+                expect_operand = False
+            elif kind is _NAME:
+                if kinds[index + 1] is _OPEN:
+                    # Function call
+                    operators.append((_CALL, token, index + 1))
+                    index += 1  # consume '('
+                    if annotations is not None:
+                        calls[token] = calls.get(token, 0) + 1
+                else:
+                    # Just a variable
+                    if annotations is not None:
+                        names[token] = names.get(token, 0) + 1
+                    operands.append(make(token))
+                    complete_term()
+                    expect_operand = False
+            elif token == "+" or token == "-":
+                # Unary plus or minus
+                operators.append((_UNARY, token))
+            elif kind is _SUBTREE and token.__class__ is Subtree:
+                operands.append(token.node)
+                complete_term()
+                expect_operand = False
+            else:
+                raise ValueError(f"Unexpected token: '{token}' while parsing term.")
             index += 1
-            if index < len(tokens) and tokens[index] == "(":
-                # Function call
-                index += 1  # consume '('
-                argument = parse_top_level()
-                if index >= len(tokens) or tokens[index] != ")":
-                    raise ValueError(f"Function '{func_name}' missing closing ')'.")
-                index += 1  # consume ')'
-                return Node(func_name, left=argument)
+            continue
+
+        if token == "!":
+            # Factorial (unary, postfix) applies to the whole factor so far
+            reduce(PRECEDENCE["^"])
+            operands.append(make(token, left=operands.pop()))
+        elif kind is _OPERATOR and token in PRECEDENCE:
+            reduce(PRECEDENCE[token])
+            operators.append((_BINARY, token))
+            expect_operand = True
+        elif kind is _COMMA:
+            group = innermost_group()
+            if group is None or group[0] != _CALL:
+                raise ValueError("',' is only allowed between function arguments.")
+            reduce(0)
+            operators.append((_BINARY, token))
+            expect_operand = True
+        elif kind is _CLOSE and innermost_group() is not None:
+            reduce(0)
+            kind, value, opened = operators.pop()
+            if on_group is not None:
+                enclosing = innermost_group()
+                on_group(opened, index, operands[-1], -1 if enclosing is None else enclosing[2])
+            if kind == _CALL:
+                operands.append(make(value, left=operands.pop()))
+            complete_term()
+        else:
+            group = innermost_group()
+            if group is not None:
+                raise unclosed_error(group)
+            leftover = tokens[index:]
+            raise ValueError(f"Extra tokens remaining after parse: {leftover}")
+        index += 1
+
+    if expect_operand:
+        raise ValueError("Unexpected end of tokens while parsing a term.")
+
+    reduce(0)
+    group = innermost_group()
+    if group is not None:
+        raise unclosed_error(group)
+
+    return operands.pop()
+
+
+# Tokens after which a '+' or '-' is unary: nothing before it ends an operand
+_OPERAND_PENDING = frozenset(PRECEDENCE) | {"(", ARGUMENT_SEPARATOR}
+# Tokens compared per slice when diffing token lists
+_DIFF_CHUNK = 1024
+
+
+def _common_prefix(a: list, b: list, limit: int) -> int:
+    # Compare whole slices first, so most of the scan runs at C speed
+    size = 0
+    while size < limit:
+        step = min(_DIFF_CHUNK, limit - size)
+        if a[size:size + step] != b[size:size + step]:
+            while a[size] == b[size]:
+                size += 1
+            return size
+        size += step
+    return size
+
+
+def _common_suffix(a: list, b: list, limit: int) -> int:
+    size = 0
+    while size < limit:
+        step = min(_DIFF_CHUNK, limit - size)
+        if a[len(a) - size - step:len(a) - size] != b[len(b) - size - step:len(b) - size]:
+            while a[-size - 1] == b[-size - 1]:
+                size += 1
+            return size
+        size += step
+    return size
+
+
+def _last_index(tokens: list, value: str, end: int) -> int:
+    # Index of the last `value` in tokens[:end + 1], or -1, searched a slice at a time
+    end = min(end, len(tokens) - 1)
+    while end >= 0:
+        start = max(0, end - _DIFF_CHUNK + 1)
+        chunk = tokens[start:end + 1]
+        if value in chunk:
+            chunk.reverse()
+            return end - chunk.index(value)
+        end = start - 1
+    return -1
+
+
+class IncrementalParser:
+    """
+    Parse successive versions of an expression, such as the contents of a
+    text box being edited, re-parsing only the part an edit touched.
+
+    The new token list is diffed against the previous one. Only the terms
+    (operands of the '+'/'-' chain) around the edit are parsed again, inside
+    the innermost parenthesized group containing it, followed by that group's
+    enclosing groups up to the top level. Everything else is handed to the
+    parser as Subtree tokens, so untouched subtrees are the very same Node
+    objects in the new tree; IncrementalSimplifier relies on this.
+
+    The result is always the tree parse_expression builds for the whole
+    expression. Invalid input raises the same ValueError as a full parse and
+    leaves the last valid version in place. An edit inside the argument
+    list of a call with several arguments re-parses the whole expression.
+
+    Attributes:
+    - tokens: list of str or None
+        Tokens of the last successfully parsed expression.
+    - root: Node or None
+        Its parse tree.
+    - annotations: Annotations or None
+        Annotations of the whole tree, updated from the edited tokens only.
+    - reparsed: int
+        Number of tokens handed to the parser by the last call.
+    """
+    def __init__(self):
+        self.tokens = None
+        self.root = None
+        self.annotations = None
+        self.reparsed = 0
+        # Opening index -> (closing index, node for the contents, opening
+        # index of the enclosing group or -1)
+        self._groups = {}
+        # Closing index -> opening index
+        self._opening = {}
+
+    def parse(self, expression: str) -> Node:
+        """
+        Parse `expression`, reusing as much of the previous tree as possible.
+        """
+        tokens = tokenize(expression)
+        if self.tokens is not None:
+            try:
+                return self._update(tokens)
+            except ValueError:
+                # A full parse raises the error for the first bad token
+                pass
+        return self._parse_all(tokens)
+
+    def _parse_all(self, tokens: list) -> Node:
+        groups = {}
+
+        def record(opened, closed, node, enclosing):
+            groups[opened] = (closed, node, enclosing)
+
+        annotations = Annotations()
+        root = parse_expression(tokens, on_group=record, annotations=annotations)
+        self._commit(tokens, root, groups, annotations)
+        self.reparsed = len(tokens)
+        return root
+
+    def _commit(self, tokens: list, root: Node, groups: dict, annotations: Annotations):
+        self.tokens = tokens
+        self.root = root
+        self.annotations = annotations
+        self._groups = groups
+        self._opening = {closed: opened for opened, (closed, _, _) in groups.items()}
+
+    def _child_group(self, level: int, position: int) -> int:
+        # The group directly inside group `level` (-1: the top level) that
+        # contains token `position`, or -1
+        groups = self._groups
+        opened = _last_index(self.tokens, "(", position)
+        if opened < 0 or opened == level:
+            return -1
+        while groups[opened][2] != level:
+            opened = groups[opened][2]
+        return opened if groups[opened][0] >= position else -1
+
+    def _update(self, tokens: list) -> Node:
+        old, groups, opening = self.tokens, self._groups, self._opening
+        limit = min(len(old), len(tokens))
+        start = _common_prefix(old, tokens, limit)
+        if start == len(old) == len(tokens):
+            self.reparsed = 0
+            return self.root
+        end = len(old) - _common_suffix(old, tokens, limit - start)
+        shift = len(tokens) - len(old)
+
+        # Old tokens start..end-1 were replaced; find the innermost group around them
+        level = _last_index(old, "(", start - 1)
+        while level >= 0 and groups[level][0] < end:
+            level = groups[level][2]
+
+        # Widen the edit to whole groups directly inside that level
+        low, high = start, end
+        inner = self._child_group(level, low)
+        if inner >= 0:
+            low, high = inner, max(high, groups[inner][0] + 1)
+        if high > low:
+            inner = self._child_group(level, high - 1)
+            if inner >= 0:
+                high = max(high, groups[inner][0] + 1)
+        removed = (low, high)
+
+        records = {}
+        self.reparsed = 0
+        center = None  # (opening index, node, new closing index) of the re-parsed child group
+        while True:
+            if level >= 0:
+                level_start, level_end, level_node = level + 1, groups[level][0], groups[level][1]
             else:
-                # Just a variable
-                return Node(func_name)
+                level_start, level_end, level_node = 0, len(old), self.root
 
-        elif token in ("+", "-"):
-            # Unary plus or minus
-            operator = token
-            index += 1  # consume operator
-            operand = parse_term()
-            return Node(operator, right=operand)
+            # The '+'/'-' chain of this level: keep the terms before and after
+            # the edit and parse the ones it touches
+            before = low - 1
+            while before > level_start:
+                token = old[before]
+                if token == ")":
+                    before = opening[before]
+                elif token in ("+", "-") and old[before - 1] not in _OPERAND_PENDING:
+                    break
+                elif token == ARGUMENT_SEPARATOR:
+                    raise ValueError("Argument lists are re-parsed in full.")
+                before -= 1
+            else:
+                before = -1
+            term_start = before + 1 if before >= 0 else level_start
 
-        else:
-            raise ValueError(f"Unexpected token: '{token}' while parsing term.")
-
-    def parse_expr():
-        nonlocal index
-        # parse_expr() handles * / % //
-        node = parse_factor()
-        while index < len(tokens) and tokens[index] in ("*", "/", "%", "//"):
-            operator = tokens[index]
-            index += 1
-            right = parse_factor()
-            node = Node(operator, left=node, right=right)
-        return node
+            marks = []  # Old '+'/'-' chain operators after `before`
+            after = None  # Index into marks of the first one that follows the edit
+            position = term_start
+            while position < level_end:
+                token = old[position]
+                if token == "(":
+                    position = groups[position][0]
+                elif token == ARGUMENT_SEPARATOR:
+                    raise ValueError("Argument lists are re-parsed in full.")
+                elif token in ("+", "-") and position > level_start and old[position - 1] not in _OPERAND_PENDING:
+                    if after is None and position >= high and (
+                        position > high
+                        or (position + shift > level_start and tokens[position + shift - 1] not in _OPERAND_PENDING)
+                    ):
+                        after = len(marks)
+                    marks.append(position)
+                position += 1
+            if after is None:
+                after = len(marks)
+            term_end = marks[after] if after < len(marks) else level_end
 
-    def parse_top_level():
-        nonlocal index
-        # parse_top_level() handles + -
-        node = parse_expr()
-        while index < len(tokens) and tokens[index] in ("+", "-"):
-            operator = tokens[index]
-            index += 1
-            right = parse_expr()
-            node = Node(operator, left=node, right=right)
-        return node
+            # Walk down the left-deep chain to the terms that are kept
+            kept = []
+            chain = level_node
+            for k in range(len(marks) - 1, -1, -1):
+                if chain is None or chain.value != old[marks[k]]:
+                    raise ValueError("Previous parse does not match its tokens.")
+                if k >= after:
+                    kept.append(chain.right)
+                chain = chain.left
+            kept.reverse()
 
-    parsed_tree = parse_top_level()
+            level_tokens, positions = [], []
+            if before >= 0:
+                if chain is None or chain.value != old[before]:
+                    raise ValueError("Previous parse does not match its tokens.")
+                level_tokens += [Subtree(chain.left), old[before]]
+                positions += [-1, before]
 
-    if index < len(tokens):
-        leftover = tokens[index:]
-        raise ValueError(f"Extra tokens remaining after parse: {leftover}")
+            def unchanged(first, last, offset):
+                # Copy tokens[first:last], collapsing directly nested groups
+                index = first
+                while index < last:
+                    token = tokens[index]
+                    if token == "(":
+                        closed, node, _ = groups[index - offset]
+                        closed += offset
+                        level_tokens.extend(("(", Subtree(node), ")"))
+                        positions.extend((index, -1, closed))
+                        index = closed + 1
+                    else:
+                        level_tokens.append(token)
+                        positions.append(index)
+                        index += 1
 
-    return parsed_tree
+            unchanged(term_start, low, 0)
+            if center is None:
+                level_tokens += tokens[low:high + shift]
+                positions += range(low, high + shift)
+            else:
+                opened, node, closed = center
+                level_tokens += ["(", Subtree(node), ")"]
+                positions += [opened, -1, closed]
+            unchanged(high + shift, term_end + shift, shift)
+            for mark, node in zip(marks[after:], kept):
+                level_tokens += [old[mark], Subtree(node)]
+                positions += [mark + shift, -1]
+
+            def record(opened, closed, node, enclosing):
+                records[positions[opened]] = (
+                    positions[closed], node, positions[enclosing] if enclosing >= 0 else level,
+                )
+
+            node = parse_expression(level_tokens, on_group=record)
+            self.reparsed += len(level_tokens)
+            if level < 0:
+                break
+            center = (level, node, groups[level][0] + shift)
+            low, high = level, groups[level][0] + 1
+            level = groups[level][2]
+
+        # Groups outside the re-parsed region keep their entries, shifted
+        # past the edit; re-parsed and enclosing groups come from `records`
+        low, high = removed
+        if shift:
+            updated = {}
+            for opened, (closed, contents, enclosing) in groups.items():
+                if opened >= high:
+                    updated[opened + shift] = (
+                        closed + shift, contents, enclosing + shift if enclosing >= high else enclosing,
+                    )
+                elif opened < low:
+                    updated[opened] = (closed + shift if closed >= high else closed, contents, enclosing)
+        else:
+            updated = groups
+            for opened in range(low, high):
+                if old[opened] == "(":
+                    del updated[opened]
+        updated.update(records)
+        # A name is a call if '(' follows it, so the token before the edit
+        # is counted again too
+        annotations = self.annotations.copy()
+        annotations.add(old, max(start - 1, 0), end, -1)
+        annotations.add(tokens, max(start - 1, 0), end + shift)
+        self._commit(tokens, node, updated, annotations)
+        return node
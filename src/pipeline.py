@@ -0,0 +1,182 @@
+import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from fractions import Fraction
+from itertools import islice
+from src.cache import ExpressionCache
+from src.compiler import MAX_FOLD_DIGITS
+from src.evaluator import evaluate
+from src.tracing import NULL_TRACE, Trace, activate, record_value
+
+# Per-process cache: repeated formulas (e.g. the same expression with
+# different bindings) are tokenized, parsed and simplified once per worker
+_cache = None
+
+
+class Options:
+    """
+    Settings shared by every record of a pipeline run.
+
+    Attributes:
+    - use_degrees: bool
+        If True, trigonometric functions interpret angles as degrees.
+    - exact: bool
+        Exact rational arithmetic (see evaluate).
+    - canonical: bool
+        Use Compiler.canonicalize instead of Compiler.simplify.
+    - max_digits: int
+        Digit budget for results (see evaluate); None for no limit.
+    - precision: int
+        Significant digits of decimal arithmetic (see evaluate); None for floats.
+    - trace: bool
+        Add a "trace" (see src.tracing) to every result.
+    """
+    def __init__(
+        self,
+        use_degrees: bool = True,
+        exact: bool = False,
+        canonical: bool = False,
+        max_digits: int = MAX_FOLD_DIGITS,
+        precision: int = None,
+        trace: bool = False,
+    ):
+        self.use_degrees = use_degrees
+        self.exact = exact
+        self.canonical = canonical
+        self.max_digits = max_digits
+        self.precision = precision
+        self.trace = trace
+
+
+def read_records(lines, json_lines: bool = False):
+    """
+    Lazily turn input lines into (line_number, expression, variables) records.
+    Blank lines are skipped.
+
+    In JSON-lines mode each line is an object such as
+    {"expression": "x^2 + y", "variables": {"x": 3, "y": 1}}; a line that is
+    not valid JSON yields a record whose expression is None and whose
+    variables hold the error message.
+    """
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        if not json_lines:
+            yield (line_number, line.strip(), {})
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict) or not isinstance(record.get("expression"), str):
+                raise ValueError('Each JSON line needs an "expression" string.')
+            variables = record.get("variables") or {}
+            if not isinstance(variables, dict):
+                raise ValueError('"variables" must be an object.')
+        except ValueError as error:
+            # json.JSONDecodeError is a ValueError as well
+            yield (line_number, None, str(error))
+            continue
+        yield (line_number, record["expression"], variables)
+
+
+def evaluation_tree(tree, simplified, precision: int = None):
+    """
+    The tree to evaluate: the simplified one, or with a `precision` the parse
+    tree, because simplify has already rounded folded constant arithmetic
+    such as 1/3 or 2^0.5 to floats.
+    """
+    return simplified if precision is None else tree
+
+
+def process_record(record, options: Options) -> dict:
+    """
+    Run one record through tokenize, parse, simplify and evaluate. Errors are
+    reported in the result instead of raised, so one bad line does not stop
+    a run.
+    """
+    global _cache
+    line_number, expression, variables = record
+    if expression is None:
+        return {"line": line_number, "error": variables}
+    if _cache is None:
+        _cache = ExpressionCache()
+
+    result = {"line": line_number, "expression": expression}
+    # Traces are returned with the result rather than exported here, so
+    # records run in worker processes are traced too
+    trace = Trace() if options.trace else NULL_TRACE
+    try:
+        with activate(trace):
+            # Constants are folded within the result budget too, so simplify
+            # never computes what evaluate would refuse
+            entry = _cache.get(
+                expression, canonical=options.canonical, exact=options.exact,
+                max_digits=MAX_FOLD_DIGITS if options.max_digits is None else min(options.max_digits, MAX_FOLD_DIGITS),
+            )
+            with trace.stage("evaluate"):
+                result["result"] = evaluate(
+                    evaluation_tree(entry.tree, entry.simplified, options.precision),
+                    variables,
+                    use_degrees=options.use_degrees,
+                    exact=options.exact,
+                    max_digits=options.max_digits,
+                    precision=options.precision,
+                )
+            record_value(trace, result["result"])
+    except ValueError as error:
+        result["error"] = str(error)
+    except (ArithmeticError, TypeError) as error:
+        # e.g. 0 ^ -1 or a float overflow
+        result["error"] = f"{type(error).__name__}: {error}"
+    if options.trace:
+        result["trace"] = trace.as_dict()
+    return result
+
+
+def process_chunk(chunk: list, options: Options) -> list:
+    return [process_record(record, options) for record in chunk]
+
+
+def run_pipeline(records, options: Options = None, workers: int = 1, chunk_size: int = 64):
+    """
+    Generate one result per record, in input order, as soon as it is ready.
+
+    With workers > 1, records are sent to a process pool in chunks of
+    `chunk_size`. At most 2 * workers chunks are in flight, so memory stays
+    bounded however long the input is.
+    """
+    if options is None:
+        options = Options()
+    if workers <= 1:
+        for record in records:
+            yield process_record(record, options)
+        return
+
+    records = iter(records)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        while True:
+            while len(pending) < 2 * workers:
+                chunk = list(islice(records, chunk_size))
+                if not chunk:
+                    break
+                pending.append(executor.submit(process_chunk, chunk, options))
+            if not pending:
+                return
+            yield from pending.popleft().result()
+
+
+def format_result(result: dict, json_lines: bool = False) -> str:
+    """
+    Render a result as one output line: the bare value (or "error: ...") in
+    plain mode, a JSON object in JSON-lines mode. Fractions, Decimals and
+    complex numbers are written as strings in JSON.
+    """
+    if not json_lines:
+        if "error" in result:
+            return f"error: {result['error']}"
+        return str(result["result"])
+    value = result.get("result")
+    if isinstance(value, (Fraction, Decimal, complex)):
+        result = dict(result, result=str(value))
+    return json.dumps(result)
@@ -0,0 +1,437 @@
+import hashlib
+from fractions import Fraction
+from src.parser import Node
+from src.evaluator import estimate_digits, exact_number
+
+# Products of sums are expanded only while the result stays below this many
+# terms; larger products are kept as opaque factors instead
+EXPANSION_LIMIT = 10_000
+
+
+class Polynomial:
+    """
+    A sparse multivariate polynomial with exact coefficients.
+
+    Attributes:
+    - terms: dict
+        Maps a monomial to its coefficient (int, Fraction or float). A monomial
+        is a tuple of (atom index, exponent) pairs sorted by atom index; the
+        empty tuple is the constant term. Atoms are variables, named constants
+        or opaque subtrees such as sin(x); see PolynomialBuilder.
+    """
+    __slots__ = ("terms",)
+
+    def __init__(self, terms: dict = None):
+        self.terms = terms if terms is not None else {}
+
+    @classmethod
+    def constant(cls, value) -> "Polynomial":
+        return cls({(): value} if value != 0 else {})
+
+    @classmethod
+    def atom(cls, index: int) -> "Polynomial":
+        return cls({((index, 1),): 1})
+
+    def constant_value(self):
+        """
+        The value of a constant polynomial, or None if it has other terms.
+        """
+        if not self.terms:
+            return 0
+        if len(self.terms) == 1 and () in self.terms:
+            return self.terms[()]
+        return None
+
+    def add(self, other: "Polynomial", sign: int = 1):
+        """
+        Add `sign * other` to this polynomial in place.
+        """
+        terms = self.terms
+        for monomial, coefficient in other.terms.items():
+            total = terms.get(monomial, 0) + sign * coefficient
+            if total == 0:
+                terms.pop(monomial, None)
+            else:
+                terms[monomial] = total
+
+    def multiply(self, other: "Polynomial") -> "Polynomial":
+        product = Polynomial()
+        for monomial, coefficient in self.terms.items():
+            for other_monomial, other_coefficient in other.terms.items():
+                product.add(Polynomial({
+                    _multiply_monomials(monomial, other_monomial): coefficient * other_coefficient
+                }))
+        return product
+
+    def scale(self, factor) -> "Polynomial":
+        if factor == 0:
+            return Polynomial()
+        return Polynomial({monomial: coefficient * factor for monomial, coefficient in self.terms.items()})
+
+    def power(self, exponent: int, max_digits: int = None) -> "Polynomial":
+        """
+        Raise to a non-negative integer power, or return None if the expanded
+        result would exceed EXPANSION_LIMIT terms or a coefficient would
+        exceed `max_digits` digits.
+        """
+        if exponent == 0:
+            return Polynomial.constant(1)
+        if len(self.terms) == 1:
+            # A single term: raise the coefficient and scale the exponents
+            (monomial, coefficient), = self.terms.items()
+            if max_digits is not None and estimate_digits("^", coefficient, exponent) > max_digits:
+                return None
+            return Polynomial({
+                tuple((atom, power * exponent) for atom, power in monomial): coefficient ** exponent
+            })
+
+        result = self
+        for _ in range(exponent - 1):
+            if len(result.terms) * len(self.terms) > EXPANSION_LIMIT:
+                return None
+            result = result.multiply(self)
+        return result
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __repr__(self):
+        return f"Polynomial({self.terms})"
+
+
+def _multiply_monomials(left: tuple, right: tuple) -> tuple:
+    if not left:
+        return right
+    if not right:
+        return left
+    merged = dict(left)
+    for atom, power in right:
+        merged[atom] = merged.get(atom, 0) + power
+    return tuple(sorted(merged.items()))
+
+
+def _is_negative(value) -> bool:
+    # Complex constants (from folding e.g. (-1)^0.5) have no sign
+    return isinstance(value, (int, float, Fraction)) and value < 0
+
+
+class PolynomialBuilder:
+    """
+    Converts hash-consed expression trees to Polynomials and back.
+
+    Anything that is not a polynomial operation (function calls, %, //, !,
+    division by a non-constant, non-integer powers) becomes an opaque atom
+    whose children are normalized first, so sin(y*x) and sin(x*y) are the
+    same atom. Opaque atoms may raise when evaluated, so those whose terms
+    cancel out (y! * 0, e/y - e/y) are kept as 0 * atom guards.
+
+    Parameters:
+    - make: callable
+        Node factory, normally NodeTable.make, used for every emitted node.
+    - max_digits: int
+        Digit budget for coefficients of expanded powers (None: unlimited).
+    """
+    def __init__(self, make, max_digits: int = None):
+        self.make = make
+        self.max_digits = max_digits
+        self.atoms = []        # Atom index -> node
+        self._atom_index = {}  # id(node) -> atom index
+        self._keys = []        # Atom index -> sort key
+        self._parts = {}       # Opaque atom index -> atoms of its children
+        self._digests = {}     # id(node) -> (size, digest) of its subtree
+        self._ranks = None
+
+    def atom(self, node: Node, parts: tuple = ()) -> Polynomial:
+        index = self._atom_index.get(id(node))
+        if index is None:
+            index = len(self.atoms)
+            self.atoms.append(node)
+            self._atom_index[id(node)] = index
+            if node.left is None and node.right is None:
+                self._keys.append((0, str(node.value)))
+            else:
+                self._keys.append((1, str(node.value), *self._digest(node)))
+                self._parts[index] = parts
+            self._ranks = None
+        return Polynomial.atom(index)
+
+    def _digest(self, node: Node) -> tuple:
+        """
+        Size and blake2b digest of the subtree under `node`: a fixed-size
+        structural sort key that is the same in every process, computed once
+        per node.
+        """
+        digests = self._digests
+        stack = [(node, False)]
+        while stack:
+            current, visited = stack.pop()
+            if id(current) in digests:
+                continue
+            children = [child for child in (current.left, current.right) if child is not None]
+            if not visited:
+                stack.append((current, True))
+                stack.extend((child, False) for child in children)
+                continue
+            digest = hashlib.blake2b(repr(current.value).encode(), digest_size=16)
+            size = 1
+            for position, child in zip(("l", "r"), (current.left, current.right)):
+                if child is not None:
+                    child_size, child_digest = digests[id(child)]
+                    size += child_size
+                    digest.update(position.encode() + child_digest)
+            digests[id(current)] = (size, digest.digest())
+        return digests[id(node)]
+
+    def from_tree(self, node: Node) -> Polynomial:
+        """
+        Convert a tree into a Polynomial, flattening + - and * chains and
+        collecting like terms. Iterative, so long chains are fine.
+        """
+        # Results of shared nodes are reused; every node stays reachable from
+        # `node`, so ids are stable
+        memo = {}
+        results = []
+        # Frames: (action, node, extra)
+        stack = [("convert", node, None)]
+        while stack:
+            action, current, extra = stack.pop()
+
+            if action == "convert":
+                if id(current) in memo:
+                    results.append(memo[id(current)])
+                    continue
+                value = current.value
+                if not isinstance(value, str):
+                    results.append(Polynomial.constant(value))
+                    continue
+                if value.isalpha() and current.left is None:
+                    # Variables and named constants such as pi stay symbolic.
+                    # Calls are told apart by their argument, not their name,
+                    # so canonical forms do not depend on what is registered.
+                    results.append(self.atom(self.make(value)))
+                    continue
+                if value in ("+", "-") and current.left is not None and current.right is not None:
+                    chain = self._flatten(current, ("+", "-"))
+                    stack.append(("sum", current, [sign for sign, _ in chain]))
+                    for _, operand in reversed(chain):
+                        stack.append(("convert", operand, None))
+                    continue
+                if value == "*":
+                    chain = self._flatten(current, ("*",))
+                    stack.append(("product", current, len(chain)))
+                    for _, operand in reversed(chain):
+                        stack.append(("convert", operand, None))
+                    continue
+                stack.append(("apply", current, None))
+                for child in (current.right, current.left):
+                    if child is not None:
+                        stack.append(("convert", child, None))
+                continue
+
+            if action == "sum":
+                operands = results[len(results) - len(extra):]
+                del results[len(results) - len(extra):]
+                total = Polynomial()
+                for sign, operand in zip(extra, operands):
+                    total.add(operand, sign)
+                result = total
+            elif action == "product":
+                operands = results[len(results) - extra:]
+                del results[len(results) - extra:]
+                result = self._product(operands)
+            else:
+                result = self._apply(current, results)
+
+            memo[id(current)] = result
+            results.append(result)
+
+        return results.pop()
+
+    @staticmethod
+    def _flatten(node: Node, operators: tuple) -> list:
+        """
+        Flatten a chain of associative operators into (sign, operand) pairs.
+        Only binary nodes are flattened; unary minus stays an operand.
+        """
+        chain = []
+        stack = [(1, node)]
+        while stack:
+            sign, current = stack.pop()
+            if (
+                current.value in operators
+                and current.left is not None
+                and current.right is not None
+            ):
+                right_sign = -sign if current.value == "-" else sign
+                stack.append((right_sign, current.right))
+                stack.append((sign, current.left))
+            else:
+                chain.append((sign, current))
+        return chain
+
+    def _product(self, operands: list) -> Polynomial:
+        product = Polynomial.constant(1)
+        for operand in operands:
+            if len(product.terms) * len(operand.terms) > EXPANSION_LIMIT:
+                # Too big to expand: keep the whole product as one opaque factor
+                tree = None
+                for factor in operands:
+                    factor_tree = self.to_tree(factor)
+                    tree = factor_tree if tree is None else self.make("*", tree, factor_tree)
+                return self.atom(tree, _atoms_of(*operands))
+            product = product.multiply(operand)
+        return product
+
+    def _apply(self, node: Node, results: list) -> Polynomial:
+        """
+        Combine the converted children of a non-chain node.
+        """
+        value = node.value
+        right = results.pop() if node.right is not None else None
+        left = results.pop() if node.left is not None else None
+
+        if value in ("+", "-") and left is None and right is not None:
+            # Unary plus or minus
+            return right if value == "+" else right.scale(-1)
+
+        if value == "/":
+            divisor = right.constant_value()
+            if divisor is not None and divisor != 0:
+                if isinstance(divisor, float):
+                    return left.scale(1 / divisor)
+                return left.scale(Fraction(1) / divisor)
+        elif value == "^":
+            exponent = right.constant_value()
+            if isinstance(exponent, int) and exponent >= 0:
+                powered = left.power(exponent, self.max_digits)
+                if powered is not None:
+                    return powered
+
+        # Everything else is opaque: rebuild it from normalized children
+        return self.atom(self.make(
+            value,
+            None if left is None else self.to_tree(left),
+            None if right is None else self.to_tree(right),
+        ), _atoms_of(*(child for child in (left, right) if child is not None)))
+
+    def rank_atoms(self):
+        """
+        Number the atoms in their final order, for emitting the result: variables
+        first, alphabetically; then opaque atoms by operator, size and digest.
+        Until then (for the children of opaque atoms) the sort keys are compared
+        directly.
+        """
+        order = sorted(range(len(self.atoms)), key=self._keys.__getitem__)
+        self._ranks = {atom_index: rank for rank, atom_index in enumerate(order)}
+
+    def _rank(self, atom: int):
+        if self._ranks is None:
+            return self._keys[atom]
+        return self._ranks[atom]
+
+    def guards(self, polynomial: Polynomial) -> list:
+        """
+        The opaque atoms that `polynomial` lost to cancellation and that are not
+        inside another atom it keeps, outermost first.
+        """
+        covered = set()
+
+        def cover(atoms):
+            stack = list(atoms)
+            while stack:
+                atom = stack.pop()
+                if atom not in covered:
+                    covered.add(atom)
+                    stack.extend(self._parts.get(atom, ()))
+
+        cover(_atoms_of(polynomial))
+        dropped = []
+        # Atoms are numbered after the atoms of their children
+        for atom in reversed(range(len(self.atoms))):
+            if atom in self._parts and atom not in covered:
+                dropped.append(atom)
+                cover((atom,))
+        return dropped
+
+    def to_tree(self, polynomial: Polynomial) -> Node:
+        """
+        Emit a minimal tree: terms in graded lexicographic order, coefficient 1
+        and exponent 1 omitted, negative terms as subtraction and the constant
+        term last.
+        """
+        make = self.make
+        if not polynomial.terms:
+            return make(0)
+
+        def sort_key(item):
+            monomial = item[0]
+            ranked = sorted((self._rank(atom), -power) for atom, power in monomial)
+            return (not monomial, -sum(power for _, power in monomial), ranked)
+
+        tree = None
+        for monomial, coefficient in sorted(polynomial.terms.items(), key=sort_key):
+            coefficient = exact_number(coefficient)
+            negative = _is_negative(coefficient)
+            term = self._emit_term(monomial, -coefficient if negative and tree is not None else coefficient)
+            if tree is None:
+                tree = term
+            else:
+                tree = make("-" if negative else "+", tree, term)
+        return tree
+
+    def _emit_term(self, monomial: tuple, coefficient) -> Node:
+        make = self.make
+        factors = None
+        for atom, power in sorted(monomial, key=lambda pair: self._rank(pair[0])):
+            factor = self.atoms[atom]
+            if power != 1:
+                factor = make("^", factor, make(power))
+            factors = factor if factors is None else make("*", factors, factor)
+
+        if factors is None:
+            # Constant term
+            if isinstance(coefficient, Fraction):
+                term = make("/", make(abs(coefficient.numerator)), make(coefficient.denominator))
+                return make("-", right=term) if coefficient < 0 else term
+            if _is_negative(coefficient):
+                return make("-", right=make(-coefficient))
+            return make(coefficient)
+
+        if isinstance(coefficient, Fraction):
+            # Keep p/q coefficients as a division so evaluation stays exact
+            # up to the final '/'
+            numerator = abs(coefficient.numerator)
+            scaled = factors if numerator == 1 else make("*", make(numerator), factors)
+            term = make("/", scaled, make(coefficient.denominator))
+            return make("-", right=term) if _is_negative(coefficient) else term
+        if coefficient == 1:
+            return factors
+        if coefficient == -1:
+            return make("-", right=factors)
+        if _is_negative(coefficient):
+            return make("-", right=make("*", make(-coefficient), factors))
+        return make("*", make(coefficient), factors)
+
+
+def _atoms_of(*polynomials) -> tuple:
+    return tuple({atom for polynomial in polynomials for monomial in polynomial.terms for atom, _ in monomial})
+
+
+def normal_form(node: Node, make, max_digits: int = None) -> Node:
+    """
+    Rewrite a (simplified) tree into polynomial normal form: associative
+    chains flattened, factors sorted, like terms collected with exact
+    coefficients, and a minimal tree emitted. Opaque factors of cancelled
+    terms are appended as 0 * factor, so the result raises wherever `node`
+    does.
+    """
+    if node is None:
+        return None
+    builder = PolynomialBuilder(make, max_digits)
+    polynomial = builder.from_tree(node)
+    builder.rank_atoms()
+    tree = builder.to_tree(polynomial) if polynomial.terms else None
+    for atom in builder.guards(polynomial):
+        guard = make("*", make(0), builder.atoms[atom])
+        tree = guard if tree is None else make("+", tree, guard)
+    return make(0) if tree is None else tree
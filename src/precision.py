@@ -0,0 +1,328 @@
+import math
+from decimal import Decimal, Context, InvalidOperation, Overflow, ROUND_FLOOR, localcontext, getcontext, MAX_EMAX, MIN_EMIN
+from fractions import Fraction
+from functools import lru_cache
+from src.interval import DIVISION_MESSAGES, LOG_MESSAGE, SQRT_MESSAGE, COMPLEX_MESSAGE, ZERO_POWER_MESSAGE
+
+OVERFLOW_MESSAGE = "Result is too large for a decimal."
+INFINITE_ANGLE_MESSAGE = "Trigonometric functions are not defined for infinite angles."
+UNDEFINED_MESSAGE = "'{}' is undefined for these values."
+REMAINDER_MESSAGE = "'%' needs a precision of at least as many digits as the quotient."
+
+# Digits carried beyond the requested precision, so the rounding errors of
+# intermediate steps stay out of the result
+GUARD_DIGITS = 10
+# Constants are cached for this many precisions, least recently used evicted first
+MAX_CACHED_PRECISIONS = 32
+# Each term of the Chudnovsky series adds about this many digits of pi
+CHUDNOVSKY_DIGITS_PER_TERM = 14.18
+# Reducing an angle in radians takes as many digits of pi as it has
+# before the point, on top of the precision
+MAX_ANGLE_DIGITS = 100_000
+LARGE_ANGLE_MESSAGE = f"Angles in radians must have fewer than {MAX_ANGLE_DIGITS} digits before the point."
+
+
+def precision_context(digits: int) -> Context:
+    """
+    A decimal context that rounds to `digits` significant digits. Its
+    exponent range is the widest decimal allows, so results of any size an
+    int can have stay finite.
+    """
+    return Context(prec=digits, Emax=MAX_EMAX, Emin=MIN_EMIN)
+
+
+def to_decimal(value) -> Decimal:
+    """
+    Convert an int, float, Fraction or Decimal to a Decimal. Ints convert
+    exactly whatever their size. A float is taken at its shortest repr, so
+    0.1 is one tenth. A Fraction is rounded to the current context.
+    """
+    if value.__class__ is Decimal:
+        return value
+    if value.__class__ is float:
+        return Decimal(repr(value))
+    if value.__class__ is Fraction:
+        return Decimal(value.numerator) / value.denominator
+    return Decimal(value)
+
+
+def _chudnovsky(a: int, b: int):
+    # Binary splitting of terms a..b-1 of the Chudnovsky series: (P, Q, T)
+    if b - a == 1:
+        if a == 0:
+            p = q = 1
+        else:
+            p = (6 * a - 5) * (2 * a - 1) * (6 * a - 1)
+            q = a * a * a * 10939058860032000
+        t = p * (13591409 + 545140134 * a)
+        return p, q, -t if a & 1 else t
+    middle = (a + b) // 2
+    p1, q1, t1 = _chudnovsky(a, middle)
+    p2, q2, t2 = _chudnovsky(middle, b)
+    return p1 * p2, q1 * q2, q2 * t1 + p1 * t2
+
+
+@lru_cache(maxsize=MAX_CACHED_PRECISIONS)
+def constant(name: str, digits: int) -> Decimal:
+    """
+    The constant `name` ('pi', 'e' or 'ln10', the natural log of 10) to
+    `digits` significant digits. Cached per precision, so evaluating many
+    expressions at one precision computes each constant once.
+    """
+    with localcontext(precision_context(digits + GUARD_DIGITS)):
+        if name == "pi":
+            _, q, t = _chudnovsky(0, int(digits / CHUDNOVSKY_DIGITS_PER_TERM) + 2)
+            value = 426880 * Decimal(10005).sqrt() * q / t
+        elif name == "e":
+            value = _exp(Decimal(1), digits + GUARD_DIGITS)
+        elif name == "ln10":
+            value = _newton_log(Decimal(10), digits + GUARD_DIGITS)
+        else:
+            raise ValueError(f"Unsupported constant '{name}'")
+    with localcontext(precision_context(digits)):
+        return +value
+
+
+def _exp(x: Decimal, digits: int) -> Decimal:
+    """
+    exp(x) to `digits` significant digits. Decimal.exp is correctly rounded
+    but slow beyond a few hundred digits; this sums the series on x / 2^k
+    and squares the sum back k times.
+    """
+    if not x.is_finite():
+        return x if x.is_nan() or x > 0 else Decimal(0)
+    # For |x| >= 10, split off a power of ten: x = n * ln(10) + r
+    scale = 0
+    if x.adjusted() > 0:
+        extra = x.adjusted() + GUARD_DIGITS
+        with localcontext(precision_context(digits + extra)):
+            ln10 = constant("ln10", digits + extra)
+            scale = (x / ln10).to_integral_value(rounding=ROUND_FLOOR)
+            x = x - scale * ln10
+
+    # Each squaring loses under a bit, which the extra digits cover
+    halvings = max(4, math.isqrt(digits))
+    working = digits + GUARD_DIGITS + halvings // 3
+    with localcontext(precision_context(working)):
+        y = x / (1 << halvings)
+        epsilon = Decimal(10) ** -working
+        total = term = Decimal(1)
+        n = 0
+        while True:
+            n += 1
+            term = term * y / n
+            if abs(term) <= epsilon:
+                break
+            total += term
+        for _ in range(halvings):
+            total *= total
+        return total.scaleb(scale)
+
+
+def _log(x: Decimal, digits: int) -> Decimal:
+    """
+    ln(x) of a positive x to `digits` significant digits. Decimal.ln is
+    correctly rounded but, like Decimal.exp, slow at high precision.
+    """
+    if not x.is_finite():
+        return x
+    # x = m * 10^k with 1 <= m < 10, so ln(x) = ln(m) + k * ln(10). Below
+    # 1, k = -1 would cancel most digits of ln(m) for x close to 1.
+    k = x.adjusted()
+    if k == -1:
+        k = 0
+    # Scaling is exact, as m keeps every digit of x
+    m = x.scaleb(-k, precision_context(max(len(x.as_tuple().digits), 1)))
+    if not k:
+        # ln(x) is about x - 1, so its leading zeros need digits of their own
+        return _newton_log(m, digits + max(0, -(m - 1).adjusted()))
+    extra = len(str(abs(k))) + GUARD_DIGITS
+    with localcontext(precision_context(digits + extra)):
+        return _newton_log(m, digits + extra) + k * constant("ln10", digits + extra)
+
+
+def _newton_log(m: Decimal, digits: int) -> Decimal:
+    # ln(m) for m of moderate size, by Newton's method on _exp, doubling
+    # the precision at each step
+    if m == 1:
+        return Decimal(0)
+    with localcontext(precision_context(digits + GUARD_DIGITS)):
+        m = +m
+    precisions = []
+    working = digits + GUARD_DIGITS
+    while working > 15:
+        precisions.append(working)
+        working = working // 2 + 1
+    y = Decimal(math.log(float(m)))
+    for working in reversed(precisions):
+        with localcontext(precision_context(working)):
+            power = _exp(y, working)
+            y += 2 * (m - power) / (m + power)
+    return y
+
+
+def _sin_cos(x: Decimal, digits: int):
+    """
+    sin and cos of x radians, accurate to about `digits` digits after the
+    decimal point (so relative to 1, not to a result close to zero).
+    """
+    if not x:
+        return Decimal(0), Decimal(1)
+    if x.adjusted() >= MAX_ANGLE_DIGITS:
+        raise ValueError(LARGE_ANGLE_MESSAGE)
+    # Take out whole turns with enough digits of pi that the remainder
+    # keeps `digits` of its own
+    extra = max(0, x.adjusted()) + GUARD_DIGITS
+    with localcontext(precision_context(digits + extra)):
+        turn = 2 * constant("pi", digits + extra)
+        x = x - (x / turn).to_integral_value() * turn
+
+    # Sum the series of sin on x / 2^k, then double the angle back k times;
+    # each doubling loses under a bit, which the extra digits cover
+    halvings = max(4, math.isqrt(digits))
+    working = digits + GUARD_DIGITS + halvings // 3
+    with localcontext(precision_context(working)):
+        y = x / (1 << halvings)
+        square = y * y
+        epsilon = Decimal(10) ** -working
+        sine = term = y
+        n = 1
+        while True:
+            term = -term * square / ((n + 1) * (n + 2))
+            n += 2
+            if abs(term) <= epsilon * abs(y):
+                break
+            sine += term
+        # y is tiny, so cos(y) is close to 1 and loses nothing to the root
+        cosine = (1 - sine * sine).sqrt()
+        for _ in range(halvings):
+            sine, cosine = 2 * sine * cosine, (cosine - sine) * (cosine + sine)
+    return sine, cosine
+
+
+def _radians(angle, digits: int) -> Decimal:
+    pi = constant("pi", digits + GUARD_DIGITS)
+    if angle.__class__ is Decimal and abs(angle) < 360:
+        with localcontext(precision_context(digits + GUARD_DIGITS)):
+            return angle * pi / 180
+    # Whole turns are taken out exactly, before pi is involved
+    exponent = angle.as_tuple().exponent if angle.__class__ is Decimal else 0
+    if exponent > 0:
+        # angle = c * 10^q; reduce 10^q modulo 360 rather than build it
+        coefficient = int(angle.scaleb(-exponent, precision_context(angle.adjusted() - exponent + 1)))
+        turns = Fraction(coefficient * pow(10, exponent, 360) % 360)
+    else:
+        turns = Fraction(angle) % 360
+    with localcontext(precision_context(digits + GUARD_DIGITS)):
+        return turns.numerator * pi / (180 * turns.denominator)
+
+
+def _trigonometric(name: str, arg_val, use_degrees: bool, digits: int) -> Decimal:
+    if arg_val.__class__ in (float, Decimal):
+        angle = to_decimal(arg_val)
+        if not angle.is_finite():
+            raise ValueError(INFINITE_ANGLE_MESSAGE)
+    else:
+        # Degrees of an int or Fraction are reduced before converting, which
+        # for a huge int takes longer than the reduction
+        angle = arg_val
+    sine, cosine = _sin_cos(_radians(angle, digits) if use_degrees else to_decimal(angle), digits)
+    if name == "sin":
+        return +sine
+    return +cosine if name == "cos" else sine / cosine
+
+
+def _floor_divmod(left: Decimal, right: Decimal):
+    # Decimal's divmod truncates towards zero; Python's floors. Raises
+    # InvalidOperation when the quotient has more digits than the precision.
+    quotient, remainder = divmod(left, right)
+    if remainder and (remainder < 0) != (right < 0):
+        quotient -= 1
+        remainder += right
+    return quotient, remainder
+
+
+def precise_operator(operator: str, left_val, right_val) -> Decimal:
+    """
+    Apply a binary operator with decimal arithmetic, rounding to the current
+    context. Operands are converted with to_decimal. Errors are the ones
+    apply_operator raises. Complex powers, zero to a negative power and
+    operations that would give NaN (such as infinity minus infinity) raise
+    ValueError, as they have no Decimal result. '%' and '//' floor like
+    Python's operators, not truncate like Decimal's; '%' raises ValueError
+    when the quotient has more digits than the precision.
+    """
+    left_val, right_val = to_decimal(left_val), to_decimal(right_val)
+    try:
+        if operator == "+":
+            return left_val + right_val
+        if operator == "-":
+            return left_val - right_val
+        if operator == "*":
+            return left_val * right_val
+        if operator in DIVISION_MESSAGES:
+            if not right_val:
+                raise ValueError(DIVISION_MESSAGES[operator])
+            if operator == "/":
+                return left_val / right_val
+            try:
+                quotient, remainder = _floor_divmod(left_val, right_val)
+            except InvalidOperation:
+                # The quotient has more digits than the precision. It can be
+                # rounded, but the remainder is lost in the rounding of
+                # `left_val` itself.
+                if operator == "%":
+                    raise ValueError(REMAINDER_MESSAGE) from None
+                return (left_val / right_val).to_integral_value(rounding=ROUND_FLOOR)
+            return remainder if operator == "%" else quotient
+        if operator == "^":
+            if not right_val:
+                # Decimal leaves 0 ^ 0 undefined; ints and floats give 1
+                return Decimal(1)
+            if not left_val and right_val < 0:
+                raise ValueError(ZERO_POWER_MESSAGE)
+            if left_val < 0 and right_val != right_val.to_integral_value():
+                raise ValueError(COMPLEX_MESSAGE)
+            return left_val ** right_val
+    except Overflow:
+        raise OverflowError(OVERFLOW_MESSAGE) from None
+    except InvalidOperation:
+        raise ValueError(UNDEFINED_MESSAGE.format(operator)) from None
+    raise ValueError(f"Unsupported operator: {operator}")
+
+
+def precise_function(name: str, arg_val, use_degrees: bool = True):
+    """
+    Apply the built-in function `name` with decimal arithmetic, to the
+    precision of the current context. Errors are the ones apply_function
+    raises. floor and ceil return ints, and abs keeps an int or Fraction
+    as it is.
+    """
+    if name in ("floor", "ceil", "abs"):
+        if arg_val.__class__ is float:
+            arg_val = to_decimal(arg_val)
+        if name == "abs":
+            return abs(arg_val)
+        return math.floor(arg_val) if name == "floor" else math.ceil(arg_val)
+
+    digits = getcontext().prec
+    if name in ("sin", "cos", "tan"):
+        return _trigonometric(name, arg_val, use_degrees, digits)
+    argument = to_decimal(arg_val)
+    try:
+        if name == "log":
+            if argument <= 0:
+                raise ValueError(LOG_MESSAGE)
+            return +_log(argument, digits)
+        if name == "sqrt":
+            if argument < 0:
+                raise ValueError(SQRT_MESSAGE)
+            return argument.sqrt()
+        if name == "exp":
+            return +_exp(argument, digits)
+    except Overflow:
+        raise OverflowError(OVERFLOW_MESSAGE) from None
+    except InvalidOperation:
+        # e.g. comparing NaN to zero
+        raise ValueError(UNDEFINED_MESSAGE.format(name)) from None
+    raise ValueError(f"Unsupported function '{name}'")
@@ -0,0 +1,196 @@
+import math
+import threading
+
+# Separates the arguments of a call; f(a, b, c) is parsed as
+# Node("f", left=Node(",", left=Node(",", left=a, right=b), right=c))
+ARGUMENT_SEPARATOR = ","
+
+
+class Arguments(tuple):
+    """
+    The evaluated arguments of a call with several arguments: what a ','
+    node evaluates to, and what a function is applied to.
+    """
+    __slots__ = ()
+
+
+def join_arguments(left, right) -> Arguments:
+    """
+    Evaluate a ',' node: the arguments collected on the left, then `right`.
+    """
+    if left.__class__ is Arguments:
+        return Arguments((*left, right))
+    return Arguments((left, right))
+
+
+class Function:
+    """
+    A function known to the evaluators.
+
+    Attributes:
+    - name: str
+        Lowercase ASCII letters, as the tokenizer produces names.
+    - implementation: callable
+        Called with the evaluated arguments, one positional argument each.
+    - arity: int or None
+        Number of arguments; None accepts any number from one up.
+    - angle: bool
+        True for functions of angles, whose arguments are converted from
+        degrees first in degree mode.
+    - builtin: bool
+        True for the functions every backend implements itself.
+    """
+    __slots__ = ("name", "implementation", "arity", "angle", "builtin")
+
+    def __init__(self, name: str, implementation, arity: int = 1, angle: bool = False, builtin: bool = False):
+        self.name = name
+        self.implementation = implementation
+        self.arity = arity
+        self.angle = angle
+        self.builtin = builtin
+
+    def __repr__(self):
+        return f"Function({self.name!r}, arity={self.arity}, angle={self.angle}, builtin={self.builtin})"
+
+
+def _log(value):
+    if value <= 0:
+        raise ValueError("Logarithm is only defined for positive numbers.")
+    return math.log(value)
+
+
+def _sqrt(value):
+    if value < 0:
+        raise ValueError("Square root is not defined for negative numbers.")
+    return math.sqrt(value)
+
+
+BUILTIN_FUNCTIONS = {
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+    "log": _log,
+    "sqrt": _sqrt,
+    "abs": abs,
+    "exp": math.exp,
+    "floor": math.floor,
+    "ceil": math.ceil,
+}
+BUILTIN_CONSTANTS = {"pi": math.pi, "e": math.e}
+ANGLE_FUNCTIONS = ("sin", "cos", "tan")
+
+
+class Registry:
+    """
+    The functions and constants shared by the parser, the evaluators and
+    the UI, each in a dict keyed by name, so recognizing a name and
+    dispatching a call are single dict lookups.
+
+    Functions registered here are evaluated by evaluate, Compiler.compile,
+    Compiler.compile_python, the decimal backend (with floats) and
+    evaluate_batch (one row at a time). Interval and derivative evaluation
+    only implement the built-ins.
+    Registrations made after a process pool has started are not seen by
+    its workers.
+
+    Attributes:
+    - functions: dict
+        Maps names to Functions.
+    - constants: dict
+        Maps names to values.
+    - version: int
+        Incremented by every change, for caches of compiled code.
+    """
+    def __init__(self):
+        self.functions = {}
+        self.constants = {}
+        self.version = 0
+        self._lock = threading.Lock()
+        for name, implementation in BUILTIN_FUNCTIONS.items():
+            self.functions[name] = Function(name, implementation, 1, name in ANGLE_FUNCTIONS, True)
+        self.constants.update(BUILTIN_CONSTANTS)
+
+    def register_function(self, name: str, implementation, arity: int = 1, angle: bool = False):
+        """
+        Add a function, or replace one registered earlier. `arity` is the
+        number of arguments (None for any number from one up); with
+        angle=True, every argument is converted from degrees in degree mode.
+        """
+        if arity is not None and arity < 1:
+            raise ValueError("A function must take at least one argument.")
+        with self._lock:
+            self._check_name(name, self.constants, "constant")
+            self.functions[name] = Function(name, implementation, arity, angle, False)
+            self.version += 1
+
+    def register_constant(self, name: str, value):
+        """
+        Add a constant, or replace one registered earlier.
+        """
+        with self._lock:
+            self._check_name(name, self.functions, "function")
+            self.constants[name] = value
+            self.version += 1
+
+    def unregister(self, name: str):
+        """
+        Remove a registered function or constant.
+        """
+        with self._lock:
+            if name in BUILTIN_FUNCTIONS or name in BUILTIN_CONSTANTS:
+                raise ValueError(f"Cannot remove the built-in '{name}'.")
+            if self.functions.pop(name, None) is None and self.constants.pop(name, None) is None:
+                raise ValueError(f"'{name}' is not registered.")
+            self.version += 1
+
+    @staticmethod
+    def _check_name(name: str, other: dict, kind: str):
+        if not (isinstance(name, str) and name.isascii() and name.isalpha() and name.islower()):
+            raise ValueError(f"Names must be lowercase ASCII letters, not {name!r}.")
+        if name in BUILTIN_FUNCTIONS or name in BUILTIN_CONSTANTS:
+            raise ValueError(f"Cannot redefine the built-in '{name}'.")
+        if name in other:
+            raise ValueError(f"'{name}' is already registered as a {kind}.")
+
+    def arguments(self, name: str, arg_val) -> tuple:
+        """
+        The arguments of a call to `name` as a tuple, after checking how many
+        there are. `arg_val` is the evaluated argument node: an Arguments
+        for several arguments, a single value otherwise.
+        """
+        return self._arguments(self._function(name), arg_val)
+
+    def _function(self, name: str) -> Function:
+        function = self.functions.get(name)
+        if function is None:
+            raise ValueError(f"Unsupported function '{name}'")
+        return function
+
+    @staticmethod
+    def _arguments(function: Function, arg_val) -> tuple:
+        name = function.name
+        args = arg_val if arg_val.__class__ is Arguments else (arg_val,)
+        if function.arity is not None and len(args) != function.arity:
+            expected = f"{function.arity} argument" + ("s" if function.arity != 1 else "")
+            raise ValueError(f"Function '{name}' takes {expected}, not {len(args)}.")
+        return args
+
+    def call(self, name: str, arg_val, use_degrees: bool = True):
+        """
+        Apply the function `name` to its evaluated argument node.
+        """
+        function = self._function(name)
+        args = self._arguments(function, arg_val)
+        if use_degrees and function.angle:
+            args = [math.radians(arg) for arg in args]
+        return function.implementation(*args)
+
+    def __repr__(self):
+        return f"Registry({len(self.functions)} functions, {len(self.constants)} constants)"
+
+
+# The registry every module uses
+REGISTRY = Registry()
+register_function = REGISTRY.register_function
+register_constant = REGISTRY.register_constant
+unregister = REGISTRY.unregister
@@ -0,0 +1,374 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from src.cache import ExpressionCache
+from src.pipeline import Options, process_record, format_result
+from src.tracing import PrometheusExporter, integer_digits
+
+# Defaults for the budgets every request runs under
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_MAX_DIGITS = 100_000
+# Largest request body accepted
+MAX_BODY_BYTES = 1 << 20
+# Idle keep-alive connections are closed after this many seconds
+KEEP_ALIVE_TIMEOUT = 30.0
+
+TIMEOUT_MESSAGE = "Time budget exceeded."
+BUSY_MESSAGE = "Server is busy; try again later."
+
+STATUS_TEXT = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 422: "Unprocessable Entity", 431: "Request Header Fields Too Large",
+    500: "Internal Server Error", 503: "Service Unavailable", 504: "Gateway Timeout",
+}
+
+
+class _TimeBudgetExceeded(Exception):
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise _TimeBudgetExceeded()
+
+
+def _init_worker():
+    # Results may have far more digits than the default int-to-str limit;
+    # the digit budget bounds them instead
+    sys.set_int_max_str_digits(0)
+    if hasattr(signal, "setitimer"):
+        signal.signal(signal.SIGALRM, _on_alarm)
+
+
+def _new_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    A process pool whose workers are not forked from the server: the pool
+    starts them lazily, on the first requests, and a forked worker would
+    inherit the client sockets open at that moment and keep them from ever
+    reaching EOF. Scripts that run a server must therefore guard their entry
+    point with if __name__ == "__main__".
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context(method), initializer=_init_worker
+    )
+
+
+def compute(expression: str, variables: dict, options: Options, time_limit: float):
+    """
+    Evaluate one expression in a worker process and return (HTTP status,
+    JSON text of the result, trace or None). Runs under a SIGALRM timer
+    where available, which stops Python-level work after `time_limit`
+    seconds; single big-int operations are bounded by the digit budget.
+    """
+    timer = hasattr(signal, "setitimer")
+    if timer:
+        signal.setitimer(signal.ITIMER_REAL, max(time_limit, 0.001))
+    try:
+        result = process_record((0, expression, variables), options)
+        value = result.get("result")
+        # The digit budget is checked on estimates before each operation,
+        # so the result itself is checked too before it is formatted
+        if value.__class__ is int and integer_digits(value) > options.max_digits:
+            del result["result"]
+            result["error"] = f"Result has more than {options.max_digits} digits."
+        del result["line"]
+        trace = result.pop("trace", None)
+        return (422 if "error" in result else 200), format_result(result, json_lines=True), trace
+    except _TimeBudgetExceeded:
+        return 504, json.dumps({"expression": expression, "error": TIMEOUT_MESSAGE}), None
+    finally:
+        if timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+class ExpressionServer:
+    """
+    An asyncio HTTP server for evaluating expressions.
+
+    Work runs in a process pool, so the event loop only parses requests
+    and writes responses. Identical expressions in flight at the same time
+    (same text after normalization, variables, options and budgets) are computed
+    once and the result is shared. At most `max_concurrency` computations
+    are queued on the pool and at most `max_waiting` more requests wait
+    for a slot; beyond that requests are turned away with 503, so a burst
+    of slow expressions cannot pile up without bound.
+
+    Every request runs under a time budget (504 when exceeded) and a digit
+    budget on intermediate and final results (see evaluate), which is what
+    stops something like 99999! from occupying a worker.
+
+    Endpoints:
+    - POST /evaluate with {"expression": ..., "variables": {...}} and
+      optionally "use_degrees", "exact", "precision", "max_digits" and
+      "timeout" (both budgets can only be lowered)
+    - GET /health
+    - GET /metrics, in the Prometheus text format
+
+    Parameters:
+    - workers: int
+        Worker processes.
+    - timeout: float
+        Seconds each request may take, including time spent waiting.
+    - max_digits: int
+        Digit budget for results.
+    - max_concurrency: int
+        Computations queued on the pool at once (default: 2 per worker).
+    - max_waiting: int
+        Requests waiting for a slot before new ones get 503.
+    """
+    def __init__(
+        self,
+        workers: int = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_digits: int = DEFAULT_MAX_DIGITS,
+        max_concurrency: int = None,
+        max_waiting: int = 1024,
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.max_digits = max_digits
+        self.max_concurrency = max_concurrency or 2 * self.workers
+        self.max_waiting = max_waiting
+        self.metrics = PrometheusExporter(prefix="expression_server")
+        self._executor = None
+        self._slots = None
+        self._waiting = 0
+        self._in_flight = {}
+        self._server = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080):
+        self._executor = _new_pool(self.workers)
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._executor is not None:
+            # Running work stops within its time budget, so this wait is bounded
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    async def evaluate(self, request: dict) -> tuple:
+        """
+        Evaluate a decoded /evaluate request and return (status, JSON text).
+        """
+        expression = request.get("expression")
+        variables = request.get("variables") or {}
+        if not isinstance(expression, str) or not isinstance(variables, dict):
+            return 400, json.dumps({"error": 'Expected {"expression": string, "variables": object}.'})
+        try:
+            timeout = min(float(request.get("timeout", self.timeout)), self.timeout)
+            max_digits = min(int(request.get("max_digits", self.max_digits)), self.max_digits)
+            precision = request.get("precision")
+            options = Options(
+                use_degrees=bool(request.get("use_degrees", True)),
+                exact=bool(request.get("exact", False)),
+                max_digits=max_digits,
+                precision=None if precision is None else int(precision),
+                trace=True,
+            )
+            # Budgets are part of the key, so a request never gets the result
+            # (or the timeout) of a computation run under other budgets
+            key = (
+                ExpressionCache.normalize(expression), json.dumps(variables, sort_keys=True),
+                options.use_degrees, options.exact, options.precision, max_digits, timeout,
+            )
+        except (TypeError, ValueError) as error:
+            return 400, json.dumps({"error": f"Invalid request: {error}"})
+        if options.precision is not None and not 1 <= options.precision <= max_digits:
+            return 400, json.dumps({"error": f"Precision must be between 1 and {max_digits} digits."})
+
+        start = time.perf_counter()
+        counts = {"requests": 1}
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._compute(expression, variables, options, start + timeout))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._in_flight.pop(key, None))
+        else:
+            counts["coalesced"] = 1
+
+        stages = {}
+        try:
+            # Shielded, so one waiter timing out does not cancel the others
+            status, body, trace = await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            status, body, trace = 504, json.dumps({"error": TIMEOUT_MESSAGE}), None
+        if trace is not None and "coalesced" not in counts:
+            stages.update(trace["stages"])
+            for name, amount in trace["counts"].items():
+                counts[name] = counts.get(name, 0) + amount
+        stages["request"] = time.perf_counter() - start
+        counts[f"status_{status}"] = 1
+        self.metrics.export({"stages": stages, "counts": counts, "maxima": trace["maxima"] if trace else {}})
+        return status, body
+
+    async def _compute(self, expression: str, variables: dict, options: Options, deadline: float) -> tuple:
+        if self._waiting >= self.max_waiting:
+            return 503, json.dumps({"error": BUSY_MESSAGE}), None
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        try:
+            time_limit = deadline - time.perf_counter()
+            if time_limit <= 0:
+                # Every waiter has given up already
+                return 504, json.dumps({"error": TIMEOUT_MESSAGE}), None
+            loop = asyncio.get_running_loop()
+            executor = self._executor
+            try:
+                return await loop.run_in_executor(executor, compute, expression, variables, options, time_limit)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); every request on the
+                # broken pool fails, and the first one replaces it
+                if self._executor is executor:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    self._executor = _new_pool(self.workers)
+                return 500, json.dumps({"error": "Worker process failed."}), None
+        finally:
+            self._slots.release()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT)
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 431, json.dumps({"error": "Request headers too large."}), False)
+                    return
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, path, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, json.dumps({"error": "Malformed request line."}), False)
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+
+                try:
+                    length = int(headers.get("content-length", "0"))
+                except ValueError:
+                    length = -1
+                if length < 0 or length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, json.dumps({"error": "Request body too large."}), False)
+                    return
+                body = await reader.readexactly(length)
+
+                status, payload, content_type = await self._route(method, path, body)
+                await self._respond(writer, status, payload, keep_alive, content_type)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes) -> tuple:
+        path = path.split("?", 1)[0]
+        if path == "/evaluate":
+            if method != "POST":
+                return 405, json.dumps({"error": "Use POST."}), "application/json"
+            try:
+                request = json.loads(body)
+            except ValueError as error:
+                return 400, json.dumps({"error": f"Invalid JSON: {error}"}), "application/json"
+            if not isinstance(request, dict):
+                return 400, json.dumps({"error": "Expected a JSON object."}), "application/json"
+            status, payload = await self.evaluate(request)
+            return status, payload, "application/json"
+        if path == "/health" and method == "GET":
+            return 200, json.dumps({"status": "ok", "in_flight": len(self._in_flight)}), "application/json"
+        if path == "/metrics" and method == "GET":
+            return 200, self.metrics.render(), "text/plain; version=0.0.4"
+        return 404, json.dumps({"error": "Not found."}), "application/json"
+
+    @staticmethod
+    async def _respond(writer, status: int, payload: str, keep_alive: bool, content_type: str = "application/json"):
+        data = payload.encode()
+        writer.write(
+            f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+        )
+        await writer.drain()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.server",
+        description="Serve expression evaluation over HTTP: POST /evaluate, GET /health, GET /metrics.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="0 picks a free port")
+    parser.add_argument("-w", "--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument(
+        "--timeout", type=float, default=DEFAULT_TIMEOUT,
+        help=f"seconds each request may take (default: {DEFAULT_TIMEOUT})",
+    )
+    parser.add_argument(
+        "--max-digits", type=int, default=DEFAULT_MAX_DIGITS,
+        help=f"refuse results with more digits than this (default: {DEFAULT_MAX_DIGITS})",
+    )
+    parser.add_argument("--max-concurrency", type=int, help="computations queued at once (default: 2 per worker)")
+    parser.add_argument("--max-waiting", type=int, default=1024, help="requests waiting for a slot before 503s")
+    return parser
+
+
+async def _serve(args):
+    server = ExpressionServer(
+        workers=args.workers,
+        timeout=args.timeout,
+        max_digits=args.max_digits,
+        max_concurrency=args.max_concurrency,
+        max_waiting=args.max_waiting,
+    )
+    host, port = await server.start(args.host, args.port)
+    # Flushed at once: benchmarks/load_test.py reads the port from this line
+    print(f"Serving on http://{host}:{port}", flush=True)
+    serving = asyncio.ensure_future(server.serve_forever())
+    try:
+        # Stop on SIGTERM too, so the worker processes are shut down
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, serving.cancel)
+    except (NotImplementedError, AttributeError):
+        pass
+    try:
+        await serving
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await server.close()
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    sys.set_int_max_str_digits(0)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
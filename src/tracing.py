@@ -0,0 +1,324 @@
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from src.evaluator import CONSTANT_NAMES
+
+# The trace that instrumented code reports to; NULL_TRACE unless one is active
+_current = ContextVar("trace", default=None)
+
+# Prefix of every Prometheus metric name
+METRIC_PREFIX = "expression"
+
+
+class _Stage:
+    """
+    Times one `with trace.stage(name):` block into the trace.
+    """
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        stages = self.trace.stages
+        stages[self.name] = stages.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+
+class Trace:
+    """
+    What one request did: wall time per stage, counts and maxima.
+
+    Instrumented code gets the active trace from current_trace() and reports
+    with `with trace.stage(name):`, trace.count and trace.maximum. Anything
+    that costs more than that to measure, such as walking a tree, is guarded
+    by `if trace.enabled:`.
+
+    Attributes:
+    - stages: dict
+        Seconds spent in each stage; repeated stages add up.
+    - counts: dict
+        Counters such as tokens or folded constants.
+    - maxima: dict
+        Largest values seen, such as the size of the largest integer.
+    """
+    enabled = True
+
+    def __init__(self):
+        self.stages = {}
+        self.counts = {}
+        self.maxima = {}
+
+    def stage(self, name: str):
+        return _Stage(self, name)
+
+    def count(self, name: str, amount: int = 1):
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def maximum(self, name: str, value):
+        if value > self.maxima.get(name, value - 1):
+            self.maxima[name] = value
+
+    def as_dict(self) -> dict:
+        return {"stages": dict(self.stages), "counts": dict(self.counts), "maxima": dict(self.maxima)}
+
+    def __repr__(self):
+        return f"Trace({self.as_dict()})"
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _NullTrace:
+    """
+    The trace reported to when tracing is off: every method does nothing,
+    and stage() returns one shared context manager, so nothing is allocated.
+    """
+    __slots__ = ()
+    enabled = False
+    _stage = _NullStage()
+
+    def stage(self, name: str):
+        return self._stage
+
+    def count(self, name: str, amount: int = 1):
+        pass
+
+    def maximum(self, name: str, value):
+        pass
+
+    def as_dict(self) -> dict:
+        return {"stages": {}, "counts": {}, "maxima": {}}
+
+
+NULL_TRACE = _NullTrace()
+
+
+def current_trace():
+    """
+    The trace active in this thread or task, or NULL_TRACE.
+    """
+    trace = _current.get()
+    return NULL_TRACE if trace is None else trace
+
+
+@contextmanager
+def activate(trace):
+    """
+    Make `trace` the one current_trace() returns within the block.
+    """
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def integer_digits(value: int) -> int:
+    """
+    Decimal digits of an int, without the quadratic str() conversion
+    (may be one more than the exact count).
+    """
+    if value == 0:
+        return 1
+    return math.floor(abs(value).bit_length() * math.log10(2)) + 1
+
+
+def record_tree(trace, name: str, node):
+    """
+    Count the nodes of a tree as `name`, and record the largest integer in it
+    as "largest_integer_digits". Shared nodes are counted once per use.
+    """
+    if not trace.enabled:
+        return
+    nodes = 0
+    largest = 0
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current is None:
+            continue
+        nodes += 1
+        if current.value.__class__ is int:
+            largest = max(largest, integer_digits(current.value))
+        stack.append(current.left)
+        stack.append(current.right)
+    trace.count(name, nodes)
+    if largest:
+        trace.maximum("largest_integer_digits", largest)
+
+
+def record_value(trace, value):
+    """
+    Record the size of a result as "largest_integer_digits" if it is an int.
+    """
+    if trace.enabled and value.__class__ is int:
+        trace.maximum("largest_integer_digits", integer_digits(value))
+
+
+def constant_operations(node) -> int:
+    """
+    Number of operator and function nodes whose operands are all constants,
+    counting shared nodes once per use: the operations simplify can fold.
+    """
+    # id -> (is constant, constant operations in the subtree); every node
+    # stays reachable from `node`, so ids are stable
+    memo = {}
+    stack = [(node, False)]
+    while stack:
+        current, visited = stack.pop()
+        if current is None or id(current) in memo:
+            continue
+        if current.left is None and current.right is None:
+            value = current.value
+            memo[id(current)] = (not isinstance(value, str) or value in CONSTANT_NAMES, 0)
+            continue
+        if not visited:
+            stack.append((current, True))
+            stack.append((current.right, False))
+            stack.append((current.left, False))
+            continue
+        left = memo[id(current.left)] if current.left is not None else (True, 0)
+        right = memo[id(current.right)] if current.right is not None else (True, 0)
+        constant = left[0] and right[0]
+        memo[id(current)] = (constant, left[1] + right[1] + constant)
+    return memo[id(node)][1] if node is not None else 0
+
+
+def record_simplification(trace, tree, simplified):
+    """
+    Record the simplified tree's size and how many constant operations
+    simplify folded away ("folded_constants").
+    """
+    if not trace.enabled:
+        return
+    record_tree(trace, "simplified_nodes", simplified)
+    trace.count("folded_constants", max(0, constant_operations(tree) - constant_operations(simplified)))
+
+
+class LogExporter:
+    """
+    Writes each trace as one JSON log record.
+
+    Parameters:
+    - logger: logging.Logger
+        Defaults to the "src.tracing" logger.
+    - level: int
+        Level of the records (default INFO).
+    """
+    def __init__(self, logger: logging.Logger = None, level: int = logging.INFO):
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        self.level = level
+
+    def export(self, record: dict, **labels):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, json.dumps({"event": "trace", **labels, **record}, default=str))
+
+
+class PrometheusExporter:
+    """
+    Totals traces into Prometheus-style metrics: per-stage seconds and call
+    counts, a total for every count and the highest value of every maximum,
+    rendered in the text exposition format by render().
+    """
+    def __init__(self, prefix: str = METRIC_PREFIX):
+        self.prefix = prefix
+        self.traces = 0
+        self.stage_seconds = {}
+        self.stage_calls = {}
+        self.counts = {}
+        self.maxima = {}
+        self._lock = threading.Lock()
+
+    def export(self, record: dict, **labels):
+        with self._lock:
+            self.traces += 1
+            for name, seconds in record["stages"].items():
+                self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + seconds
+                self.stage_calls[name] = self.stage_calls.get(name, 0) + 1
+            for name, amount in record["counts"].items():
+                self.counts[name] = self.counts.get(name, 0) + amount
+            for name, value in record["maxima"].items():
+                self.maxima[name] = max(self.maxima.get(name, value), value)
+
+    def render(self) -> str:
+        prefix = self.prefix
+        with self._lock:
+            lines = [
+                f"# HELP {prefix}_traces_total Requests traced.",
+                f"# TYPE {prefix}_traces_total counter",
+                f"{prefix}_traces_total {self.traces}",
+                f"# HELP {prefix}_stage_seconds_total Wall time spent in each stage.",
+                f"# TYPE {prefix}_stage_seconds_total counter",
+            ]
+            lines += [f'{prefix}_stage_seconds_total{{stage="{name}"}} {seconds!r}' for name, seconds in sorted(self.stage_seconds.items())]
+            lines += [
+                f"# HELP {prefix}_stage_calls_total Requests that ran each stage.",
+                f"# TYPE {prefix}_stage_calls_total counter",
+            ]
+            lines += [f'{prefix}_stage_calls_total{{stage="{name}"}} {calls}' for name, calls in sorted(self.stage_calls.items())]
+            for name, total in sorted(self.counts.items()):
+                lines += [f"# TYPE {prefix}_{name}_total counter", f"{prefix}_{name}_total {total}"]
+            for name, value in sorted(self.maxima.items()):
+                lines += [f"# TYPE {prefix}_{name} gauge", f"{prefix}_{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+class Tracer:
+    """
+    Makes a Trace per request and hands it to each exporter when the request
+    is done. A disabled tracer hands out NULL_TRACE, so instrumented code
+    costs next to nothing.
+
+        with tracer.trace() as trace:
+            ...  # code that reports to current_trace()
+        trace.as_dict()
+
+    Parameters:
+    - exporters: objects with an export(record, **labels) method, such as
+      LogExporter and PrometheusExporter.
+    - enabled: bool
+        If False, no traces are recorded.
+    """
+    def __init__(self, *exporters, enabled: bool = True):
+        self.exporters = list(exporters)
+        self.enabled = enabled
+
+    @contextmanager
+    def trace(self, **labels):
+        """
+        Activate a new trace for the block and export it afterwards, even if
+        the block raised. `labels` are passed on to the exporters.
+        """
+        if not self.enabled:
+            yield NULL_TRACE
+            return
+        trace = Trace()
+        try:
+            with activate(trace):
+                yield trace
+        finally:
+            self.export(trace.as_dict(), **labels)
+
+    def export(self, record: dict, **labels):
+        """
+        Export a trace recorded elsewhere, e.g. in a worker process.
+        """
+        for exporter in self.exporters:
+            exporter.export(record, **labels)
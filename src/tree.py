@@ -0,0 +1,353 @@
+from array import array
+from src.parser import Node, parse_expression
+
+# Node kinds stored in ExpressionTree.ops
+NUMBER = 0
+NAME = 1
+OPERATOR_CODES = {"+": 2, "-": 3, "*": 4, "/": 5, "%": 6, "^": 7, "//": 8, "!": 9, ",": 10}
+OPERATORS = {code: operator for operator, code in OPERATOR_CODES.items()}
+
+
+class ExpressionTree:
+    """
+    Struct-of-arrays expression tree.
+
+    Node i is described by ops[i], values[i], left[i] and right[i] instead of a
+    Python object per node. Nodes are stored in post-order (left subtree, right
+    subtree, node), so the root is the last node and a single forward scan
+    visits every child before its parent. Every builder in this module keeps
+    that layout.
+
+    With hash_cons=True, add() returns the existing index for a node that is
+    structurally identical to one already in the tree, so common
+    subexpressions are stored once and the tree becomes a DAG. A shared node
+    appears once, before its first user.
+
+    Attributes:
+    - ops: array of int
+        NUMBER, NAME or an operator code from OPERATOR_CODES.
+    - values: array of int
+        Index into `constants` for NUMBER, into `names` for NAME, -1 for operators.
+    - left, right: array of int
+        Child indices, -1 when absent.
+    - constants: list
+        Interned numeric literals.
+    - names: list of str
+        Interned variable, function and constant names.
+    """
+    def __init__(self, hash_cons: bool = False):
+        self.hash_cons = hash_cons
+        self.ops = array("B")
+        self.values = array("i")
+        self.left = array("i")
+        self.right = array("i")
+        self.constants = []
+        self.names = []
+        self._constant_index = {}
+        self._name_index = {}
+        self._node_index = {}
+
+    def add(self, value, left=None, right=None) -> int:
+        """
+        Append a node whose children (indices or None) are already in the tree
+        and return its index. The signature mirrors Node(value, left, right).
+        """
+        if isinstance(value, str):
+            op = OPERATOR_CODES.get(value)
+            if op is None:
+                op = NAME
+                index = self._name_index.get(value)
+                if index is None:
+                    index = len(self.names)
+                    self.names.append(value)
+                    self._name_index[value] = index
+            else:
+                index = -1
+        else:
+            op = NUMBER
+            # Key on the type as well so that 1, 1.0 and True stay distinct
+            key = (type(value), value)
+            index = self._constant_index.get(key)
+            if index is None:
+                index = len(self.constants)
+                self.constants.append(value)
+                self._constant_index[key] = index
+
+        left = -1 if left is None else left
+        right = -1 if right is None else right
+        if self.hash_cons:
+            key = (op, index, left, right)
+            existing = self._node_index.get(key)
+            if existing is not None:
+                return existing
+            self._node_index[key] = len(self.ops)
+
+        self.ops.append(op)
+        self.values.append(index)
+        self.left.append(left)
+        self.right.append(right)
+        return len(self.ops) - 1
+
+    def value(self, index: int):
+        """
+        The operator, name or number stored at node `index`.
+        """
+        op = self.ops[index]
+        if op == NUMBER:
+            return self.constants[self.values[index]]
+        if op == NAME:
+            return self.names[self.values[index]]
+        return OPERATORS[op]
+
+    def node(self, index: int) -> "NodeView":
+        return NodeView(self, index)
+
+    @property
+    def root(self):
+        """
+        A Node-compatible view of the root, or None for an empty tree.
+        """
+        if not self.ops:
+            return None
+        return NodeView(self, len(self.ops) - 1)
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __repr__(self):
+        return f"ExpressionTree({len(self.ops)} nodes, names={self.names})"
+
+    def has_shared_nodes(self) -> bool:
+        """
+        True if some node is the child of more than one parent.
+        """
+        referenced = bytearray(len(self.ops))
+        for children in (self.left, self.right):
+            for child in children:
+                if child >= 0:
+                    if referenced[child]:
+                        return True
+                    referenced[child] = 1
+        return False
+
+    def nbytes(self) -> int:
+        """
+        Size of the four node arrays in bytes (excluding the interned pools).
+        """
+        return sum(a.itemsize * len(a) for a in (self.ops, self.values, self.left, self.right))
+
+    @classmethod
+    def from_tokens(cls, tokens) -> "ExpressionTree":
+        """
+        Parse a token list straight into an ExpressionTree, without building
+        intermediate Node objects.
+        """
+        tree = cls()
+        parse_expression(tokens, make=tree.add)
+        return tree
+
+    @classmethod
+    def from_node(cls, node: Node) -> "ExpressionTree":
+        """
+        Convert a Node tree (or anything exposing value/left/right) into an
+        ExpressionTree.
+        """
+        tree = cls()
+        if node is None:
+            return tree
+        if isinstance(node, NodeView):
+            # Views are rebuilt on every access, so copy by index instead of identity
+            return node.tree.compact(node.index)
+
+        # Map nodes to their new indices by identity; the nodes are kept alive
+        # alongside so that ids cannot be reused during the walk
+        index_of = {}
+        stack = [(node, False)]
+        while stack:
+            current, visited = stack.pop()
+            if id(current) in index_of:
+                continue
+            if not visited:
+                stack.append((current, True))
+                if current.right is not None:
+                    stack.append((current.right, False))
+                if current.left is not None:
+                    stack.append((current.left, False))
+                continue
+            new_index = tree.add(
+                current.value,
+                None if current.left is None else index_of[id(current.left)][0],
+                None if current.right is None else index_of[id(current.right)][0],
+            )
+            index_of[id(current)] = (new_index, current)
+        return tree
+
+    def to_node(self, index: int = None) -> Node:
+        """
+        Rebuild a Node tree for the subtree rooted at `index` (default: root).
+        """
+        if not self.ops:
+            return None
+        if index is None:
+            index = len(self.ops) - 1
+
+        # Post-order walk from `index`, so only its subtree is rebuilt
+        built = {}
+        stack = [(index, False)]
+        while stack:
+            current, visited = stack.pop()
+            if current in built:
+                continue
+            left, right = self.left[current], self.right[current]
+            if not visited:
+                stack.append((current, True))
+                if right >= 0:
+                    stack.append((right, False))
+                if left >= 0:
+                    stack.append((left, False))
+                continue
+            built[current] = Node(
+                self.value(current),
+                left=built[left] if left >= 0 else None,
+                right=built[right] if right >= 0 else None,
+            )
+        return built[index]
+
+    def deduplicate(self) -> "ExpressionTree":
+        """
+        Return a hash-consed copy in which structurally identical subtrees
+        are stored once.
+        """
+        deduplicated = ExpressionTree(hash_cons=True)
+        # Children precede parents, so their new indices are known in time
+        new_index = [-1] * len(self.ops)
+        for i in range(len(self.ops)):
+            left, right = self.left[i], self.right[i]
+            new_index[i] = deduplicated.add(
+                self.value(i),
+                new_index[left] if left >= 0 else None,
+                new_index[right] if right >= 0 else None,
+            )
+        return deduplicated
+
+    def pack_subtree(self, start: int, end: int) -> tuple:
+        """
+        Cut the nodes start..end (inclusive) into a compact, picklable tuple.
+        In a tree without shared nodes the subtree rooted at `end` occupies
+        exactly such a range. Slicing runs at C speed; unpack_subtree does
+        the rebasing and checking on the receiving side.
+        """
+        return (
+            self.ops[start:end + 1],
+            self.values[start:end + 1],
+            self.left[start:end + 1],
+            self.right[start:end + 1],
+            start,
+            self.constants,
+            self.names,
+        )
+
+    @classmethod
+    def unpack_subtree(cls, packed: tuple) -> "ExpressionTree":
+        """
+        Rebuild the ExpressionTree packed by pack_subtree, or return None if
+        the range was not self-contained: some node in it refers to a node
+        before it, which happens when the tree has shared nodes.
+        """
+        ops, values, left, right, start, constants, names = packed
+        tree = cls()
+        tree.ops = ops
+        tree.values = values
+        tree.left = array("i", [child - start if child >= 0 else -1 for child in left])
+        tree.right = array("i", [child - start if child >= 0 else -1 for child in right])
+        # A child before the range maps below zero; one just before it maps
+        # to -1, which shows up as an extra "no child" entry
+        for rebased, original in ((tree.left, left), (tree.right, right)):
+            if rebased and (min(rebased) < -1 or rebased.count(-1) != original.count(-1)):
+                return None
+        # The pools are shared as-is; unused entries are harmless
+        tree.constants = list(constants)
+        tree.names = list(names)
+        tree._constant_index = {(type(value), value): index for index, value in enumerate(tree.constants)}
+        tree._name_index = {name: index for index, name in enumerate(tree.names)}
+        return tree
+
+    def compact(self, index: int = None) -> "ExpressionTree":
+        """
+        Return a copy holding only the nodes reachable from node `index`
+        (default: the root), laid out in post-order. Builders that append
+        replacement nodes (such as Compiler.simplify) call this to drop the
+        nodes they made unreachable.
+        """
+        compacted = ExpressionTree(self.hash_cons)
+        # The pools are shared as-is; unused entries are harmless
+        compacted.constants = list(self.constants)
+        compacted.names = list(self.names)
+        compacted._constant_index = dict(self._constant_index)
+        compacted._name_index = dict(self._name_index)
+        if not self.ops:
+            return compacted
+
+        ops, values, left, right = self.ops, self.values, self.left, self.right
+        new_index = [-1] * len(ops)
+        # Post-order walk; ~i marks the second visit of node i
+        stack = [len(ops) - 1 if index is None else index]
+        while stack:
+            current = stack.pop()
+            if current >= 0:
+                if new_index[current] >= 0:
+                    continue
+                stack.append(~current)
+                if right[current] >= 0:
+                    stack.append(right[current])
+                if left[current] >= 0:
+                    stack.append(left[current])
+                continue
+            current = ~current
+            if new_index[current] >= 0:
+                continue
+            new_index[current] = len(compacted.ops)
+            key = (
+                ops[current],
+                values[current],
+                new_index[left[current]] if left[current] >= 0 else -1,
+                new_index[right[current]] if right[current] >= 0 else -1,
+            )
+            compacted.ops.append(key[0])
+            compacted.values.append(key[1])
+            compacted.left.append(key[2])
+            compacted.right.append(key[3])
+            if compacted.hash_cons:
+                compacted._node_index[key] = new_index[current]
+        return compacted
+
+
+class NodeView:
+    """
+    A thin, Node-compatible view of one node in an ExpressionTree.
+
+    It exposes value, left and right like Node, so any code written against
+    Node can read an ExpressionTree without converting it.
+    """
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree: ExpressionTree, index: int):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def value(self):
+        return self.tree.value(self.index)
+
+    @property
+    def left(self):
+        child = self.tree.left[self.index]
+        return None if child < 0 else NodeView(self.tree, child)
+
+    @property
+    def right(self):
+        child = self.tree.right[self.index]
+        return None if child < 0 else NodeView(self.tree, child)
+
+    def __repr__(self):
+        return Node.__repr__(self)
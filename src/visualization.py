@@ -0,0 +1,279 @@
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from src.parser import Node
+from src.tree import ExpressionTree
+
+try:
+    from pyvis.network import Network
+except ImportError:  # pyvis is only needed for render_html
+    Network = None
+
+# Nodes drawn before the rest of the tree is collapsed, and how deep
+MAX_VISIBLE_NODES = 150
+MAX_VISIBLE_DEPTH = 10
+# Renderings kept by TreeRenderer, least recently used evicted first
+MAX_CACHED_RENDERINGS = 64
+# Labels hashed per update of the drawing digest
+DIGEST_CHUNK = 4096
+
+
+class Rendering:
+    """
+    A tree drawn with its large or deep subtrees collapsed.
+
+    Subtrees are identified by their path from the root: a string of 'L'
+    and 'R' steps, '' for the root. Paths stay the same when the tree is
+    re-parsed, unlike node ids, so they can be kept across reruns.
+
+    Attributes:
+    - source: str
+        Graphviz DOT source, or HTML for the pyvis backend.
+    - collapsed: dict
+        Maps the path of each collapsed subtree to its number of nodes.
+    - visible: int
+        Number of nodes drawn, not counting collapsed placeholders.
+    - total: int
+        Number of nodes in the tree, counting shared nodes once per use.
+    """
+    __slots__ = ("source", "collapsed", "visible", "total")
+
+    def __init__(self, source: str, collapsed: dict, visible: int, total: int):
+        self.source = source
+        self.collapsed = collapsed
+        self.visible = visible
+        self.total = total
+
+    def __repr__(self):
+        return f"Rendering(visible={self.visible}, total={self.total}, collapsed={len(self.collapsed)})"
+
+
+def subtree_sizes(node: Node) -> dict:
+    """
+    Map the id of every node to the size of its subtree, counting shared
+    nodes once per use, as they are drawn.
+    """
+    sizes = {}
+    stack = [(node, False)]
+    while stack:
+        current, visited = stack.pop()
+        if current is None or id(current) in sizes:
+            continue
+        if not visited:
+            stack.append((current, True))
+            stack.append((current.right, False))
+            stack.append((current.left, False))
+            continue
+        sizes[id(current)] = (
+            1
+            + (sizes[id(current.left)] if current.left is not None else 0)
+            + (sizes[id(current.right)] if current.right is not None else 0)
+        )
+    return sizes
+
+
+def layout(
+    node: Node,
+    max_nodes: int = MAX_VISIBLE_NODES,
+    max_depth: int = MAX_VISIBLE_DEPTH,
+    expanded=(),
+):
+    """
+    Choose the part of the tree to draw: nodes breadth-first until
+    `max_nodes` are drawn or `max_depth` is reached. The children of a node
+    whose path is in `expanded` are always drawn.
+
+    Returns (nodes, edges, collapsed): nodes as (path, node) pairs, edges
+    as (parent path, child path) pairs, and the sizes of the subtrees left
+    out by path, each of which is drawn as one placeholder.
+    """
+    nodes, edges, collapsed = [], [], {}
+    if node is None:
+        return nodes, edges, collapsed
+    expanded = set(expanded)
+    sizes = subtree_sizes(node)
+
+    queue = deque([(node, "", 0)])
+    drawn = 1
+    while queue:
+        current, path, depth = queue.popleft()
+        nodes.append((path, current))
+        for step, child in (("L", current.left), ("R", current.right)):
+            if child is None:
+                continue
+            child_path = path + step
+            edges.append((path, child_path))
+            if path in expanded or (depth < max_depth and drawn < max_nodes):
+                queue.append((child, child_path, depth + 1))
+                drawn += 1
+            else:
+                collapsed[child_path] = sizes[id(child)]
+    return nodes, edges, collapsed
+
+
+def drawing_key(node: Node) -> bytes:
+    """
+    A 16-byte key for how the tree is drawn: the blake2b digest of its labels
+    in pre-order, with a marker for missing children. Trees that draw the
+    same share a key, and a cached key takes the same memory however large
+    the tree is.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    labels = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current is None:
+            labels.append("\x01")
+            continue
+        labels.append(str(current.value))
+        stack.append(current.right)
+        stack.append(current.left)
+        if len(labels) >= DIGEST_CHUNK:
+            digest.update("\x00".join(labels).encode() + b"\x00")
+            labels.clear()
+    digest.update("\x00".join(labels).encode())
+    return digest.digest()
+
+
+def _quote(text: str) -> str:
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _node_name(path: str) -> str:
+    # DOT and pyvis ids; 'n' keeps the root's empty path a valid name
+    return "n" + path
+
+
+def render_dot(
+    node: Node,
+    max_nodes: int = MAX_VISIBLE_NODES,
+    max_depth: int = MAX_VISIBLE_DEPTH,
+    expanded=(),
+) -> Rendering:
+    """
+    Draw the tree as Graphviz DOT source, with the subtrees layout leaves
+    out drawn as one dashed box each.
+    """
+    if isinstance(node, ExpressionTree):
+        node = node.to_node()
+    nodes, edges, collapsed = layout(node, max_nodes, max_depth, expanded)
+    lines = ["digraph {", "\trankdir=TB"]
+    for path, current in nodes:
+        lines.append(f"\t{_node_name(path)} [label={_quote(str(current.value))}]")
+    for path, size in collapsed.items():
+        lines.append(
+            f"\t{_node_name(path)} [label={_quote(f'{size:,} nodes')} shape=box style=dashed tooltip={_quote(path)}]"
+        )
+    for parent, child in edges:
+        lines.append(f"\t{_node_name(parent)} -> {_node_name(child)}")
+    lines.append("}")
+    total = len(nodes) + sum(collapsed.values())
+    return Rendering("\n".join(lines) + "\n", collapsed, len(nodes), total)
+
+
+def render_html(
+    node: Node,
+    max_nodes: int = MAX_VISIBLE_NODES * 10,
+    max_depth: int = MAX_VISIBLE_DEPTH * 3,
+    expanded=(),
+    height: str = "600px",
+) -> Rendering:
+    """
+    Draw the tree as an interactive pyvis page, which can be panned and
+    zoomed and stays usable with far more nodes than a Graphviz layout.
+    """
+    if Network is None:
+        raise ImportError("render_html requires pyvis. Install it with 'pip install pyvis'.")
+    if isinstance(node, ExpressionTree):
+        node = node.to_node()
+    nodes, edges, collapsed = layout(node, max_nodes, max_depth, expanded)
+    network = Network(height=height, width="100%", directed=True, layout=True)
+    for path, current in nodes:
+        network.add_node(_node_name(path), label=str(current.value), title=path or "root")
+    for path, size in collapsed.items():
+        network.add_node(_node_name(path), label=f"{size:,} nodes", title=path, shape="box", color="#cccccc")
+    for parent, child in edges:
+        network.add_edge(_node_name(parent), _node_name(child))
+    total = len(nodes) + sum(collapsed.values())
+    return Rendering(network.generate_html(), collapsed, len(nodes), total)
+
+
+BACKENDS = {"dot": render_dot, "html": render_html}
+
+
+class TreeRenderer:
+    """
+    Renders trees on a background thread and caches the results by tree
+    structure and options, so a rerun with an unchanged tree reuses the
+    rendering and a large one does not hold up the rest of the request.
+    The tree is only walked on that thread, to compute its drawing_key.
+    """
+
+    def __init__(self, max_entries: int = MAX_CACHED_RENDERINGS, workers: int = 1):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._renderings = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tree-renderer")
+
+    def submit(self, node: Node, backend: str = "dot", expanded=(), **options) -> Future:
+        """
+        Start rendering and return a Future for the Rendering. The same tree
+        with the same options is rendered once while it stays cached; later
+        requests get the cached (or in progress) Rendering. Options are those
+        of render_dot or render_html.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unsupported backend '{backend}'")
+        settings = (backend, frozenset(expanded), tuple(sorted(options.items())))
+        return self._executor.submit(self._render, node, settings, expanded, options)
+
+    def _render(self, node: Node, settings: tuple, expanded, options: dict) -> Rendering:
+        # Runs on the executor: the walk for the key stays off the request path
+        if isinstance(node, ExpressionTree):
+            node = node.to_node()
+        key = (drawing_key(node), *settings)
+        with self._lock:
+            future = self._renderings.get(key)
+            owner = future is None
+            if owner:
+                self.misses += 1
+                future = self._renderings[key] = Future()
+                if len(self._renderings) > self.max_entries:
+                    self._renderings.popitem(last=False)
+            else:
+                self.hits += 1
+                self._renderings.move_to_end(key)
+        if not owner:
+            # Another worker is rendering the same tree, or has rendered it
+            return future.result()
+        try:
+            rendering = BACKENDS[settings[0]](node, expanded=expanded, **options)
+        except BaseException as error:
+            # A failed rendering is not cached, so it is retried next time
+            self._discard(key, future)
+            future.set_exception(error)
+            raise
+        future.set_result(rendering)
+        return rendering
+
+    def render(self, node: Node, backend: str = "dot", expanded=(), **options) -> Rendering:
+        """
+        Render and wait for the result.
+        """
+        return self.submit(node, backend, expanded, **options).result()
+
+    def _discard(self, key, future: Future):
+        with self._lock:
+            if self._renderings.get(key) is future:
+                del self._renderings[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._renderings), "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
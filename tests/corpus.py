@@ -0,0 +1,45 @@
+"""
+Expressions and variable bindings shared by the tests that check an
+evaluation path against evaluate.
+"""
+
+# Every operator, built-in function and constant, with ints, floats,
+# unary minus and a repeated subexpression
+EXPRESSIONS = [
+    "1 + 2 * 3 - 4 / 5",
+    "x ^ 2 - 3 * x * y + y ^ 3",
+    "-x + -(y - 2) * 4",
+    "(x + 1) / (y - 0.5) % 3",
+    "x // 2 + 7 // 3 - 2 ^ -1",
+    "sin(x) + cos(y) * tan(30)",
+    "sqrt(abs(x)) + log(y + 10) - exp(x / 10)",
+    "floor(x / 3) * ceil(y) + 5! - (x + y) * (x + y)",
+    "2 ^ 100 - 3 ^ 50 * x",
+    "pi * e + x * y * (x - y)",
+]
+CONTEXTS = [{"x": 3, "y": 2}, {"x": -2.5, "y": 0.75}, {"x": 10, "y": -4}]
+
+# Each raises a different error at x = 3
+ERRORS = [
+    "1 / (x - 3)",
+    "x % (x - 3)",
+    "x // (3 - x)",
+    "log(x - 3)",
+    "sqrt(-x)",
+    "(x / 2)!",
+    "(-x)!",
+    "z + 1",
+    "foo(x)",
+]
+ERROR_CONTEXT = {"x": 3}
+
+
+def outcome(function, *args, **kwargs):
+    """
+    The result of a call, or the type and message of the error it raised,
+    so that two evaluation paths can be compared with ==.
+    """
+    try:
+        return function(*args, **kwargs)
+    except Exception as error:
+        return type(error), str(error)
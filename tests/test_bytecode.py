@@ -0,0 +1,47 @@
+import pytest
+
+from src.bytecode import execute
+from src.compiler import Compiler
+from src.evaluator import evaluate
+from src.parser import parse_expression, tokenize
+from src.tree import ExpressionTree
+from tests.corpus import CONTEXTS, ERROR_CONTEXT, ERRORS, EXPRESSIONS, outcome
+
+
+def parse(text):
+    return parse_expression(tokenize(text))
+
+
+def programs(node):
+    # Compiled from the Node tree, from its struct-of-arrays form, and from
+    # the DAG left by common-subexpression elimination
+    yield Compiler.compile(node)
+    yield Compiler.compile(ExpressionTree.from_node(node))
+    yield Compiler.compile(Compiler.eliminate_common_subexpressions(node))
+
+
+@pytest.mark.parametrize("text", EXPRESSIONS)
+@pytest.mark.parametrize("exact", [False, True])
+@pytest.mark.parametrize("use_degrees", [True, False])
+def test_execute_matches_evaluate(text, exact, use_degrees):
+    node = parse(text)
+    for program in programs(node):
+        for context in CONTEXTS:
+            expected = evaluate(node, context, use_degrees, exact)
+            assert execute(program, context, use_degrees, exact) == expected
+
+
+@pytest.mark.parametrize("text", ERRORS)
+def test_execute_raises_what_evaluate_raises(text):
+    node = parse(text)
+    expected = outcome(evaluate, node, ERROR_CONTEXT)
+    assert isinstance(expected, tuple)
+    for program in programs(node):
+        assert outcome(execute, program, ERROR_CONTEXT) == expected
+
+
+def test_max_digits_refuses_what_evaluate_refuses():
+    node = parse("x ^ 5000")
+    expected = outcome(evaluate, node, {"x": 10}, max_digits=1000)
+    assert isinstance(expected, tuple)
+    assert outcome(execute, Compiler.compile(node), {"x": 10}, max_digits=1000) == expected
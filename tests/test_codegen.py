@@ -0,0 +1,64 @@
+import pytest
+
+from src.codegen import compile_function
+from src.compiler import Compiler
+from src.evaluator import evaluate
+from src.parser import parse_expression, tokenize
+from src.registry import REGISTRY
+from tests.corpus import CONTEXTS, ERROR_CONTEXT, ERRORS, EXPRESSIONS, outcome
+
+
+def parse(text):
+    return parse_expression(tokenize(text))
+
+
+def lookup(value):
+    return {1.0: 2.0}[value]
+
+
+@pytest.fixture
+def registered():
+    REGISTRY.register_function("lookup", lookup)
+    yield
+    REGISTRY.unregister("lookup")
+
+
+def test_key_error_from_a_registered_function_propagates(registered):
+    node = parse("lookup(x)")
+    compiled = compile_function(node)
+    assert compiled({"x": 1.0}) == evaluate(node, {"x": 1.0})
+    with pytest.raises(KeyError):
+        evaluate(node, {"x": 3.0})
+    with pytest.raises(KeyError):
+        compiled({"x": 3.0})
+
+
+def test_missing_variable_raises_value_error():
+    with pytest.raises(ValueError, match="Variable 'y' is not defined."):
+        compile_function(parse("x + y"))({"x": 1})
+
+
+@pytest.mark.parametrize("text", EXPRESSIONS)
+@pytest.mark.parametrize("exact", [False, True])
+@pytest.mark.parametrize("use_degrees", [True, False])
+def test_compiled_function_matches_evaluate(text, exact, use_degrees):
+    node = parse(text)
+    for source in (node, Compiler.simplify(node, exact), Compiler.eliminate_common_subexpressions(node)):
+        compiled = compile_function(source, use_degrees, exact)
+        for context in CONTEXTS:
+            assert compiled(context) == evaluate(node, context, use_degrees, exact)
+
+
+@pytest.mark.parametrize("text", ERRORS)
+def test_compiled_function_raises_what_evaluate_raises(text):
+    node = parse(text)
+    expected = outcome(evaluate, node, ERROR_CONTEXT)
+    assert isinstance(expected, tuple)
+    assert outcome(compile_function(node), ERROR_CONTEXT) == expected
+
+
+def test_max_digits_refuses_what_evaluate_refuses():
+    node = parse("x ^ 5000")
+    expected = outcome(evaluate, node, {"x": 10}, max_digits=1000)
+    assert isinstance(expected, tuple)
+    assert outcome(compile_function(node, max_digits=1000), {"x": 10}) == expected
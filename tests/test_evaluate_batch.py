@@ -0,0 +1,49 @@
+import math
+
+import numpy as np
+import pytest
+
+from src.evaluator import evaluate, evaluate_batch
+from src.parser import parse_expression, tokenize
+from src.registry import REGISTRY
+
+
+def halve(value):
+    if value < 0:
+        raise ValueError("Only non-negative values can be halved.")
+    return value / 2
+
+
+@pytest.fixture
+def registered():
+    REGISTRY.register_function("halve", halve)
+    REGISTRY.register_function("hypot", math.hypot, arity=2)
+    yield
+    REGISTRY.unregister("halve")
+    REGISTRY.unregister("hypot")
+
+
+def parse(text):
+    return parse_expression(tokenize(text))
+
+
+def test_registered_functions_match_evaluate(registered):
+    expression = parse("halve(x) + hypot(x, 4) * sin(x)")
+    xs = [3, 0.5, 12]
+    result = evaluate_batch(expression, {"x": xs}, use_degrees=False)
+    expected = [evaluate(expression, {"x": x}, use_degrees=False) for x in xs]
+    assert result.errors == {}
+    np.testing.assert_allclose(result.values, expected)
+
+
+def test_registered_function_errors_are_reported_per_row(registered):
+    result = evaluate_batch(parse("halve(x)"), {"x": [4, -2, 1]})
+    np.testing.assert_array_equal(result.values[[0, 2]], [2, 0.5])
+    assert math.isnan(result.values[1])
+    assert list(result.errors) == ["Only non-negative values can be halved."]
+    np.testing.assert_array_equal(result.valid, [True, False, True])
+
+
+def test_wrong_number_of_arguments_raises(registered):
+    with pytest.raises(ValueError, match="takes 2 arguments"):
+        evaluate_batch(parse("hypot(x)"), {"x": [1, 2]})
@@ -0,0 +1,49 @@
+from fractions import Fraction
+
+import pytest
+
+from src.compiler import Compiler
+from src.evaluator import evaluate
+from src.parser import parse_expression, tokenize
+from tests.corpus import CONTEXTS, EXPRESSIONS
+
+
+def parse(text):
+    return parse_expression(tokenize(text))
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("1/3 + 1/6", Fraction(1, 2)),
+        ("(2/3) ^ -2", Fraction(9, 4)),
+        ("(1/3) * 3", 1),
+        ("(1/2) % (1/3)", Fraction(1, 6)),
+        ("7 // (1/2)", 14),
+        ("sqrt(9/4)", Fraction(3, 2)),
+        ("8 ^ (2/3)", 4),
+    ],
+)
+def test_rational_results_are_exact(text, expected):
+    result = evaluate(parse(text), exact=True)
+    assert result == expected
+    assert type(result) is type(expected)
+
+
+def test_irrational_results_fall_back_to_floats():
+    assert evaluate(parse("2 ^ 0.5"), exact=True) == evaluate(parse("2 ^ 0.5"))
+
+
+@pytest.mark.parametrize("text", EXPRESSIONS)
+def test_exact_results_round_to_float_results(text):
+    node = parse(text)
+    for context in CONTEXTS:
+        assert float(evaluate(node, context, exact=True)) == pytest.approx(evaluate(node, context), rel=1e-12)
+
+
+@pytest.mark.parametrize("text", EXPRESSIONS)
+def test_exact_simplify_keeps_the_exact_value(text):
+    node = parse(text)
+    simplified = Compiler.simplify(node, exact=True)
+    for context in CONTEXTS:
+        assert evaluate(simplified, context, exact=True) == evaluate(node, context, exact=True)
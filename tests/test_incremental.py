@@ -0,0 +1,42 @@
+import pytest
+
+from src.compiler import Compiler, IncrementalSimplifier
+from src.evaluator import evaluate
+from src.parser import IncrementalParser, parse_expression, tokenize
+from tests.corpus import CONTEXTS, EXPRESSIONS, outcome
+
+
+def parse(text):
+    return parse_expression(tokenize(text))
+
+
+def edits(text):
+    # Typing the expression one character at a time (mostly invalid
+    # prefixes), then changes in the middle, then the expression again
+    yield from (text[:end] for end in range(1, len(text) + 1))
+    yield text.replace("x", "(x + 1)")
+    yield text.replace("2", "20")
+    yield text[:len(text) // 2] + "*" + text[len(text) // 2:]
+    yield text
+
+
+@pytest.mark.parametrize("text", EXPRESSIONS)
+def test_incremental_parse_matches_full_parse(text):
+    parser = IncrementalParser()
+    simplifier = IncrementalSimplifier()
+    for version in edits(text):
+        # Node has no __eq__; its repr spells out the whole structure
+        expected = outcome(lambda: repr(parse(version)))
+        assert outcome(lambda: repr(parser.parse(version))) == expected
+        if isinstance(expected, str):
+            assert repr(simplifier.simplify(parser.root)) == repr(Compiler.simplify(parse(version)))
+            for context in CONTEXTS:
+                assert outcome(evaluate, parser.root, context) == outcome(evaluate, parse(version), context)
+
+
+def test_untouched_terms_are_reused():
+    parser = IncrementalParser()
+    first = parser.parse("(x + 1) * 2 + sin(y) - 3")
+    second = parser.parse("(x + 1) * 2 + sin(y) - 4")
+    assert parser.reparsed < len(tokenize("(x + 1) * 2 + sin(y) - 4"))
+    assert second.left.left is first.left.left
@@ -0,0 +1,68 @@
+import itertools
+
+import pytest
+
+from src.compiler import Compiler
+from src.evaluator import evaluate, evaluate_interval
+from src.interval import OVERFLOW_MESSAGE
+from src.parser import parse_expression, tokenize
+from tests.corpus import EXPRESSIONS, outcome
+
+RANGES = {"x": (0, 9), "y": (-4, 2)}
+SAMPLES = [{"x": x, "y": y} for x, y in itertools.product([0, 0.5, 2, 7.25, 9], [-4, -0.5, 0, 0.5, 2])]
+
+# Each has a subtree prune replaces or drops over RANGES
+PRUNABLE = [
+    "floor(x / 10) * y + x",
+    "x % 11 + abs(x + 3) * (y - y + 1)",
+    "(x - x) * 0 + y * 1 - 0",
+    "sqrt(x) + ceil(y / 10 - 0.5)",
+]
+
+
+def parse(text):
+    return parse_expression(tokenize(text))
+
+
+@pytest.mark.parametrize("text", ["x * 200!", "200! / x"])
+def test_int_too_large_for_a_float_is_flagged(text):
+    # evaluate raises OverflowError for every x in the range
+    result = evaluate_interval(parse(text), {"x": (1.0, 2.0)})
+    assert OVERFLOW_MESSAGE in result.errors
+
+
+def test_prune_keeps_a_subtree_that_overflows():
+    node = parse("floor(x / 10) * (y * 200!)")
+    pruned = Compiler.prune(node, {"x": (0, 9), "y": (1.0, 2.0)})
+    for context in ({"x": 0, "y": 1.0}, {"x": 9, "y": 2.0}):
+        with pytest.raises(OverflowError):
+            evaluate(node, context)
+        with pytest.raises(OverflowError):
+            evaluate(pruned, context)
+
+
+@pytest.mark.parametrize("text", EXPRESSIONS + PRUNABLE)
+def test_bounds_hold_what_evaluate_returns(text):
+    node = parse(text)
+    result = evaluate_interval(node, RANGES)
+    for context in SAMPLES:
+        value = outcome(evaluate, node, context)
+        if isinstance(value, tuple):
+            assert value[1] in result.errors
+        else:
+            assert value in result.bounds
+
+
+@pytest.mark.parametrize("text", EXPRESSIONS + PRUNABLE)
+def test_pruned_tree_evaluates_like_the_original(text):
+    node = parse(text)
+    pruned = Compiler.prune(node, RANGES)
+    for context in SAMPLES:
+        assert outcome(evaluate, pruned, context) == outcome(evaluate, node, context)
+
+
+@pytest.mark.parametrize("text", PRUNABLE)
+def test_prune_simplifies(text):
+    node = parse(text)
+    # Node has no __eq__; its repr spells out the whole structure
+    assert repr(Compiler.prune(node, RANGES)) != repr(node)
@@ -0,0 +1,64 @@
+from decimal import Decimal
+
+import pytest
+
+from src.evaluator import evaluate
+from src.parser import parse_expression, tokenize
+from tests.corpus import CONTEXTS, ERROR_CONTEXT, ERRORS, EXPRESSIONS, outcome
+
+
+def parse(text):
+    return parse_expression(tokenize(text))
+
+
+def test_remainder_of_a_quotient_beyond_the_precision_raises():
+    with pytest.raises(ValueError, match="precision"):
+        evaluate(parse("pi ^ ceil(3 ^ 10) % abs(-pi) * 3"), precision=30)
+
+
+def test_floor_division_beyond_the_precision_is_rounded():
+    result = evaluate(parse("pi ^ 100 // pi"), precision=30)
+    assert result == Decimal("1.65134340646984636826195098223E+49")
+
+
+@pytest.mark.parametrize("text", EXPRESSIONS)
+@pytest.mark.parametrize("exact", [False, True])
+def test_precise_results_round_to_float_results(text, exact):
+    node = parse(text)
+    for context in CONTEXTS:
+        result = evaluate(node, context, exact=exact, precision=30)
+        assert float(result) == pytest.approx(evaluate(node, context, exact=exact), rel=1e-12)
+
+
+def test_ints_stay_exact():
+    result = evaluate(parse("2 ^ 100 - 3 ^ 50 * x + 5!"), {"x": 7}, precision=5)
+    assert result == 2 ** 100 - 3 ** 50 * 7 + 120
+    assert type(result) is int
+
+
+@pytest.mark.parametrize("text", ERRORS)
+def test_precise_evaluation_raises_what_evaluate_raises(text):
+    node = parse(text)
+    expected = outcome(evaluate, node, ERROR_CONTEXT)
+    assert isinstance(expected, tuple)
+    assert outcome(evaluate, node, ERROR_CONTEXT, precision=30) == expected
+
+
+@pytest.mark.parametrize(
+    "text, reference",
+    [
+        ("pi", "pi"),
+        ("e ^ 2", "exp(2)"),
+        ("log(10) / 3", "log(10) / 3"),
+        ("sqrt(2) * sin(1)", "sqrt(2) * sin(pi / 180)"),
+        ("cos(45)", "cos(pi / 4)"),
+    ],
+)
+def test_digits_match_mpmath(text, reference):
+    mpmath = pytest.importorskip("mpmath")
+    digits = 200
+    result = evaluate(parse(text), precision=digits)
+    with mpmath.workdps(digits + 20):
+        expected = eval(reference, vars(mpmath))
+        # Within one unit in the last digit
+        assert abs(mpmath.mpf(str(result)) - expected) <= abs(expected) * mpmath.mpf(10) ** (1 - digits)
@@ -0,0 +1,38 @@
+import pytest
+
+from src.compiler import Compiler
+from src.evaluator import evaluate
+from src.parser import parse_expression, tokenize
+from src.tree import ExpressionTree
+from tests.corpus import CONTEXTS, ERROR_CONTEXT, ERRORS, EXPRESSIONS, outcome
+
+
+def parse(text):
+    return parse_expression(tokenize(text))
+
+
+@pytest.mark.parametrize("text", EXPRESSIONS)
+@pytest.mark.parametrize("exact", [False, True])
+def test_tree_evaluates_like_nodes(text, exact):
+    node = parse(text)
+    trees = [ExpressionTree.from_node(node), ExpressionTree.from_tokens(tokenize(text))]
+    for tree in trees:
+        # Node has no __eq__; its repr spells out the whole structure
+        assert repr(tree.to_node()) == repr(node)
+        for context in CONTEXTS:
+            assert evaluate(tree, context, exact=exact) == evaluate(node, context, exact=exact)
+
+
+@pytest.mark.parametrize("text", ERRORS)
+def test_tree_raises_what_nodes_raise(text):
+    node = parse(text)
+    expected = outcome(evaluate, node, ERROR_CONTEXT)
+    assert isinstance(expected, tuple)
+    assert outcome(evaluate, ExpressionTree.from_node(node), ERROR_CONTEXT) == expected
+
+
+@pytest.mark.parametrize("text", EXPRESSIONS)
+def test_tree_simplifies_like_nodes(text):
+    node = parse(text)
+    simplified = Compiler.simplify(ExpressionTree.from_node(node))
+    assert repr(simplified.to_node()) == repr(Compiler.simplify(node))